@@ -5,7 +5,7 @@ from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
 from .models import User, OTPCode
-from .services import RabbitMQService
+from .services import rabbitmq_service
 import logging
 
 logger = logging.getLogger(__name__)
@@ -58,8 +58,7 @@ class CustomTokenObtainPairSerializer(serializers.Serializer):
         
         # Publicar evento de login en RabbitMQ
         try:
-            rabbitmq = RabbitMQService()
-            rabbitmq.publish_user_login_event(user)
+            rabbitmq_service.publish_user_login_event(user)
         except Exception as e:
             logger.warning(f"No se pudo publicar evento de login en RabbitMQ: {e}")
         
@@ -112,8 +111,7 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         
         # Publicar evento de registro en RabbitMQ
         try:
-            rabbitmq = RabbitMQService()
-            rabbitmq.publish_user_registration_event(user)
+            rabbitmq_service.publish_user_registration_event(user)
         except Exception as e:
             logger.warning(f"No se pudo publicar evento de registro en RabbitMQ: {e}")
         
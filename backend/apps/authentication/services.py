@@ -1,82 +1,37 @@
-import pika
-import json
 import logging
 from datetime import datetime
-from django.conf import settings
 from typing import Optional, Dict, Any
 
+from apps.messaging.publisher import RabbitMQPublisher, get_publisher
+
 logger = logging.getLogger(__name__)
 
 
 class RabbitMQService:
-    """Servicio para manejar mensajería con RabbitMQ."""
-    
-    def __init__(self):
-        self.connection = None
-        self.channel = None
-        self._connect()
+    """Servicio para manejar mensajería con RabbitMQ (sobre el publicador compartido)."""
     
-    def _connect(self):
-        """Establecer conexión con RabbitMQ."""
-        try:
-            # Crear credenciales
-            credentials = pika.PlainCredentials('tesis', 'tesis')
-            
-            # Parámetros de conexión
-            parameters = pika.ConnectionParameters(
-                host='rabbitmq',
-                credentials=credentials
-            )
-            
-            # Establecer conexión
-            self.connection = pika.BlockingConnection(parameters)
-            self.channel = self.connection.channel()
-            
-            logger.info("Conexión establecida con RabbitMQ")
-            
-        except Exception as e:
-            logger.error(f"Error conectando a RabbitMQ: {e}")
-            self.connection = None
-            self.channel = None
+    def __init__(self, publisher: Optional[RabbitMQPublisher] = None):
+        # Sin conexión propia: el pool de apps/messaging/publisher.py es del proceso
+        self.publisher = publisher or get_publisher()
     
-    def _ensure_connection(self):
-        """Asegurar que la conexión esté activa."""
-        if not self.connection or self.connection.is_closed:
-            self._connect()
+    def is_available(self) -> bool:
+        """Verificar que haya conexión con RabbitMQ."""
+        return self.publisher.is_available()
     
     def publish_message(self, exchange: str, routing_key: str, message: Dict[Any, Any], exchange_type: str = 'direct'):
-        """Publicar un mensaje en RabbitMQ."""
+        """Publicar un mensaje en RabbitMQ (queda en buffer si el broker no está disponible)."""
         try:
-            self._ensure_connection()
-            
-            if not self.channel:
-                logger.error("No hay canal disponible para publicar mensaje")
-                return False
-            
-            # Declarar exchange si no existe
-            self.channel.exchange_declare(
-                exchange=exchange,
-                exchange_type=exchange_type,
-                durable=True
-            )
-            
-            # Preparar mensaje
-            message_body = json.dumps(message, default=str)
-            
-            # Publicar mensaje
-            self.channel.basic_publish(
+            published = self.publisher.publish(
                 exchange=exchange,
                 routing_key=routing_key,
-                body=message_body,
-                properties=pika.BasicProperties(
-                    delivery_mode=2,  # Hacer el mensaje persistente
-                    content_type='application/json',
-                    timestamp=int(datetime.now().timestamp())
-                )
+                payload=message,
+                exchange_type=exchange_type
             )
-            
-            logger.info(f"Mensaje publicado: {exchange}/{routing_key}")
-            return True
+            if published:
+                logger.info(f"Mensaje publicado: {exchange}/{routing_key}")
+            else:
+                logger.warning(f"RabbitMQ no disponible, mensaje en buffer: {exchange}/{routing_key}")
+            return published
             
         except Exception as e:
             logger.error(f"Error publicando mensaje: {e}")
@@ -190,13 +145,7 @@ class RabbitMQService:
             routing_key='ubicacion',
             message=message
         )
-    
-    def close(self):
-        """Cerrar conexión con RabbitMQ."""
-        if self.connection and not self.connection.is_closed:
-            self.connection.close()
-            logger.info("Conexión con RabbitMQ cerrada")
-    
-    def __del__(self):
-        """Destructor para cerrar conexión."""
-        self.close()
\ No newline at end of file
+
+
+# Instancia global del servicio
+rabbitmq_service = RabbitMQService()
@@ -21,7 +21,7 @@ from .serializers import (
     OTPRequestSerializer,
     OTPVerifySerializer
 )
-from .services import RabbitMQService
+from .services import rabbitmq_service
 
 logger = logging.getLogger(__name__)
 
@@ -174,8 +174,7 @@ class OTPRequestView(APIView):
             
             # Publicar evento en RabbitMQ
             try:
-                rabbitmq = RabbitMQService()
-                rabbitmq.publish_otp_sent_event(phone, purpose)
+                rabbitmq_service.publish_otp_sent_event(phone, purpose)
             except Exception as e:
                 logger.warning(f"No se pudo publicar evento OTP en RabbitMQ: {e}")
             
@@ -330,9 +329,7 @@ def debug_cors(request):
 def _check_rabbitmq_connection():
     """Verificar conexión con RabbitMQ."""
     try:
-        rabbitmq = RabbitMQService()
-        if rabbitmq.connection and not rabbitmq.connection.is_closed:
-            rabbitmq.close()
+        if rabbitmq_service.is_available():
             return 'connected'
         else:
             return 'disconnected'
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.gis.admin import OSMGeoAdmin
-from .models import Incident, IncidentAttachment, IncidentEvent, OutboxEvent
+from .models import Incident, IncidentAttachment, IncidentEvent, OutboxEvent, ProcessedEvent
 
 
 @admin.register(Incident)
@@ -56,14 +56,26 @@ class IncidentEventAdmin(admin.ModelAdmin):
 class OutboxEventAdmin(admin.ModelAdmin):
     """Admin para eventos outbox (monitoreo)"""
     
-    list_display = ['id', 'aggregate_type', 'event_type', 'status', 'attempts', 'created_at']
+    list_display = ['id', 'aggregate_type', 'event_type', 'status', 'attempts', 'next_attempt_at', 'created_at']
     list_filter = ['status', 'aggregate_type', 'event_type', 'created_at']
     readonly_fields = ['id', 'created_at', 'published_at']
     
     actions = ['retry_failed_events']
     
     def retry_failed_events(self, request, queryset):
-        """Acción para reintentar eventos fallidos"""
-        # TODO: Implementar retry logic
-        self.message_user(request, "Reintentar eventos no implementado aún")
+        """Acción para reintentar eventos fallidos (los vuelve a tomar el relay)"""
+        updated = queryset.filter(status='failed').update(
+            status='pending', attempts=0, next_attempt_at=None
+        )
+        self.message_user(request, f"{updated} eventos marcados para reintento")
     retry_failed_events.short_description = "Reintentar eventos fallidos"
+
+
+@admin.register(ProcessedEvent)
+class ProcessedEventAdmin(admin.ModelAdmin):
+    """Admin para el ledger de eventos procesados (monitoreo)"""
+    
+    list_display = ['event_id', 'consumer', 'event_type', 'processed_at']
+    list_filter = ['consumer', 'event_type', 'processed_at']
+    search_fields = ['event_id']
+    readonly_fields = ['consumer', 'event_id', 'event_type', 'processed_at']
@@ -0,0 +1,151 @@
+"""
+Inspección y reproceso de la cola de cuarentena del consumer del dashboard
+(dashboard.incidents.dead, ver IncidentDashboardConsumer).
+
+Los mensajes se leen con basic_get sin confirmar: los que no se reprocesan ni
+se descartan vuelven a la cola al terminar, en su mismo orden.
+"""
+
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+import pika
+
+from .incident_consumer import IncidentDashboardConsumer
+
+logger = logging.getLogger(__name__)
+
+# Headers que se quitan al reprocesar para que el evento tenga todos sus reintentos
+RESET_HEADERS = (
+    IncidentDashboardConsumer.RETRY_HEADER,
+    'x-last-error',
+    'x-dead-lettered-at',
+)
+
+
+def _describe(method, properties, body: bytes) -> Dict[str, Any]:
+    headers = properties.headers or {}
+    try:
+        event_data = json.loads(body)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        event_data = {}
+    return {
+        'delivery_tag': method.delivery_tag,
+        'event_type': event_data.get('event_type') if isinstance(event_data, dict) else None,
+        'incident_id': event_data.get('incident_id') if isinstance(event_data, dict) else None,
+        'routing_key': headers.get(IncidentDashboardConsumer.ROUTING_KEY_HEADER, method.routing_key),
+        'attempts': headers.get(IncidentDashboardConsumer.RETRY_HEADER, 0),
+        'error': headers.get('x-last-error'),
+        'dead_lettered_at': headers.get('x-dead-lettered-at'),
+    }
+
+
+class DeadLetterQueue:
+    """Acceso por lotes a la cola de cuarentena"""
+
+    def __init__(self, consumer: Optional[IncidentDashboardConsumer] = None):
+        self.consumer = consumer or IncidentDashboardConsumer()
+        if self.consumer.channel is None:
+            # Declara también la topología de reintentos y activa confirms
+            self.consumer.connect()
+        self.channel = self.consumer.channel
+
+    def count(self) -> int:
+        result = self.channel.queue_declare(queue=self.consumer.DEAD_LETTER_QUEUE, durable=True, passive=True)
+        return result.method.message_count
+
+    def _fetch(self, limit: int, event_type: Optional[str] = None) -> List[Tuple]:
+        """
+        Toma hasta limit mensajes (del tipo pedido) sin confirmarlos; los de
+        otro tipo quedan también sin confirmar hasta _release().
+
+        Returns:
+            [(method, properties, body), ...] seleccionados
+        """
+        selected = []
+        while len(selected) < limit:
+            method, properties, body = self.channel.basic_get(
+                queue=self.consumer.DEAD_LETTER_QUEUE,
+                auto_ack=False
+            )
+            if method is None:
+                break
+            if event_type and _describe(method, properties, body)['event_type'] != event_type:
+                continue
+            selected.append((method, properties, body))
+        return selected
+
+    def _release(self):
+        """Devuelve a la cola todo lo que siga sin confirmar en el canal"""
+        self.channel.basic_nack(delivery_tag=0, multiple=True, requeue=True)
+
+    def inspect(self, limit: int = 20, event_type: Optional[str] = None) -> Dict:
+        """Lista hasta limit mensajes en cuarentena sin sacarlos de la cola"""
+        try:
+            total = self.count()
+            selected = self._fetch(limit, event_type)
+            messages = [_describe(*message) for message in selected]
+            self._release()
+            return {'success': True, 'total': total, 'messages': messages}
+        except Exception as e:
+            logger.error(f"❌ Error inspeccionando la cola de cuarentena: {e}")
+            return {'success': False, 'error': str(e)}
+
+    def replay(self, limit: int = 1000, event_type: Optional[str] = None) -> Dict:
+        """
+        Vuelve a encolar en la cola del dashboard (no en el exchange, para no
+        repetir el evento a otros consumidores) con el contador de reintentos
+        en cero; cada original se confirma tras la confirmación del broker.
+        """
+        replayed, failed = 0, 0
+        try:
+            selected = self._fetch(limit, event_type)
+            for method, properties, body in selected:
+                headers = {
+                    key: value for key, value in (properties.headers or {}).items()
+                    if key not in RESET_HEADERS
+                }
+                try:
+                    self.channel.basic_publish(
+                        exchange='',
+                        routing_key=self.consumer.QUEUE_NAME,
+                        body=body,
+                        properties=pika.BasicProperties(
+                            content_type=properties.content_type or 'application/json',
+                            delivery_mode=2,
+                            headers=headers,
+                            message_id=properties.message_id,
+                            timestamp=properties.timestamp
+                        )
+                    )
+                except Exception as e:
+                    logger.error(f"❌ No se pudo reprocesar el mensaje {method.delivery_tag}: {e}")
+                    failed += 1
+                    continue
+                self.channel.basic_ack(delivery_tag=method.delivery_tag)
+                replayed += 1
+            self._release()
+            logger.info(f"🔁 {replayed} eventos devueltos a {self.consumer.QUEUE_NAME}")
+            return {'success': True, 'replayed': replayed, 'failed': failed}
+        except Exception as e:
+            logger.error(f"❌ Error reprocesando la cola de cuarentena: {e}")
+            return {'success': False, 'error': str(e), 'replayed': replayed, 'failed': failed}
+
+    def discard(self, limit: Optional[int] = None, event_type: Optional[str] = None) -> Dict:
+        """Elimina mensajes de la cola de cuarentena (todos si no hay filtro por tipo)"""
+        try:
+            if not event_type and limit is None:
+                result = self.channel.queue_purge(queue=self.consumer.DEAD_LETTER_QUEUE)
+                return {'success': True, 'discarded': result.method.message_count}
+            selected = self._fetch(limit or self.count(), event_type)
+            # Ack uno por uno: un ack multiple también cubriría los saltados
+            for method, _, _ in selected:
+                self.channel.basic_ack(delivery_tag=method.delivery_tag)
+            self._release()
+            return {'success': True, 'discarded': len(selected)}
+        except Exception as e:
+            logger.error(f"❌ Error descartando la cola de cuarentena: {e}")
+            return {'success': False, 'error': str(e)}
+
+    def close(self):
+        self.consumer.stop_consuming()
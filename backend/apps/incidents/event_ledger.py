@@ -0,0 +1,166 @@
+"""
+Registro de eventos procesados para que los consumers sean idempotentes.
+
+Cada payload de IncidentEventService lleva un event_id (UUID). Antes de
+aplicar un evento el consumer lo reclama en la tabla processed_events dentro
+de la misma transacción que sus escrituras: si la transacción se revierte el
+registro también, y una reentrega de un evento ya aplicado choca con la
+restricción única (consumer, event_id) y se descarta.
+
+Delante de la tabla hay una caché LRU acotada (EVENT_LEDGER_CACHE_SIZE) con
+los ids confirmados recientemente: las reentregas típicas (reintentos del
+relay, redelivery tras caída del consumer) se descartan sin consultar la base
+de datos. La caché solo se actualiza al confirmarse la transacción.
+
+Los eventos sin event_id (productores anteriores) se aplican siempre.
+"""
+
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Optional
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import ProcessedEvent
+
+logger = logging.getLogger(__name__)
+
+
+def _event_id(event_data: Dict[str, Any]) -> Optional[uuid.UUID]:
+    try:
+        return uuid.UUID(str(event_data['event_id']))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class EventLedger:
+    """Ledger de un consumer: LRU en memoria delante de ProcessedEvent"""
+
+    def __init__(self, consumer: str, cache_size: Optional[int] = None):
+        """
+        Args:
+            consumer: Nombre del consumer (los ids son únicos por consumer)
+            cache_size: Ids recordados en memoria (default: EVENT_LEDGER_CACHE_SIZE)
+        """
+        self.consumer = consumer
+        self.cache_size = cache_size or getattr(settings, 'EVENT_LEDGER_CACHE_SIZE', 10000)
+        self._seen: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'claimed': 0, 'cache_hits': 0, 'db_duplicates': 0}
+
+    # ========== CACHÉ ==========
+
+    def _cached(self, event_id: uuid.UUID) -> bool:
+        with self._lock:
+            if event_id in self._seen:
+                self._seen.move_to_end(event_id)
+                self.stats['cache_hits'] += 1
+                return True
+        return False
+
+    def _remember(self, event_ids: Iterable[uuid.UUID]):
+        with self._lock:
+            for event_id in event_ids:
+                self._seen[event_id] = True
+                self._seen.move_to_end(event_id)
+            while len(self._seen) > self.cache_size:
+                self._seen.popitem(last=False)
+
+    def _remember_on_commit(self, event_ids: List[uuid.UUID]):
+        if event_ids:
+            transaction.on_commit(lambda: self._remember(event_ids))
+
+    # ========== RECLAMAR ==========
+
+    def claim(self, event_data: Dict[str, Any]) -> bool:
+        """
+        Reclama un evento; debe llamarse dentro de la transacción del handler.
+
+        Returns:
+            False si el evento ya se había procesado
+        """
+        event_id = _event_id(event_data)
+        if event_id is None:
+            return True
+        if self._cached(event_id):
+            return False
+        try:
+            # Savepoint: el IntegrityError no invalida la transacción del llamador
+            with transaction.atomic():
+                ProcessedEvent.objects.create(
+                    consumer=self.consumer,
+                    event_id=event_id,
+                    event_type=str(event_data.get('event_type', ''))[:50]
+                )
+        except IntegrityError:
+            self.stats['db_duplicates'] += 1
+            self._remember([event_id])
+            return False
+        self.stats['claimed'] += 1
+        self._remember_on_commit([event_id])
+        return True
+
+    def filter_new(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Reclama un lote con una consulta y un bulk_create; debe llamarse dentro
+        de la transacción del lote.
+
+        Returns:
+            Los eventos no procesados antes, en su orden (sin repetidos)
+        """
+        fresh: List[Dict[str, Any]] = []
+        pending: Dict[uuid.UUID, Dict[str, Any]] = {}
+        for event_data in events:
+            event_id = _event_id(event_data)
+            if event_id is None:
+                fresh.append(event_data)
+            elif event_id not in pending and not self._cached(event_id):
+                pending[event_id] = event_data
+                fresh.append(event_data)
+        if not pending:
+            return fresh
+
+        existing = set(
+            ProcessedEvent.objects
+            .filter(consumer=self.consumer, event_id__in=list(pending))
+            .values_list('event_id', flat=True)
+        )
+        if existing:
+            self.stats['db_duplicates'] += len(existing)
+            self._remember(existing)
+            for event_id in existing:
+                pending.pop(event_id)
+            fresh = [event_data for event_data in fresh if _event_id(event_data) not in existing]
+
+        # Un duplicado concurrente lanza IntegrityError y el consumer reintenta evento por evento
+        ProcessedEvent.objects.bulk_create([
+            ProcessedEvent(
+                consumer=self.consumer,
+                event_id=event_id,
+                event_type=str(event_data.get('event_type', ''))[:50]
+            )
+            for event_id, event_data in pending.items()
+        ])
+        self.stats['claimed'] += len(pending)
+        self._remember_on_commit(list(pending))
+        return fresh
+
+    # ========== MANTENIMIENTO ==========
+
+    def prune(self, days: Optional[int] = None) -> int:
+        """Borra registros más antiguos que days (default: EVENT_LEDGER_RETENTION_DAYS)"""
+        days = days or getattr(settings, 'EVENT_LEDGER_RETENTION_DAYS', 30)
+        deleted, _ = ProcessedEvent.objects.filter(
+            consumer=self.consumer,
+            processed_at__lt=timezone.now() - timedelta(days=days)
+        ).delete()
+        return deleted
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            cached = len(self._seen)
+        return dict(self.stats, cached=cached, cache_size=self.cache_size)
@@ -3,14 +3,45 @@ Consumer de eventos RabbitMQ para el dashboard del administrador.
 Escucha eventos de incidencias desde la app móvil y actualiza en tiempo real.
 
 Este consumer se ejecuta como un proceso separado o como tarea de Celery.
+
+Con workers > 1 o batch_size > 1 funciona en modo lote: el hilo de la
+conexión acumula entregas (hasta batch_size o flush_interval segundos), un
+pool de workers aplica cada lote en una sola transacción, en orden de llegada
+y agrupando en un bulk_create/bulk_update cada tramo consecutivo de eventos
+del mismo event_type (register_batch_handler), y los acks
+vuelven al hilo de la conexión, que confirma con multiple=True el mayor
+prefijo contiguo de entregas terminadas. Si el lote falla se aplica evento
+por evento para reintentar solo los que fallan. Los lotes concurrentes no
+garantizan orden entre sí, igual que cualquier consumer con prefetch > 1.
+
+Reintentos y cuarentena: un evento que falla no vuelve a la cabeza de la cola
+principal. Se republica en una cola de espera (dashboard.incidents.retry.<s>,
+con TTL fijo y dead-letter de vuelta a la cola principal) con el header
+x-retry-count incrementado; la espera crece con cada intento según
+INCIDENT_CONSUMER_RETRY_DELAYS. Pasados INCIDENT_CONSUMER_MAX_RETRIES intentos,
+o si el JSON es inválido, el evento se publica en el DLX
+dashboard.incidents.dlx y queda en dashboard.incidents.dead (ver el comando
+incident_dead_letters).
+
+Idempotencia: cada evento se reclama por su event_id en el EventLedger dentro
+de la transacción que lo aplica, así las reentregas se descartan (ver
+event_ledger.py).
 """
 
+import functools
 import json
 import logging
-from typing import Callable, Dict, Any
+from datetime import datetime
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+from typing import Callable, Dict, Any, List, Optional, Tuple
 import pika
 from pika.exceptions import AMQPConnectionError
 from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .event_ledger import EventLedger
 
 logger = logging.getLogger(__name__)
 
@@ -32,11 +63,67 @@ class IncidentDashboardConsumer:
         'incidents.status_updated.v1', # Cambios de estado
         'incidents.attachment_added.v1' # Nuevas evidencias
     ]
-    
-    def __init__(self):
+
+    # Reintentos y cuarentena
+    DEAD_LETTER_EXCHANGE = 'dashboard.incidents.dlx'
+    DEAD_LETTER_QUEUE = 'dashboard.incidents.dead'
+    RETRY_QUEUE_PREFIX = 'dashboard.incidents.retry'
+    RETRY_HEADER = 'x-retry-count'
+    ROUTING_KEY_HEADER = 'x-original-routing-key'
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        prefetch: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        retry_delays: Optional[List[int]] = None,
+        ledger: Optional[EventLedger] = None
+    ):
+        """
+        Args:
+            workers: Hilos que aplican lotes en paralelo (default: INCIDENT_CONSUMER_WORKERS)
+            batch_size: Entregas por lote (default: INCIDENT_CONSUMER_BATCH_SIZE)
+            prefetch: Mensajes sin confirmar en vuelo (default: INCIDENT_CONSUMER_PREFETCH
+                o 2 * workers * batch_size)
+            flush_interval: Segundos máximos que espera un lote incompleto
+            max_retries: Reintentos antes de mandar el evento a cuarentena
+            retry_delays: Esperas (segundos) entre reintentos; el último se repite
+            ledger: Registro de eventos procesados (default: uno por QUEUE_NAME,
+                desactivable con INCIDENT_CONSUMER_LEDGER)
+        """
         self.connection = None
         self.channel = None
         self.event_handlers: Dict[str, Callable] = {}
+        self.batch_handlers: Dict[str, Callable] = {}
+
+        self.workers = max(workers or getattr(settings, 'INCIDENT_CONSUMER_WORKERS', 1), 1)
+        self.batch_size = max(batch_size or getattr(settings, 'INCIDENT_CONSUMER_BATCH_SIZE', 1), 1)
+        self.prefetch = (
+            prefetch or getattr(settings, 'INCIDENT_CONSUMER_PREFETCH', None)
+            or (2 * self.workers * self.batch_size if self.batch_mode else 1)
+        )
+        self.flush_interval = flush_interval or getattr(settings, 'INCIDENT_CONSUMER_FLUSH_INTERVAL', 0.5)
+        self.max_retries = (
+            max_retries if max_retries is not None
+            else getattr(settings, 'INCIDENT_CONSUMER_MAX_RETRIES', 5)
+        )
+        self.retry_delays = retry_delays or getattr(settings, 'INCIDENT_CONSUMER_RETRY_DELAYS', [5, 30, 120, 600])
+        self.ledger = ledger or (
+            EventLedger(self.QUEUE_NAME) if getattr(settings, 'INCIDENT_CONSUMER_LEDGER', True) else None
+        )
+
+        # Estado del modo lote (solo se toca desde el hilo de la conexión)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._buffer: List[Tuple[int, str, Any, bytes]] = []
+        self._tags: deque = deque()
+        self._done: Dict[int, Optional[bool]] = {}
+        self.stats = {'batches': 0, 'acked': 0, 'retried': 0, 'dead_lettered': 0}
+
+    @property
+    def batch_mode(self) -> bool:
+        return self.workers > 1 or self.batch_size > 1
     
     def connect(self):
         """Establece conexión con RabbitMQ"""
@@ -70,12 +157,19 @@ class IncidentDashboardConsumer:
                     routing_key=routing_key
                 )
             
+            # Colas de espera y de cuarentena
+            self._declare_retry_topology()
+            
             # Configurar QoS (prefetch)
-            self.channel.basic_qos(prefetch_count=1)
+            self.channel.basic_qos(prefetch_count=self.prefetch)
             
             logger.info(f"✅ Dashboard consumer connected to RabbitMQ")
             logger.info(f"📥 Listening on exchange: {self.EXCHANGE_NAME}")
             logger.info(f"📋 Queue: {self.QUEUE_NAME}")
+            if self.batch_mode:
+                logger.info(
+                    f"⚙️ Batch mode: {self.workers} workers, lotes de {self.batch_size}, prefetch {self.prefetch}"
+                )
             
         except AMQPConnectionError as e:
             logger.error(f"❌ Failed to connect to RabbitMQ: {e}")
@@ -91,6 +185,14 @@ class IncidentDashboardConsumer:
         """
         self.event_handlers[event_type] = handler
         logger.info(f"✅ Registered handler for event type: {event_type}")
+
+    def register_batch_handler(self, event_type: str, handler: Callable):
+        """
+        Registra un handler que recibe la lista de eventos de un tipo dentro de
+        un lote (se ejecuta dentro de la transacción del lote).
+        """
+        self.batch_handlers[event_type] = handler
+        logger.info(f"✅ Registered batch handler for event type: {event_type}")
     
     def _process_message(self, ch, method, properties, body):
         """Procesa un mensaje recibido de RabbitMQ"""
@@ -107,26 +209,233 @@ class IncidentDashboardConsumer:
             
             if handler:
                 try:
-                    handler(event_data)
-                    logger.info(f"✅ Event processed successfully: {event_type}")
+                    # El registro en el ledger se revierte junto con el handler si este falla
+                    with transaction.atomic():
+                        applied = self.ledger is None or self.ledger.claim(event_data)
+                        if applied:
+                            handler(event_data)
+                    if applied:
+                        logger.info(f"✅ Event processed successfully: {event_type}")
+                    else:
+                        logger.info(f"⏭️ Duplicate event skipped: {event_type} ({event_data.get('event_id')})")
                     ch.basic_ack(delivery_tag=method.delivery_tag)
                 except Exception as e:
                     logger.error(f"❌ Error processing event {event_type}: {e}")
-                    # Rechazar y reencolar para reintentar
-                    ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+                    # Reintentar más tarde desde una cola de espera
+                    self._fail(method, properties, body, e)
             else:
                 # No hay handler, pero confirmamos el mensaje
                 logger.warning(f"⚠️ No handler for event type: {event_type}")
                 ch.basic_ack(delivery_tag=method.delivery_tag)
                 
-        except json.JSONDecodeError as e:
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
             logger.error(f"❌ Invalid JSON in message: {e}")
-            # Mensaje malformado, no reencolar
-            ch.basic_ack(delivery_tag=method.delivery_tag)
+            # Mensaje malformado: directo a cuarentena, reintentar no sirve
+            self._fail(method, properties, body, e, poison=True)
         except Exception as e:
             logger.error(f"❌ Unexpected error processing message: {e}")
-            ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+            self._fail(method, properties, body, e)
+    
+    # ========== REINTENTOS Y CUARENTENA ==========
+
+    def retry_queue(self, delay: int) -> str:
+        """Nombre de la cola de espera para un retraso en segundos"""
+        return f'{self.RETRY_QUEUE_PREFIX}.{delay}'
+
+    def _declare_retry_topology(self):
+        """Declara el DLX, la cola de cuarentena y una cola de espera por retraso"""
+        self.channel.exchange_declare(
+            exchange=self.DEAD_LETTER_EXCHANGE,
+            exchange_type='fanout',
+            durable=True
+        )
+        self.channel.queue_declare(queue=self.DEAD_LETTER_QUEUE, durable=True)
+        self.channel.queue_bind(exchange=self.DEAD_LETTER_EXCHANGE, queue=self.DEAD_LETTER_QUEUE)
+        
+        # TTL por cola (no por mensaje) para que un mensaje con espera larga no
+        # retenga a los de espera corta; al expirar vuelve a la cola principal
+        for delay in self.retry_delays:
+            self.channel.queue_declare(
+                queue=self.retry_queue(delay),
+                durable=True,
+                arguments={
+                    'x-message-ttl': int(delay * 1000),
+                    'x-dead-letter-exchange': '',
+                    'x-dead-letter-routing-key': self.QUEUE_NAME,
+                }
+            )
+        
+        # Las republicaciones esperan la confirmación del broker antes del ack del original
+        self.channel.confirm_delivery()
+
+    def _reject(self, routing_key: str, properties, body: bytes, error, poison: bool = False) -> bool:
+        """
+        Republica un mensaje fallido en su cola de espera o en el DLX.
+
+        Returns:
+            True si el broker confirmó la republicación (ya se puede hacer ack del original)
+        """
+        headers = dict(getattr(properties, 'headers', None) or {})
+        attempts = int(headers.get(self.RETRY_HEADER, 0)) + 1
+        # Tras un reintento el routing key es el de la cola; conservar el original
+        headers.setdefault(self.ROUTING_KEY_HEADER, routing_key)
+        headers[self.RETRY_HEADER] = attempts
+        headers['x-last-error'] = str(error)[:500]
+        
+        if poison or attempts > self.max_retries:
+            headers['x-dead-lettered-at'] = datetime.utcnow().isoformat() + 'Z'
+            exchange, key = self.DEAD_LETTER_EXCHANGE, headers[self.ROUTING_KEY_HEADER]
+        else:
+            delay = self.retry_delays[min(attempts - 1, len(self.retry_delays) - 1)]
+            exchange, key = '', self.retry_queue(delay)
+        
+        try:
+            self.channel.basic_publish(
+                exchange=exchange,
+                routing_key=key,
+                body=body,
+                properties=pika.BasicProperties(
+                    content_type='application/json',
+                    delivery_mode=2,
+                    headers=headers,
+                    message_id=getattr(properties, 'message_id', None),
+                    timestamp=getattr(properties, 'timestamp', None)
+                )
+            )
+        except Exception as e:
+            logger.error(f"❌ Could not republish failed event: {e}")
+            return False
+        
+        if exchange:
+            self.stats['dead_lettered'] += 1
+            logger.error(f"☠️ Event quarantined in {self.DEAD_LETTER_QUEUE} after {attempts} attempts: {error}")
+        else:
+            self.stats['retried'] += 1
+            logger.warning(f"🔁 Event retry {attempts}/{self.max_retries} in {key}: {error}")
+        return True
+
+    def _fail(self, method, properties, body: bytes, error, poison: bool = False):
+        """Manda el mensaje a reintento/cuarentena y lo confirma; si no se puede, lo reencola"""
+        if self._reject(method.routing_key, properties, body, error, poison):
+            self.channel.basic_ack(delivery_tag=method.delivery_tag)
+        else:
+            self.channel.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
     
+    # ========== MODO LOTE ==========
+
+    def _buffer_message(self, ch, method, properties, body):
+        """Callback del modo lote: acumula la entrega y despacha al completar el lote"""
+        self._tags.append(method.delivery_tag)
+        self._done[method.delivery_tag] = None
+        self._buffer.append((method.delivery_tag, method.routing_key, properties, body))
+        if len(self._buffer) >= self.batch_size:
+            self._dispatch()
+
+    def _on_timer(self):
+        self._dispatch()
+        self.connection.call_later(self.flush_interval, self._on_timer)
+
+    def _dispatch(self):
+        """Envía el lote acumulado al pool de workers"""
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        future = self._executor.submit(self._apply_batch, batch)
+        # pika no es thread-safe: los acks se hacen en el hilo de la conexión
+        future.add_done_callback(
+            lambda f: self.connection.add_callback_threadsafe(functools.partial(self._settle, batch, f))
+        )
+
+    def _settle(self, batch: List[Tuple[int, str, Any, bytes]], future):
+        """Confirma el lote: reintento/cuarentena de los fallidos y un ack multiple del prefijo terminado"""
+        try:
+            failures = future.result()
+        except Exception as e:
+            logger.error(f"❌ Error inesperado aplicando lote: {e}")
+            failures = {tag: (e, False) for tag, _, _, _ in batch}
+
+        for tag, routing_key, properties, body in batch:
+            if tag in failures and not self._reject(routing_key, properties, body, *failures[tag]):
+                self.channel.basic_nack(delivery_tag=tag, requeue=True)
+                self._done[tag] = False
+            else:
+                self._done[tag] = True
+        self.stats['batches'] += 1
+
+        # Un ack con multiple=True cubre todas las entregas <= tag, así que solo
+        # se puede confirmar hasta donde no queden lotes en curso
+        last_ack = None
+        while self._tags and self._done[self._tags[0]] is not None:
+            tag = self._tags.popleft()
+            if self._done.pop(tag):
+                last_ack = tag
+                self.stats['acked'] += 1
+        if last_ack is not None:
+            self.channel.basic_ack(delivery_tag=last_ack, multiple=True)
+
+    def _apply_events(self, events: List[Dict[str, Any]]):
+        """
+        Aplica eventos en orden de llegada; cada tramo consecutivo del mismo
+        event_type va junto a su batch handler. Agrupar por tipo en todo el lote
+        reordenaría los eventos de un mismo incidente (estado A, validado,
+        estado B terminaría en validado). Se llama dentro de la transacción
+        del lote, igual que el ledger.
+        """
+        if self.ledger is not None:
+            received = len(events)
+            events = self.ledger.filter_new(events)
+            if len(events) < received:
+                logger.info(f"⏭️ {received - len(events)} duplicate events skipped")
+        for event_type, run in groupby(events, key=lambda e: e.get('event_type', 'unknown')):
+            group = list(run)
+            batch_handler = self.batch_handlers.get(event_type)
+            handler = self.event_handlers.get(event_type)
+            if batch_handler:
+                batch_handler(group)
+            elif handler:
+                for event_data in group:
+                    handler(event_data)
+            else:
+                logger.warning(f"⚠️ No handler for event type: {event_type} ({len(group)} events)")
+
+    def _apply_batch(self, batch: List[Tuple[int, str, Any, bytes]]) -> Dict[int, Tuple[Any, bool]]:
+        """
+        Aplica un lote en un worker.
+
+        Returns:
+            {delivery_tag: (error, poison)} de las entregas que fallaron
+        """
+        failures: Dict[int, Tuple[Any, bool]] = {}
+        events: List[Tuple[int, Dict[str, Any]]] = []
+        for tag, routing_key, _, body in batch:
+            try:
+                events.append((tag, json.loads(body)))
+            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                # Mensaje malformado: directo a cuarentena
+                logger.error(f"❌ Invalid JSON in message ({routing_key}): {e}")
+                failures[tag] = (e, True)
+
+        close_old_connections()
+        try:
+            with transaction.atomic():
+                self._apply_events([event_data for _, event_data in events])
+            logger.info(f"✅ Batch processed: {len(events)} events")
+            return failures
+        except Exception as e:
+            logger.warning(f"⚠️ Batch of {len(events)} events failed ({e}), retrying one by one")
+
+        # Aislar los eventos que fallan para no reintentar el lote completo
+        for tag, event_data in events:
+            try:
+                with transaction.atomic():
+                    self._apply_events([event_data])
+            except Exception as e:
+                logger.error(f"❌ Error processing event {event_data.get('event_type')}: {e}")
+                failures[tag] = (e, False)
+        return failures
+
+    # ========== CONSUMO ==========
+
     def start_consuming(self):
         """Inicia el consumo de mensajes (bloquea el thread)"""
         if not self.channel:
@@ -134,9 +443,16 @@ class IncidentDashboardConsumer:
         
         logger.info("🎧 Starting to consume incidents events...")
         
+        if self.batch_mode:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='incident-consumer')
+            self.connection.call_later(self.flush_interval, self._on_timer)
+            callback = self._buffer_message
+        else:
+            callback = self._process_message
+        
         self.channel.basic_consume(
             queue=self.QUEUE_NAME,
-            on_message_callback=self._process_message,
+            on_message_callback=callback,
             auto_ack=False
         )
         
@@ -150,6 +466,15 @@ class IncidentDashboardConsumer:
         """Detiene el consumo de mensajes"""
         if self.channel:
             self.channel.stop_consuming()
+        if self._executor is not None:
+            # Terminar los lotes en curso y enviar sus acks antes de cerrar
+            self._executor.shutdown(wait=True)
+            self._executor = None
+            if self.connection and self.connection.is_open:
+                self.connection.process_data_events(time_limit=0)
+            logger.info(f"📊 Consumer stats: {self.stats}")
+        if self.ledger is not None:
+            logger.info(f"📒 Event ledger: {self.ledger.get_stats()}")
         if self.connection and not self.connection.is_closed:
             self.connection.close()
         logger.info("🔌 Consumer disconnected from RabbitMQ")
@@ -157,14 +482,39 @@ class IncidentDashboardConsumer:
 
 # ===== HANDLERS DE EVENTOS =====
 
+def _incident_from_event(event_data: Dict[str, Any]):
+    """Construye (sin guardar) el Incident de un evento incidente_pendiente"""
+    from apps.incidents.models import Incident
+    from django.contrib.gis.geos import Point
+    
+    # Extraer ubicación
+    location_data = event_data.get('location') or {}
+    latitude = location_data.get('latitude')
+    longitude = location_data.get('longitude')
+    
+    if not latitude or not longitude:
+        logger.error(f"❌ Missing location data for incident {event_data.get('incident_id')}")
+        return None
+    
+    return Incident(
+        id=event_data.get('incident_id'),
+        reporter_kind=event_data.get('reporter_kind', 'ciudadano'),
+        reporter_id=event_data.get('reporter_id'),
+        incident_type=event_data.get('incident_type') or event_data.get('type') or 'punto_acopio',
+        description=event_data.get('description'),
+        location=Point(float(longitude), float(latitude), srid=4326),
+        address=event_data.get('address'),
+        status=event_data.get('status', 'incidente_pendiente'),
+        photo_url=event_data.get('photo_url'),
+    )
+
+
 def handle_incident_submitted(event_data: Dict[str, Any]):
     """
     Maneja nuevos incidentes reportados desde la app móvil.
     Actualiza el dashboard en tiempo real.
     """
     from apps.incidents.models import Incident, IncidentEvent
-    from django.contrib.gis.geos import Point
-    from django.utils.dateutil import parser
     
     try:
         incident_id = event_data.get('incident_id')
@@ -174,29 +524,10 @@ def handle_incident_submitted(event_data: Dict[str, Any]):
             logger.info(f"⚠️ Incident {incident_id} already exists, skipping")
             return
         
-        # Extraer ubicación
-        location_data = event_data.get('location', {})
-        latitude = location_data.get('latitude')
-        longitude = location_data.get('longitude')
-        
-        if not latitude or not longitude:
-            logger.error(f"❌ Missing location data for incident {incident_id}")
-            return
-        
         # Crear incidente
-        incident = Incident(
-            id=incident_id,
-            reporter_kind=event_data.get('reporter_kind', 'ciudadano'),
-            reporter_id=event_data.get('reporter_id'),
-            type=event_data.get('type'),
-            title=event_data.get('title', 'Incidente reportado'),
-            description=event_data.get('description'),
-            location=Point(float(longitude), float(latitude)),
-            address=event_data.get('address'),
-            status=event_data.get('status', 'incidente_pendiente'),
-            incident_day=parser.parse(event_data.get('incident_day')) if event_data.get('incident_day') else None,
-            photos_count=event_data.get('photos_count', 0),
-        )
+        incident = _incident_from_event(event_data)
+        if incident is None:
+            return
         incident.save()
         
         # Registrar evento
@@ -272,19 +603,110 @@ def handle_status_updated(event_data: Dict[str, Any]):
         raise
 
 
+# ===== HANDLERS POR LOTE =====
+# Se ejecutan dentro de la transacción del lote. bulk_create/bulk_update no
+# disparan señales, así que la zona y la invalidación de teselas se hacen aquí.
+
+def handle_incidents_submitted_batch(events: List[Dict[str, Any]]):
+    """Crea en bloque los incidentes nuevos de un lote (ignora los ya existentes)"""
+    from apps.incidents.models import Incident, IncidentEvent
+    from apps.routes.tiles import invalidate_layer
+    from apps.routes.zone_index import zone_index
+    
+    by_id = {}
+    for event_data in events:
+        incident = _incident_from_event(event_data)
+        if incident is not None:
+            by_id.setdefault(str(incident.id), (incident, event_data))
+    if not by_id:
+        return
+    
+    existing = {str(pk) for pk in Incident.objects.filter(id__in=list(by_id)).values_list('id', flat=True)}
+    new = [item for key, item in by_id.items() if key not in existing]
+    if existing:
+        logger.info(f"⚠️ {len(existing)} incidents already exist, skipping")
+    if not new:
+        return
+    
+    incidents = [incident for incident, _ in new]
+    try:
+        for incident, zone_id in zip(incidents, zone_index.zones_for_points([i.location for i in incidents])):
+            incident.zone_id = zone_id
+    except Exception as e:
+        logger.warning(f"No se pudo asignar zona a los incidentes del lote: {e}")
+    
+    # Un duplicado concurrente lanza IntegrityError: el consumer reintenta evento por evento
+    Incident.objects.bulk_create(incidents)
+    IncidentEvent.objects.bulk_create([
+        IncidentEvent(incident=incident, event_type='incidente_creado', payload=event_data)
+        for incident, event_data in new
+    ])
+    transaction.on_commit(lambda: invalidate_layer('incidents'))
+    logger.info(f"✅ Created {len(incidents)} incidents from batch")
+
+
+def _update_status_batch(events: List[Dict[str, Any]], new_status: Callable, event_type: str):
+    """Actualiza el estado de varios incidentes con un bulk_update y registra sus eventos"""
+    from django.utils import timezone
+    from apps.incidents.models import Incident, IncidentEvent
+    from apps.routes.tiles import invalidate_layer
+    
+    ids = {event_data.get('incident_id') for event_data in events if event_data.get('incident_id')}
+    incidents = {str(pk): incident for pk, incident in Incident.objects.in_bulk(list(ids)).items()}
+    
+    now = timezone.now()
+    changed = {}
+    records = []
+    # En orden de llegada: si un incidente aparece varias veces gana el último evento
+    for event_data in events:
+        incident = incidents.get(str(event_data.get('incident_id')))
+        status = new_status(event_data)
+        if incident is None or not status:
+            logger.warning(f"⚠️ Incident {event_data.get('incident_id')} not found or without status, skipping")
+            continue
+        incident.status = status
+        incident.updated_at = now
+        changed[incident.pk] = incident
+        records.append(IncidentEvent(incident=incident, event_type=event_type, payload=event_data))
+    
+    if changed:
+        Incident.objects.bulk_update(list(changed.values()), ['status', 'updated_at'])
+        IncidentEvent.objects.bulk_create(records)
+        transaction.on_commit(lambda: invalidate_layer('incidents'))
+        logger.info(f"✅ {len(changed)} incidents updated from batch ({event_type})")
+
+
+def handle_incidents_validated_batch(events: List[Dict[str, Any]]):
+    """Versión por lote de handle_incident_validated"""
+    _update_status_batch(events, lambda event_data: 'incidente_valido', 'incidente_validado')
+
+
+def handle_status_updated_batch(events: List[Dict[str, Any]]):
+    """Versión por lote de handle_status_updated"""
+    _update_status_batch(events, lambda event_data: event_data.get('new_status'), 'estado_actualizado')
+
+
 # ===== FUNCIÓN PRINCIPAL =====
 
-def start_dashboard_consumer():
+def start_dashboard_consumer(
+    workers: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    prefetch: Optional[int] = None
+):
     """
     Inicia el consumer para el dashboard.
     Esta función se debe llamar desde un comando de Django o proceso separado.
     """
-    consumer = IncidentDashboardConsumer()
+    consumer = IncidentDashboardConsumer(workers=workers, batch_size=batch_size, prefetch=prefetch)
     
     # Registrar handlers
     consumer.register_handler('incidente_pendiente', handle_incident_submitted)
     consumer.register_handler('incidente_validado', handle_incident_validated)
     consumer.register_handler('estado_actualizado', handle_status_updated)
+    if consumer.batch_mode:
+        consumer.register_batch_handler('incidente_pendiente', handle_incidents_submitted_batch)
+        consumer.register_batch_handler('incidente_validado', handle_incidents_validated_batch)
+        consumer.register_batch_handler('estado_actualizado', handle_status_updated_batch)
     
     # Conectar y comenzar a consumir
     consumer.connect()
@@ -3,6 +3,11 @@ Comando Django para iniciar el consumer de eventos de incidencias.
 
 Uso:
     python manage.py consume_incident_events
+    python manage.py consume_incident_events --workers 4 --batch-size 100
+    python manage.py consume_incident_events --workers 4 --batch-size 100 --prefetch 1000
+
+Con --workers o --batch-size mayores que 1 los eventos se aplican por lotes
+(bulk_create/bulk_update) y se confirman con un ack multiple por lote.
 """
 
 from django.core.management.base import BaseCommand
@@ -12,6 +17,11 @@ from apps.incidents.incident_consumer import start_dashboard_consumer
 class Command(BaseCommand):
     help = 'Inicia el consumer de eventos RabbitMQ para el dashboard de incidencias'
     
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, help='Hilos que aplican lotes en paralelo')
+        parser.add_argument('--batch-size', type=int, help='Eventos por lote')
+        parser.add_argument('--prefetch', type=int, help='Mensajes sin confirmar en vuelo')
+    
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('='*60))
         self.stdout.write(self.style.SUCCESS('🚀 INCIDENT EVENTS CONSUMER'))
@@ -25,7 +35,11 @@ class Command(BaseCommand):
         self.stdout.write('')
         
         try:
-            start_dashboard_consumer()
+            start_dashboard_consumer(
+                workers=options['workers'],
+                batch_size=options['batch_size'],
+                prefetch=options['prefetch']
+            )
         except KeyboardInterrupt:
             self.stdout.write('')
             self.stdout.write(self.style.SUCCESS('✅ Consumer detenido correctamente'))
@@ -0,0 +1,54 @@
+"""
+Comando Django para revisar y reprocesar los eventos en cuarentena del
+consumer del dashboard (cola dashboard.incidents.dead).
+
+Uso:
+    python manage.py incident_dead_letters                      # lista los primeros 20
+    python manage.py incident_dead_letters --limit 100 --event-type estado_actualizado
+    python manage.py incident_dead_letters --replay             # devuelve hasta 1000 a la cola
+    python manage.py incident_dead_letters --replay --event-type incidente_validado --limit 50
+    python manage.py incident_dead_letters --discard            # vacía la cuarentena
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from apps.incidents.dead_letters import DeadLetterQueue
+
+
+class Command(BaseCommand):
+    help = 'Lista, reprocesa o descarta los eventos de incidencias en cuarentena'
+
+    def add_arguments(self, parser):
+        action = parser.add_mutually_exclusive_group()
+        action.add_argument('--replay', action='store_true', help='Devolver a dashboard.incidents.queue')
+        action.add_argument('--discard', action='store_true', help='Eliminar de la cuarentena')
+        parser.add_argument('--limit', type=int, default=None, help='Máximo de mensajes (20 al listar, 1000 al reprocesar)')
+        parser.add_argument('--event-type', help='Solo eventos de este tipo')
+
+    def handle(self, *args, **options):
+        queue = DeadLetterQueue()
+        try:
+            if options['replay']:
+                result = queue.replay(limit=options['limit'] or 1000, event_type=options['event_type'])
+                if not result['success']:
+                    raise CommandError(result['error'])
+                self.stdout.write(self.style.SUCCESS(
+                    f"🔁 {result['replayed']} eventos reprocesados, {result['failed']} fallidos"
+                ))
+            elif options['discard']:
+                result = queue.discard(limit=options['limit'], event_type=options['event_type'])
+                if not result['success']:
+                    raise CommandError(result['error'])
+                self.stdout.write(self.style.SUCCESS(f"🗑️ {result['discarded']} eventos descartados"))
+            else:
+                result = queue.inspect(limit=options['limit'] or 20, event_type=options['event_type'])
+                if not result['success']:
+                    raise CommandError(result['error'])
+                self.stdout.write(f"Eventos en cuarentena: {result['total']}")
+                for message in result['messages']:
+                    self.stdout.write(
+                        f"- {message['event_type'] or '?'} | incidente {message['incident_id'] or '?'} | "
+                        f"{message['routing_key']} | intentos {message['attempts']} | "
+                        f"{message['dead_lettered_at'] or ''}\n    {message['error'] or ''}"
+                    )
+        finally:
+            queue.close()
@@ -0,0 +1,26 @@
+"""
+Comando Django para borrar registros antiguos del ledger de eventos procesados.
+
+Uso:
+    python manage.py prune_event_ledger                 # EVENT_LEDGER_RETENTION_DAYS
+    python manage.py prune_event_ledger --days 7 --consumer dashboard.incidents.queue
+
+Un evento reentregado después de la retención se volvería a aplicar: la
+retención debe superar el tiempo máximo de reintentos y de cuarentena.
+"""
+
+from django.core.management.base import BaseCommand
+from apps.incidents.event_ledger import EventLedger
+from apps.incidents.incident_consumer import IncidentDashboardConsumer
+
+
+class Command(BaseCommand):
+    help = 'Borra del ledger de eventos procesados los registros más antiguos que la retención'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help='Días de retención')
+        parser.add_argument('--consumer', default=IncidentDashboardConsumer.QUEUE_NAME)
+
+    def handle(self, *args, **options):
+        deleted = EventLedger(options['consumer']).prune(days=options['days'])
+        self.stdout.write(self.style.SUCCESS(f"🧹 {deleted} registros eliminados del ledger"))
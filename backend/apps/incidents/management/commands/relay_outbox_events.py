@@ -0,0 +1,39 @@
+"""
+Comando Django para publicar en RabbitMQ los eventos del outbox.
+
+Uso:
+    python manage.py relay_outbox_events
+    python manage.py relay_outbox_events --batch-size 500 --poll-interval 0.5
+    python manage.py relay_outbox_events --once   # drena lo pendiente y termina
+
+Se pueden ejecutar varios procesos a la vez: cada uno reclama lotes
+distintos con SELECT ... FOR UPDATE SKIP LOCKED.
+"""
+
+from django.core.management.base import BaseCommand
+from apps.incidents.outbox_relay import OutboxRelay
+
+
+class Command(BaseCommand):
+    help = 'Publica los OutboxEvent pendientes con publisher confirms y backoff exponencial'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--poll-interval', type=float, default=None, help='Segundos entre ciclos')
+        parser.add_argument('--max-attempts', type=int, default=None)
+        parser.add_argument('--once', action='store_true', help='Drenar una vez y salir')
+
+    def handle(self, *args, **options):
+        relay = OutboxRelay(batch_size=options['batch_size'], max_attempts=options['max_attempts'])
+        if options['once']:
+            result = relay.drain()
+            relay.publisher.close()
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ {result['published']} publicados, {result['retried']} a reintentar, "
+                f"{result['failed']} fallidos"
+            ))
+            return
+
+        self.stdout.write(self.style.SUCCESS('🚚 Relay del outbox en ejecución (Ctrl+C para detener)'))
+        relay.run(poll_interval=options['poll_interval'])
+        self.stdout.write(self.style.SUCCESS(f"✅ Relay detenido: {relay.stats}"))
@@ -0,0 +1,22 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes', '0007_routeleg'),
+        ('incidents', '0002_remove_incident_incidents_status_0ce7fe_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='incident',
+            name='zone',
+            field=models.ForeignKey(blank=True, help_text='Zona que contiene la ubicación (asignada con apps/routes/zone_index.py)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='incidents', to='routes.cleaningzone'),
+        ),
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(fields=['zone', 'status'], name='incidents_zone_status_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incidents', '0003_incident_zone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxevent',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, help_text='No reintentar antes de esta fecha (backoff exponencial del relay)', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='outboxevent',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['created_at'], name='outbox_pending_idx'),
+        ),
+    ]
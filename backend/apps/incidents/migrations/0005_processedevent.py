@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incidents', '0004_outboxevent_next_attempt_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessedEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('consumer', models.CharField(help_text='Consumer que aplicó el evento (ej: dashboard.incidents.queue)', max_length=100)),
+                ('event_id', models.UUIDField(help_text='event_id del payload publicado por IncidentEventService')),
+                ('event_type', models.CharField(blank=True, default='', max_length=50)),
+                ('processed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Evento Procesado',
+                'verbose_name_plural': 'Eventos Procesados',
+                'db_table': 'processed_events',
+                'indexes': [models.Index(fields=['processed_at'], name='processed_events_at_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='processedevent',
+            constraint=models.UniqueConstraint(fields=('consumer', 'event_id'), name='processed_events_unique'),
+        ),
+    ]
@@ -73,6 +73,14 @@ class Incident(models.Model):
         null=True,
         help_text='Dirección aproximada'
     )
+    zone = models.ForeignKey(
+        'routes.CleaningZone',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='incidents',
+        help_text='Zona que contiene la ubicación (asignada con apps/routes/zone_index.py)'
+    )
     
     # Estado y seguimiento
     status = models.CharField(
@@ -98,6 +106,9 @@ class Incident(models.Model):
         verbose_name = 'Incidente'
         verbose_name_plural = 'Incidentes'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['zone', 'status'], name='incidents_zone_status_idx'),
+        ]
     
     def __str__(self):
         # Mostrar tipo y un fragmento de la descripción o la dirección
@@ -246,6 +257,11 @@ class OutboxEvent(models.Model):
         default=0,
         help_text='Número de intentos de publicación'
     )
+    next_attempt_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text='No reintentar antes de esta fecha (backoff exponencial del relay)'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     published_at = models.DateTimeField(blank=True, null=True)
     error_message = models.TextField(blank=True, null=True)
@@ -258,7 +274,43 @@ class OutboxEvent(models.Model):
         indexes = [
             models.Index(fields=['status', 'created_at']),
             models.Index(fields=['aggregate_type', 'aggregate_id']),
+            models.Index(
+                fields=['created_at'],
+                name='outbox_pending_idx',
+                condition=models.Q(status='pending')
+            ),
         ]
     
     def __str__(self):
         return f"{self.event_type} - {self.status}"
+
+
+class ProcessedEvent(models.Model):
+    """
+    Registro de eventos ya aplicados por un consumer (idempotencia).
+    La restricción única (consumer, event_id) descarta las reentregas.
+    """
+    id = models.BigAutoField(primary_key=True)
+    consumer = models.CharField(
+        max_length=100,
+        help_text='Consumer que aplicó el evento (ej: dashboard.incidents.queue)'
+    )
+    event_id = models.UUIDField(
+        help_text='event_id del payload publicado por IncidentEventService'
+    )
+    event_type = models.CharField(max_length=50, blank=True, default='')
+    processed_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'processed_events'
+        verbose_name = 'Evento Procesado'
+        verbose_name_plural = 'Eventos Procesados'
+        constraints = [
+            models.UniqueConstraint(fields=['consumer', 'event_id'], name='processed_events_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['processed_at'], name='processed_events_at_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.consumer} - {self.event_id}"
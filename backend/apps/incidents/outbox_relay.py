@@ -0,0 +1,164 @@
+"""
+Relay del Transactional Outbox: publica en RabbitMQ los OutboxEvent pendientes.
+
+Cada ciclo reclama un lote con SELECT ... FOR UPDATE SKIP LOCKED, lo publica
+con publisher confirms y marca el resultado en bulk dentro de la misma
+transacción. Como los lotes bloqueados se saltan, varios procesos relay
+pueden correr en paralelo sin publicar dos veces la misma fila; el
+throughput escala con la cantidad de procesos.
+
+Los fallos se reintentan con backoff exponencial (next_attempt_at) y tras
+OUTBOX_MAX_ATTEMPTS intentos la fila queda 'failed' para revisión manual.
+"""
+
+import logging
+import random
+import signal
+import time
+from datetime import timedelta
+from typing import Dict, List, Optional
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .incident_events_service import IncidentEventService
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+
+def retry_delay(attempts: int, base: float, maximum: float) -> float:
+    """Segundos de espera tras el intento número attempts (exponencial con jitter)"""
+    delay = min(base * (2 ** max(attempts - 1, 0)), maximum)
+    return delay * random.uniform(0.8, 1.2)
+
+
+class OutboxRelay:
+    """Publica lotes de OutboxEvent; una instancia por proceso"""
+
+    def __init__(
+        self,
+        publisher: Optional[IncidentEventService] = None,
+        batch_size: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        backoff_base: Optional[float] = None,
+        backoff_max: Optional[float] = None
+    ):
+        """
+        Args:
+            publisher: Servicio con publish_batch (default: publicación directa, sin outbox)
+            batch_size: Filas reclamadas por ciclo
+            max_attempts: Intentos antes de marcar la fila como 'failed'
+            backoff_base: Segundos de espera tras el primer fallo
+            backoff_max: Tope de espera entre reintentos
+        """
+        self.publisher = publisher or IncidentEventService(use_outbox=False)
+        self.batch_size = batch_size or getattr(settings, 'OUTBOX_BATCH_SIZE', 200)
+        self.max_attempts = max_attempts or getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 10)
+        self.backoff_base = backoff_base or getattr(settings, 'OUTBOX_BACKOFF_BASE', 2)
+        self.backoff_max = backoff_max or getattr(settings, 'OUTBOX_BACKOFF_MAX', 600)
+        self.stats = {'published': 0, 'retried': 0, 'failed': 0, 'batches': 0}
+        self._stopping = False
+
+    def _claimable(self):
+        now = timezone.now()
+        return (
+            OutboxEvent.objects
+            .select_for_update(skip_locked=True)
+            .filter(status='pending')
+            .filter(Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now))
+            .order_by('created_at')
+            .only('id', 'routing_key', 'payload', 'attempts')
+        )
+
+    def relay_batch(self) -> Dict:
+        """
+        Reclama, publica y marca un lote.
+
+        Returns:
+            Conteos del lote (claimed, published, retried, failed)
+        """
+        with transaction.atomic():
+            events: List[OutboxEvent] = list(self._claimable()[:self.batch_size])
+            if not events:
+                return {'claimed': 0, 'published': 0, 'retried': 0, 'failed': 0}
+
+            errors = self.publisher.publish_batch([(e.routing_key, e.payload) for e in events])
+            now = timezone.now()
+
+            published_ids = [e.id for e, error in zip(events, errors) if error is None]
+            if published_ids:
+                OutboxEvent.objects.filter(id__in=published_ids).update(
+                    status='published',
+                    published_at=now,
+                    error_message=None,
+                    next_attempt_at=None
+                )
+
+            failed = []
+            for event, error in zip(events, errors):
+                if error is None:
+                    continue
+                event.attempts += 1
+                event.error_message = error[:1000]
+                if event.attempts >= self.max_attempts:
+                    event.status = 'failed'
+                    event.next_attempt_at = None
+                else:
+                    event.status = 'pending'
+                    event.next_attempt_at = now + timedelta(
+                        seconds=retry_delay(event.attempts, self.backoff_base, self.backoff_max)
+                    )
+                failed.append(event)
+            if failed:
+                OutboxEvent.objects.bulk_update(
+                    failed, ['attempts', 'status', 'error_message', 'next_attempt_at']
+                )
+
+        result = {
+            'claimed': len(events),
+            'published': len(published_ids),
+            'retried': sum(1 for e in failed if e.status == 'pending'),
+            'failed': sum(1 for e in failed if e.status == 'failed'),
+        }
+        self.stats['batches'] += 1
+        for key in ('published', 'retried', 'failed'):
+            self.stats[key] += result[key]
+        if failed:
+            logger.warning(
+                f"⚠️ Outbox: {len(failed)} de {len(events)} eventos sin publicar ({failed[0].error_message})"
+            )
+        return result
+
+    def drain(self) -> Dict:
+        """Publica lotes hasta que no queden eventos disponibles"""
+        totals = {'claimed': 0, 'published': 0, 'retried': 0, 'failed': 0}
+        while not self._stopping:
+            result = self.relay_batch()
+            for key in totals:
+                totals[key] += result[key]
+            # Lote incompleto o sin ningún publicado: esperar al próximo ciclo
+            if result['claimed'] < self.batch_size or not result['published']:
+                break
+        return totals
+
+    def stop(self, *args):
+        self._stopping = True
+
+    def run(self, poll_interval: Optional[float] = None):
+        """Bucle principal: drena, espera poll_interval y repite hasta SIGTERM/SIGINT"""
+        poll_interval = poll_interval or getattr(settings, 'OUTBOX_POLL_INTERVAL', 1.0)
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        logger.info(f"🚚 Relay del outbox iniciado (lote {self.batch_size}, cada {poll_interval}s)")
+        while not self._stopping:
+            try:
+                result = self.drain()
+                if result['published']:
+                    logger.info(f"📤 Outbox: {result['published']} eventos publicados")
+            except Exception as e:
+                logger.error(f"❌ Error en el relay del outbox: {e}")
+            time.sleep(poll_interval)
+        self.publisher.close()
+        logger.info(f"🛑 Relay del outbox detenido: {self.stats}")
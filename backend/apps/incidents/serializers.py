@@ -48,10 +48,10 @@ class IncidentSerializer(serializers.ModelSerializer):
             'id', 'reporter_kind', 'reporter_id', 
             'tipo', 'descripcion', 'estado', 'direccion',
             'latitude', 'longitude', 'lat', 'lon',
-            'ubicacion', 'photo_url',
+            'ubicacion', 'photo_url', 'zone',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'reporter_id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'reporter_id', 'zone', 'created_at', 'updated_at']
     
     def get_ubicacion(self, obj):
         """Retorna ubicación en formato GeoJSON"""
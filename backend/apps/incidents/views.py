@@ -6,6 +6,7 @@ Compatible con incident-service de Go.
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.db import transaction
 from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
@@ -40,7 +41,7 @@ class IncidentViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-    filterset_fields = ['incident_type', 'status', 'reporter_kind']
+    filterset_fields = ['incident_type', 'status', 'reporter_kind', 'zone']
     search_fields = ['description', 'address']
     ordering_fields = ['created_at', 'status']
     ordering = ['-created_at']
@@ -51,9 +52,10 @@ class IncidentViewSet(viewsets.ModelViewSet):
             return IncidentCreateSerializer
         return IncidentSerializer
     
+    @transaction.atomic
     def perform_create(self, serializer):
         """
-        Crea un incidente y publica evento a RabbitMQ.
+        Crea un incidente y encola su evento en el outbox (misma transacción).
         Compatible con offline-first (idempotency_key).
         """
         incident = serializer.save()
@@ -65,12 +67,13 @@ class IncidentViewSet(viewsets.ModelViewSet):
             payload={'initial_data': serializer.data}
         )
         
-        # Publicar evento a RabbitMQ
+        # Encolar evento (lo publica el relay del outbox)
         event_service = get_incident_event_service()
         event_service.publish_incident_submitted(incident)
     
+    @transaction.atomic
     def perform_update(self, serializer):
-        """Actualiza incidente y publica evento de cambio"""
+        """Actualiza incidente y encola evento de cambio"""
         old_status = serializer.instance.status
         incident = serializer.save()
         
@@ -109,23 +112,24 @@ class IncidentViewSet(viewsets.ModelViewSet):
         event_service = get_incident_event_service()
         
         if action_type == 'validate':
-            # Validar incidente
-            incident.status = 'incidente_valido'
-            incident.save()
-            
-            # Publicar evento
-            event_service.publish_incident_validated(incident, validator_id, notes)
-            
-            # Registrar en historial
-            IncidentEvent.objects.create(
-                incident=incident,
-                event_type='incidente_validado',
-                payload={
-                    'validator_id': validator_id,
-                    'notes': notes,
-                    'old_status': old_status
-                }
-            )
+            with transaction.atomic():
+                # Validar incidente
+                incident.status = 'incidente_valido'
+                incident.save()
+                
+                # Encolar evento
+                event_service.publish_incident_validated(incident, validator_id, notes)
+                
+                # Registrar en historial
+                IncidentEvent.objects.create(
+                    incident=incident,
+                    event_type='incidente_validado',
+                    payload={
+                        'validator_id': validator_id,
+                        'notes': notes,
+                        'old_status': old_status
+                    }
+                )
             
             return Response({
                 'success': True,
@@ -134,23 +138,24 @@ class IncidentViewSet(viewsets.ModelViewSet):
             })
             
         elif action_type == 'reject':
-            # Rechazar incidente
-            incident.status = 'incidente_rechazado'
-            incident.save()
-            
-            # Publicar evento
-            event_service.publish_incident_rejected(incident, validator_id, notes)
-            
-            # Registrar en historial
-            IncidentEvent.objects.create(
-                incident=incident,
-                event_type='incidente_rechazado',
-                payload={
-                    'validator_id': validator_id,
-                    'reason': notes,
-                    'old_status': old_status
-                }
-            )
+            with transaction.atomic():
+                # Rechazar incidente
+                incident.status = 'incidente_rechazado'
+                incident.save()
+                
+                # Encolar evento
+                event_service.publish_incident_rejected(incident, validator_id, notes)
+                
+                # Registrar en historial
+                IncidentEvent.objects.create(
+                    incident=incident,
+                    event_type='incidente_rechazado',
+                    payload={
+                        'validator_id': validator_id,
+                        'reason': notes,
+                        'old_status': old_status
+                    }
+                )
             
             return Response({
                 'success': True,
@@ -170,24 +175,25 @@ class IncidentViewSet(viewsets.ModelViewSet):
         serializer = IncidentAttachmentSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        attachment = serializer.save(incident=incident)
-        
-        # Nota: no se usa campo photos_count en el modelo actual;
-        # el número de adjuntos puede consultarse con incident.attachments.count()
-        
-        # Publicar evento
-        event_service = get_incident_event_service()
-        event_service.publish_attachment_added(incident, attachment)
-        
-        # Registrar en historial
-        IncidentEvent.objects.create(
-            incident=incident,
-            event_type='attachment_added',
-            payload={
-                'attachment_id': str(attachment.id),
-                'file_url': attachment.file_url
-            }
-        )
+        with transaction.atomic():
+            attachment = serializer.save(incident=incident)
+            
+            # Nota: no se usa campo photos_count en el modelo actual;
+            # el número de adjuntos puede consultarse con incident.attachments.count()
+            
+            # Encolar evento
+            event_service = get_incident_event_service()
+            event_service.publish_attachment_added(incident, attachment)
+            
+            # Registrar en historial
+            IncidentEvent.objects.create(
+                incident=incident,
+                event_type='attachment_added',
+                payload={
+                    'attachment_id': str(attachment.id),
+                    'file_url': attachment.file_url
+                }
+            )
         
         return Response({
             'success': True,
@@ -0,0 +1 @@
+"""Mensajería RabbitMQ compartida por las apps (no es una app de Django)"""
@@ -0,0 +1,7 @@
+from django.urls import path
+from .consumers import NotificationConsumer, TeamNotificationConsumer
+
+websocket_urlpatterns = [
+    path('ws/notifications/', NotificationConsumer.as_asgi()),
+    path('ws/notifications/team/<str:team_id>/', TeamNotificationConsumer.as_asgi()),
+]
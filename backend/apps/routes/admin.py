@@ -1,5 +1,5 @@
 from django.contrib.gis import admin
-from .models import CleaningZone, Route, RouteWaypoint
+from .models import CleaningZone, Route, RouteWaypoint, ZoneDistanceMatrix, RoadSnap, RouteLeg
 
 
 @admin.register(CleaningZone)
@@ -54,3 +54,28 @@ class RouteWaypointAdmin(admin.GISModelAdmin):
     list_filter = ['waypoint_type']
     search_fields = ['route__route_name', 'address']
     ordering = ['route', 'waypoint_order']
+
+
+
+@admin.register(ZoneDistanceMatrix)
+class ZoneDistanceMatrixAdmin(admin.ModelAdmin):
+    list_display = ['zone', 'size', 'fingerprint', 'updated_at']
+    search_fields = ['zone__zone_name']
+    exclude = ['coordinates', 'durations', 'distances']
+    readonly_fields = ['zone', 'size', 'fingerprint', 'created_at', 'updated_at']
+
+
+@admin.register(RoadSnap)
+class RoadSnapAdmin(admin.GISModelAdmin):
+    list_display = ['cell', 'road_name', 'created_at']
+    search_fields = ['cell', 'road_name']
+    readonly_fields = ['cell', 'created_at']
+
+
+@admin.register(RouteLeg)
+class RouteLegAdmin(admin.ModelAdmin):
+    list_display = ['route', 'leg_index', 'zone', 'duration_seconds', 'distance_meters', 'step_count']
+    list_filter = ['zone']
+    search_fields = ['route__route_name']
+    exclude = ['annotation_durations', 'annotation_distances', 'annotation_speeds', 'annotation_nodes']
+    readonly_fields = ['route', 'zone', 'from_waypoint', 'to_waypoint', 'created_at']
@@ -0,0 +1,140 @@
+"""
+Estimaciones en línea recta para cuando OSRM no está disponible.
+
+Generan respuestas con la misma forma que OSRM (/route, /trip, /table) para
+que pasen por los mismos _process_*_response y el resto del código no
+distinga el origen. La distancia es la de gran círculo multiplicada por un
+factor de rodeo (OSRM_FALLBACK_DETOUR_FACTOR) y la duración asume una
+velocidad media urbana (OSRM_FALLBACK_SPEED_KMH). Todas llevan
+'approximate': True.
+"""
+
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+from django.conf import settings
+
+from .polyline import encode
+
+EARTH_RADIUS_METERS = 6371000
+
+
+def _params() -> Tuple[float, float]:
+    detour = getattr(settings, 'OSRM_FALLBACK_DETOUR_FACTOR', 1.3)
+    speed_mps = getattr(settings, 'OSRM_FALLBACK_SPEED_KMH', 25) / 3.6
+    return detour, speed_mps
+
+
+def haversine_matrix(a: Sequence[Tuple[float, float]], b: Sequence[Tuple[float, float]]) -> np.ndarray:
+    """Distancias de gran círculo (metros) entre cada (lon, lat) de a y de b"""
+    a = np.radians(np.asarray(a, dtype=np.float64).reshape(-1, 2))
+    b = np.radians(np.asarray(b, dtype=np.float64).reshape(-1, 2))
+    dlon = b[None, :, 0] - a[:, None, 0]
+    dlat = b[None, :, 1] - a[:, None, 1]
+    h = np.sin(dlat / 2) ** 2 + np.cos(a[:, None, 1]) * np.cos(b[None, :, 1]) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(np.clip(h, 0, 1)))
+
+
+def _geometry(path: List[Tuple[float, float]], geometries: str):
+    coordinates = [[float(lon), float(lat)] for lon, lat in path]
+    if geometries == 'polyline6':
+        return encode(coordinates, precision=6)
+    if geometries == 'polyline':
+        return encode(coordinates, precision=5)
+    return {'type': 'LineString', 'coordinates': coordinates}
+
+
+def _legs(path: List[Tuple[float, float]]) -> List[Dict]:
+    detour, speed_mps = _params()
+    legs = []
+    for start, end in zip(path[:-1], path[1:]):
+        distance = float(haversine_matrix([start], [end])[0, 0]) * detour
+        legs.append({
+            'distance': round(distance, 1),
+            'duration': round(distance / speed_mps, 1),
+            'steps': [],
+            'summary': '',
+            'weight': round(distance / speed_mps, 1),
+        })
+    return legs
+
+
+def _route(path: List[Tuple[float, float]], geometries: str) -> Dict:
+    legs = _legs(path)
+    return {
+        'geometry': _geometry(path, geometries),
+        'distance': round(sum(leg['distance'] for leg in legs), 1),
+        'duration': round(sum(leg['duration'] for leg in legs), 1),
+        'legs': legs,
+    }
+
+
+def route_data(coordinates: Sequence[Tuple[float, float]], geometries: str = 'geojson') -> Dict:
+    """Respuesta tipo /route: recorre los puntos en el orden dado"""
+    path = [tuple(c) for c in coordinates]
+    return {
+        'code': 'Ok',
+        'approximate': True,
+        'routes': [_route(path, geometries)],
+        'waypoints': [{'location': list(c), 'name': '', 'distance': 0} for c in path],
+    }
+
+
+def trip_data(
+    coordinates: Sequence[Tuple[float, float]],
+    roundtrip: bool = True,
+    source: str = 'first',
+    destination: str = 'last',
+    geometries: str = 'geojson'
+) -> Dict:
+    """
+    Respuesta tipo /trip con orden por vecino más cercano desde el primer punto
+    (o el primero sin fijar con source='any'); con destination='last' y sin
+    roundtrip el último punto queda al final.
+    """
+    path = [tuple(c) for c in coordinates]
+    count = len(path)
+    distances = haversine_matrix(path, path)
+    fixed_last = destination == 'last' and not roundtrip and count > 1
+    pending = set(range(count))
+    current = 0
+    order = [current]
+    pending.discard(current)
+    if fixed_last:
+        pending.discard(count - 1)
+    while pending:
+        current = min(pending, key=lambda j: distances[current, j])
+        order.append(current)
+        pending.discard(current)
+    if fixed_last:
+        order.append(count - 1)
+
+    visit = [path[i] for i in order]
+    if roundtrip and count > 1:
+        visit.append(path[order[0]])
+    position = {index: pos for pos, index in enumerate(order)}
+    return {
+        'code': 'Ok',
+        'approximate': True,
+        'trips': [_route(visit, geometries)],
+        'waypoints': [
+            {'location': list(path[i]), 'name': '', 'distance': 0, 'waypoint_index': position[i], 'trips_index': 0}
+            for i in range(count)
+        ],
+    }
+
+
+def table_data(
+    coordinates: Sequence[Tuple[float, float]],
+    sources: Sequence[int],
+    destinations: Sequence[int]
+) -> Dict:
+    """Respuesta tipo /table (durations y distances en listas)"""
+    detour, speed_mps = _params()
+    coords = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+    distances = haversine_matrix(coords[list(sources)], coords[list(destinations)]) * detour
+    return {
+        'code': 'Ok',
+        'approximate': True,
+        'durations': np.round(distances / speed_mps, 1).tolist(),
+        'distances': np.round(distances, 1).tolist(),
+    }
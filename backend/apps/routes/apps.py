@@ -8,4 +8,4 @@ class RoutesConfig(AppConfig):
     
     def ready(self):
         # Importar signals si los hay
-        pass
\ No newline at end of file
+        from . import signals  # noqa: F401
\ No newline at end of file
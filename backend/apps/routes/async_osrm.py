@@ -0,0 +1,383 @@
+"""
+Cliente OSRM asíncrono para el despliegue ASGI.
+
+Replica la API de OSRMService sobre httpx.AsyncClient (pool de conexiones
+keep-alive) para que vistas y consumers async puedan esperar el cálculo de
+rutas sin bloquear un thread del servidor. Comparte con el cliente síncrono
+el circuit breaker y la RouteCache. Incluye helpers de fan-out concurrente
+acotado por semáforo.
+
+Hay un cliente por event loop (get_async_osrm_service); al apagar el loop se
+debe llamar a close_async_osrm_service() para cerrar su pool de conexiones.
+"""
+
+import asyncio
+import logging
+import weakref
+from typing import Awaitable, Dict, List, Optional, Sequence, Tuple
+import httpx
+import numpy as np
+from django.conf import settings
+
+from . import approximate
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .matrix import dedupe_coordinates
+from .osrm_service import DEFAULT_TIMEOUTS, OSRMService, osrm_service
+from .route_cache import RouteCache
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncOSRMService:
+    """Cliente asíncrono para interactuar con el servicio OSRM"""
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        pool_size: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        timeouts: Optional[Dict[str, Tuple[float, float]]] = None,
+        concurrency: Optional[int] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        cache: Optional[RouteCache] = None
+    ):
+        """
+        Inicializa el cliente asíncrono.
+
+        Args:
+            base_url: URL base del servicio OSRM (default: settings.OSRM_URL)
+            pool_size: Máximo de conexiones simultáneas/keep-alive
+            max_retries: Reintentos ante errores de conexión
+            timeouts: Timeouts (conexión, lectura) por endpoint
+            concurrency: Límite de peticiones en vuelo para los helpers de fan-out
+            transport: Transporte httpx alternativo (p. ej. httpx.MockTransport)
+            breaker: Circuit breaker (default: el del cliente síncrono, compartido)
+            cache: Caché de /route, /trip y /table (default: la del cliente síncrono)
+        """
+        base_url = base_url or getattr(settings, 'OSRM_URL', 'http://osrm:5000')
+        self.base_url = base_url.rstrip('/')
+        self.pool_size = pool_size or getattr(settings, 'OSRM_POOL_SIZE', 10)
+        self.max_retries = (
+            max_retries if max_retries is not None
+            else getattr(settings, 'OSRM_MAX_RETRIES', 2)
+        )
+        self.timeouts = dict(DEFAULT_TIMEOUTS)
+        self.timeouts.update(getattr(settings, 'OSRM_TIMEOUTS', {}))
+        if timeouts:
+            self.timeouts.update(timeouts)
+        self.concurrency = concurrency or self.pool_size
+        self.max_table_size = getattr(settings, 'OSRM_MAX_TABLE_SIZE', 100)
+        self.breaker = breaker or osrm_service.breaker
+        self.cache = cache if cache is not None else osrm_service.cache
+
+        if transport is None:
+            transport = httpx.AsyncHTTPTransport(retries=self.max_retries)
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            transport=transport,
+            limits=httpx.Limits(
+                max_connections=self.pool_size,
+                max_keepalive_connections=self.pool_size
+            )
+        )
+
+    def _cache_key(self, service: str, profile: str, coordinates, params: Dict) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return self.cache.make_key(service, profile, coordinates, params)
+
+    async def _get_json(
+        self,
+        endpoint: str,
+        path: str,
+        params: Optional[Dict] = None,
+        cache_key: Optional[str] = None
+    ) -> Dict:
+        """GET asíncrono con el timeout propio del endpoint (y caché si hay cache_key)"""
+        if cache_key and self.cache is not None:
+            # RouteCache puede consultar Redis: fuera del event loop
+            cached = await asyncio.to_thread(self.cache.get, cache_key)
+            if cached is not None:
+                return cached
+        data = await self._request_json(endpoint, path, params)
+        if cache_key and self.cache is not None and data.get('code') == 'Ok':
+            await asyncio.to_thread(self.cache.set, cache_key, data)
+        return data
+
+    async def _request_json(self, endpoint: str, path: str, params: Optional[Dict] = None) -> Dict:
+        connect, read = self.timeouts.get(endpoint, (3.05, 30))
+        self.breaker.check()
+        try:
+            response = await self.client.get(
+                path,
+                params=params,
+                timeout=httpx.Timeout(read, connect=connect)
+            )
+        except httpx.TransportError:
+            self.breaker.record_failure()
+            raise
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        response.raise_for_status()
+        return response.json()
+
+    async def calculate_route(
+        self,
+        coordinates: List[Tuple[float, float]],
+        profile: str = 'driving',
+        overview: str = 'full',
+        geometries: str = 'geojson'
+    ) -> Dict:
+        """Versión asíncrona de OSRMService.calculate_route"""
+        coords_string = ';'.join([f"{lon},{lat}" for lon, lat in coordinates])
+        params = {
+            'overview': overview,
+            'geometries': geometries,
+            'steps': 'true',
+            'annotations': 'true'
+        }
+
+        try:
+            data = await self._get_json(
+                'route', f"/route/v1/{profile}/{coords_string}", params,
+                cache_key=self._cache_key('route', profile, coordinates, params)
+            )
+            if data.get('code') == 'Ok':
+                return OSRMService._process_route_response(data, geometries)
+            return {'success': False, 'error': data.get('message', 'Unknown error')}
+
+        except CircuitOpenError:
+            return OSRMService._process_route_response(approximate.route_data(coordinates, geometries), geometries)
+
+        except httpx.TimeoutException:
+            logger.error("Timeout al conectar con OSRM (async)")
+            return {'success': False, 'error': 'Timeout al calcular ruta'}
+
+        except Exception as e:
+            logger.error(f"Error al calcular ruta (async): {e}")
+            return {'success': False, 'error': str(e)}
+
+    async def optimize_route(
+        self,
+        coordinates: List[Tuple[float, float]],
+        roundtrip: bool = True,
+        source: str = 'first',
+        destination: str = 'last',
+        geometries: str = 'geojson'
+    ) -> Dict:
+        """Versión asíncrona de OSRMService.optimize_route"""
+        coords_string = ';'.join([f"{lon},{lat}" for lon, lat in coordinates])
+        params = {
+            'roundtrip': str(roundtrip).lower(),
+            'source': source,
+            'destination': destination,
+            'geometries': geometries,
+            'overview': 'full',
+            'steps': 'true'
+        }
+
+        try:
+            data = await self._get_json(
+                'trip', f"/trip/v1/driving/{coords_string}", params,
+                cache_key=self._cache_key('trip', 'driving', coordinates, params)
+            )
+            if data.get('code') == 'Ok':
+                return OSRMService._process_trip_response(data, geometries)
+            return {'success': False, 'error': data.get('message', 'Unknown error')}
+
+        except CircuitOpenError:
+            data = approximate.trip_data(coordinates, roundtrip, source, destination, geometries)
+            return OSRMService._process_trip_response(data, geometries)
+
+        except Exception as e:
+            logger.error(f"Error al optimizar ruta (async): {e}")
+            return {'success': False, 'error': str(e)}
+
+    async def table_request(
+        self,
+        coordinates: List[Tuple[float, float]],
+        sources: List[int],
+        destinations: List[int],
+        profile: str = 'driving'
+    ) -> Dict:
+        """Petición /table única; retorna la respuesta cruda de OSRM"""
+        coords_string = ';'.join([f"{lon},{lat}" for lon, lat in coordinates])
+        params = {
+            'sources': ';'.join([str(i) for i in sources]),
+            'destinations': ';'.join([str(i) for i in destinations]),
+            'annotations': 'duration,distance'
+        }
+        try:
+            return await self._get_json(
+                'table', f"/table/v1/{profile}/{coords_string}", params,
+                cache_key=self._cache_key('table', profile, coordinates, params)
+            )
+        except CircuitOpenError:
+            return approximate.table_data(coordinates, sources, destinations)
+
+    async def calculate_matrix(
+        self,
+        sources: List[Tuple[float, float]],
+        destinations: Optional[List[Tuple[float, float]]] = None
+    ) -> Dict:
+        """
+        Versión asíncrona de OSRMService.calculate_matrix (modo compacto).
+        Las matrices grandes se piden por bloques concurrentes.
+
+        Returns:
+            Dict con 'durations' y 'distances' como np.ndarray float32 y
+            approximate=True si algún bloque se estimó en línea recta
+        """
+        sources = list(sources)
+        destinations = sources if destinations is None else list(destinations)
+        n, m = len(sources), len(destinations)
+        size = max(self.max_table_size // 2, 1)
+        durations = np.full((n, m), np.nan, dtype=np.float32)
+        distances = np.full((n, m), np.nan, dtype=np.float32)
+        approximate = []
+
+        async def _tile(rows: slice, cols: slice):
+            coordinates, source_idx, destination_idx = dedupe_coordinates(sources[rows], destinations[cols])
+            data = await self.table_request(coordinates, source_idx, destination_idx)
+            if data.get('code') != 'Ok':
+                raise RuntimeError(data.get('message', 'Unknown error'))
+            if data.get('approximate'):
+                approximate.append(True)
+            durations[rows, cols] = np.array(data.get('durations', []), dtype=np.float32)
+            if data.get('distances') is not None:
+                distances[rows, cols] = np.array(data['distances'], dtype=np.float32)
+
+        tiles = [
+            _tile(slice(i, min(i + size, n)), slice(j, min(j + size, m)))
+            for i in range(0, n, size)
+            for j in range(0, m, size)
+        ]
+
+        try:
+            await self.gather_limited(tiles)
+        except Exception as e:
+            logger.error(f"Error al calcular matriz (async): {e}")
+            return {'success': False, 'error': str(e)}
+
+        return {
+            'success': True,
+            'durations': durations,
+            'distances': distances,
+            'sources': sources,
+            'destinations': destinations,
+            'tiles': len(tiles),
+            'approximate': bool(approximate)
+        }
+
+    async def match_route(
+        self,
+        coordinates: List[Tuple[float, float]],
+        timestamps: Optional[List[int]] = None,
+        radiuses: Optional[List[int]] = None
+    ) -> Dict:
+        """Versión asíncrona de OSRMService.match_route"""
+        coords_string = ';'.join([f"{lon},{lat}" for lon, lat in coordinates])
+        params = {
+            'geometries': 'geojson',
+            'overview': 'full',
+            'annotations': 'true'
+        }
+        if timestamps:
+            params['timestamps'] = ';'.join([str(t) for t in timestamps])
+        if radiuses:
+            params['radiuses'] = ';'.join([str(r) for r in radiuses])
+
+        try:
+            data = await self._get_json('match', f"/match/v1/driving/{coords_string}", params)
+            if data.get('code') == 'Ok':
+                return OSRMService._process_match_response(data)
+            return {'success': False, 'error': data.get('message', 'Unknown error')}
+
+        except Exception as e:
+            logger.error(f"Error en map matching (async): {e}")
+            return {'success': False, 'error': str(e)}
+
+    async def nearest_road(self, coordinate: Tuple[float, float], number: int = 1) -> Dict:
+        """Versión asíncrona de OSRMService.nearest_road"""
+        lon, lat = coordinate
+        try:
+            data = await self._get_json('nearest', f"/nearest/v1/driving/{lon},{lat}", {'number': number})
+            if data.get('code') == 'Ok':
+                return {'success': True, 'waypoints': data.get('waypoints', [])}
+            return {'success': False, 'error': data.get('message', 'Unknown error')}
+
+        except Exception as e:
+            logger.error(f"Error al buscar punto cercano (async): {e}")
+            return {'success': False, 'error': str(e)}
+
+    async def health_check(self) -> bool:
+        """Verifica si el servicio OSRM está disponible"""
+        connect, read = self.timeouts.get('health', (2, 5))
+        try:
+            response = await self.client.get('/health', timeout=httpx.Timeout(read, connect=connect))
+            return response.status_code == 200
+        except Exception as e:
+            logger.warning(f"OSRM no disponible (async): {e}")
+            return False
+
+    # ========== FAN-OUT CONCURRENTE ==========
+
+    async def gather_limited(self, coroutines: Sequence[Awaitable], limit: Optional[int] = None) -> List:
+        """
+        Ejecuta corrutinas con asyncio.gather limitando las que están en vuelo.
+
+        Args:
+            coroutines: Corrutinas a ejecutar
+            limit: Máximo concurrente (default: self.concurrency)
+        """
+        semaphore = asyncio.Semaphore(limit or self.concurrency)
+
+        async def _run(coro):
+            async with semaphore:
+                return await coro
+
+        return await asyncio.gather(*[_run(c) for c in coroutines])
+
+    async def calculate_routes(
+        self,
+        coordinate_sets: Sequence[List[Tuple[float, float]]],
+        limit: Optional[int] = None,
+        **kwargs
+    ) -> List[Dict]:
+        """
+        Calcula muchas rutas en paralelo (p. ej. todas las zonas activas).
+        El resultado conserva el orden de entrada; los errores van por ítem.
+        """
+        return await self.gather_limited(
+            [self.calculate_route(coords, **kwargs) for coords in coordinate_sets],
+            limit=limit
+        )
+
+    async def aclose(self):
+        """Cierra el pool de conexiones"""
+        await self.client.aclose()
+
+
+# Un cliente por event loop: httpx.AsyncClient no puede compartirse entre loops.
+# Las claves son los propios loops (débiles): al recolectarse un loop su entrada
+# desaparece y un loop nuevo nunca recibe el cliente de otro.
+_async_clients: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOSRMService]' = weakref.WeakKeyDictionary()
+
+
+def get_async_osrm_service() -> AsyncOSRMService:
+    """Retorna el cliente asíncrono asociado al event loop actual"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = AsyncOSRMService()
+    return client
+
+
+async def close_async_osrm_service():
+    """Cierra el cliente del event loop actual (llamar al apagar el loop/servidor)"""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
@@ -0,0 +1,127 @@
+"""
+Escritura masiva de rutas y waypoints.
+
+Una ruta con cientos de paradas se guarda en una sola transacción con
+bulk_create en lugar de un INSERT (y una transacción) por waypoint. Los
+tramos OSRM (RouteLeg) se escriben en la misma transacción.
+"""
+
+import logging
+from typing import Dict, List, Optional, Sequence
+from django.contrib.gis.geos import Point
+from django.db import transaction
+
+from .legs import build_route_legs
+from .models import Route, RouteLeg, RouteWaypoint
+from .tiles import invalidate_layer
+
+logger = logging.getLogger(__name__)
+
+
+WAYPOINT_BATCH_SIZE = 1000
+
+
+def visit_order(osrm_result: Optional[Dict], count: int) -> List[int]:
+    """
+    Posición de visita de cada waypoint de entrada. Con /trip es el orden
+    optimizado que devolvió OSRM; en otro caso, el orden de entrada.
+    """
+    order = (osrm_result or {}).get('optimized_order') or []
+    if sorted(order) == list(range(count)):
+        return list(order)
+    return list(range(count))
+
+
+def apply_leg_metrics(ordered: Sequence[RouteWaypoint], legs: Sequence[Dict]):
+    """Asigna a cada parada (en orden de visita) el tramo OSRM que llega a ella"""
+    for position, waypoint in enumerate(ordered):
+        leg = legs[position - 1] if 0 < position <= len(legs) else None
+        waypoint.leg_duration_seconds = leg.get('duration') if leg else None
+        waypoint.leg_distance_meters = leg.get('distance') if leg else None
+
+
+def build_waypoints(
+    route: Route,
+    waypoints: Sequence[Dict],
+    waypoint_details: Optional[Sequence[Dict]] = None,
+    osrm_result: Optional[Dict] = None
+) -> List[RouteWaypoint]:
+    """
+    Construye (sin guardar) los RouteWaypoint de una ruta.
+
+    Los Point se crean directamente desde (lon, lat) con el SRID fijo, que es
+    el constructor GEOS más barato (sin parseo de WKT/GeoJSON). Con
+    osrm_result, waypoint_order sigue el orden de visita y cada parada guarda
+    la duración/distancia del tramo que llega a ella.
+    """
+    waypoint_details = waypoint_details or []
+    detail_count = len(waypoint_details)
+    order = visit_order(osrm_result, len(waypoints))
+    objects = []
+    for i, wp in enumerate(waypoints):
+        details = waypoint_details[i] if i < detail_count else {}
+        objects.append(RouteWaypoint(
+            route=route,
+            waypoint_order=order[i],
+            location=Point(float(wp['lon']), float(wp['lat']), srid=4326),
+            address=details.get('address'),
+            waypoint_type=details.get('type'),
+            estimated_service_minutes=details.get('service_minutes', 5),
+            notes=details.get('notes')
+        ))
+    if osrm_result:
+        objects.sort(key=lambda w: w.waypoint_order)
+        apply_leg_metrics(objects, osrm_result.get('legs', []))
+    return objects
+
+
+def build_route(data: Dict, osrm_result: Dict, optimize: bool) -> Route:
+    """Construye (sin guardar) una Route a partir de la solicitud y el resultado OSRM"""
+    route = Route(
+        route_name=data['route_name'],
+        zone_id=data.get('zone_id'),
+        route_geometry=osrm_result['geometry'],
+        waypoints=data['waypoints'],
+        total_distance_km=osrm_result['distance_km'],
+        estimated_duration_minutes=osrm_result['duration_minutes'],
+        optimization_algorithm='osrm' if optimize else 'osrm-direct'
+    )
+    # bulk_create no llama a save(): calcular aquí las geometrías derivadas
+    route.refresh_derived_geometries()
+    return route
+
+
+def create_routes_bulk(entries: Sequence[Dict]) -> List[Route]:
+    """
+    Guarda varias rutas con todos sus waypoints en una sola transacción.
+
+    Args:
+        entries: Lista de {'data': solicitud validada, 'osrm_result': ..., 'optimize': bool}
+
+    Returns:
+        Rutas creadas, en el mismo orden de entrada
+    """
+    routes = [build_route(e['data'], e['osrm_result'], e['optimize']) for e in entries]
+    waypoints = []
+    legs = []
+    for route, entry in zip(routes, entries):
+        route_waypoints = build_waypoints(
+            route,
+            entry['data']['waypoints'],
+            entry['data'].get('waypoint_details'),
+            entry['osrm_result']
+        )
+        waypoints.extend(route_waypoints)
+        legs.extend(build_route_legs(route, route_waypoints, entry['osrm_result'].get('legs', [])))
+
+    with transaction.atomic():
+        Route.objects.bulk_create(routes)
+        RouteWaypoint.objects.bulk_create(waypoints, batch_size=WAYPOINT_BATCH_SIZE)
+        RouteLeg.objects.bulk_create(legs, batch_size=WAYPOINT_BATCH_SIZE)
+        # bulk_create no emite post_save: invalidar la capa de teselas manualmente
+        transaction.on_commit(lambda: invalidate_layer('routes'))
+
+    logger.info(
+        f"Rutas creadas en bloque: {len(routes)} rutas, {len(waypoints)} waypoints, {len(legs)} tramos"
+    )
+    return routes
@@ -0,0 +1,165 @@
+"""
+Circuit breaker para las llamadas a OSRM.
+
+Cerrado: las peticiones pasan y se registra su resultado en una ventana
+deslizante. Si en la ventana hay al menos min_calls resultados y la tasa de
+fallos alcanza failure_rate, el circuito se abre.
+
+Abierto: las peticiones fallan de inmediato (CircuitOpenError) durante
+open_seconds, y el llamador usa una estimación aproximada.
+
+Semiabierto: pasado ese tiempo, un único hilo en segundo plano ejecuta la
+sonda (OSRMService.health_check). Si responde, el circuito se cierra con la
+ventana vacía; si no, vuelve a abrirse otro período. Mientras la sonda está en
+curso las peticiones siguen fallando rápido, así ningún worker espera el timeout.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """El circuito está abierto: la petición no se envió"""
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(
+        self,
+        name: str,
+        probe: Optional[Callable[[], bool]] = None,
+        window: Optional[int] = None,
+        min_calls: Optional[int] = None,
+        failure_rate: Optional[float] = None,
+        open_seconds: Optional[float] = None,
+        enabled: Optional[bool] = None
+    ):
+        """
+        Args:
+            name: Nombre para logs y métricas
+            probe: Función sin argumentos que retorna True si el servicio volvió
+            window: Cantidad de resultados recientes considerados
+            min_calls: Mínimo de resultados en la ventana para poder abrir
+            failure_rate: Proporción de fallos (0-1) que abre el circuito
+            open_seconds: Tiempo abierto antes de probar de nuevo
+            enabled: Si False, allow() siempre permite (solo registra)
+        """
+        self.name = name
+        self.probe = probe
+        self.window = window or getattr(settings, 'OSRM_BREAKER_WINDOW', 20)
+        self.min_calls = min_calls or getattr(settings, 'OSRM_BREAKER_MIN_CALLS', 5)
+        self.failure_rate = failure_rate or getattr(settings, 'OSRM_BREAKER_FAILURE_RATE', 0.5)
+        self.open_seconds = open_seconds or getattr(settings, 'OSRM_BREAKER_OPEN_SECONDS', 30)
+        self.enabled = enabled if enabled is not None else getattr(settings, 'OSRM_BREAKER_ENABLED', True)
+
+        self._lock = threading.Lock()
+        self._results = deque(maxlen=self.window)
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._stats = {'opened': 0, 'rejected': 0, 'probes': 0, 'probe_failures': 0}
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def allow(self) -> bool:
+        """True si la petición puede enviarse; con el circuito abierto dispara la sonda si toca"""
+        if not self.enabled:
+            return True
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            self._stats['rejected'] += 1
+            start_probe = (
+                self._state == self.OPEN
+                and time.monotonic() - self._opened_at >= self.open_seconds
+            )
+            if start_probe:
+                self._state = self.HALF_OPEN
+        if start_probe:
+            if self.probe is None:
+                self._close()
+            else:
+                threading.Thread(target=self._run_probe, name=f'{self.name}-probe', daemon=True).start()
+        return False
+
+    def check(self):
+        """Como allow(), pero lanza CircuitOpenError si el circuito no está cerrado"""
+        if not self.allow():
+            raise CircuitOpenError(f"Circuito {self.name} abierto")
+
+    def record_success(self):
+        with self._lock:
+            self._results.append(True)
+
+    def record_failure(self):
+        with self._lock:
+            self._results.append(False)
+            if self._state != self.CLOSED or len(self._results) < self.min_calls:
+                return
+            failures = self._results.count(False)
+            if failures / len(self._results) < self.failure_rate:
+                return
+            self._open_locked()
+        logger.error(
+            f"🔌 Circuito {self.name} abierto: {failures}/{len(self._results)} fallos recientes"
+        )
+
+    def _open_locked(self):
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._stats['opened'] += 1
+
+    def _close(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._results.clear()
+        logger.info(f"✅ Circuito {self.name} cerrado: servicio disponible")
+
+    def _run_probe(self):
+        self._stats['probes'] += 1
+        try:
+            healthy = bool(self.probe())
+        except Exception as e:
+            logger.warning(f"Sonda de {self.name} falló: {e}")
+            healthy = False
+        if healthy:
+            self._close()
+            return
+        with self._lock:
+            self._stats['probe_failures'] += 1
+            self._open_locked()
+
+    def reset(self):
+        """Cierra el circuito y vacía la ventana (p. ej. en tests o tras un despliegue)"""
+        self._close()
+
+    def get_state(self) -> Dict:
+        with self._lock:
+            results = list(self._results)
+            state = self._state
+            retry_in = (
+                max(self.open_seconds - (time.monotonic() - self._opened_at), 0)
+                if state == self.OPEN else 0
+            )
+            stats = dict(self._stats)
+        return {
+            'name': self.name,
+            'enabled': self.enabled,
+            'state': state,
+            'window': len(results),
+            'failures': results.count(False),
+            'failure_rate': round(results.count(False) / len(results), 3) if results else 0.0,
+            'threshold': self.failure_rate,
+            'retry_in_seconds': round(retry_in, 1),
+            **stats,
+        }
@@ -0,0 +1,92 @@
+"""
+Agrupamiento espacial de puntos cercanos (estilo DBSCAN con min_samples=1).
+
+Los puntos se proyectan a metros con una proyección equirectangular local
+(suficiente a escala de ciudad) y se indexan en una grilla de celdas de
+radius metros; solo se comparan puntos de celdas vecinas. Dos puntos a menos
+de radius metros quedan en el mismo grupo (enlace simple, transitivo).
+"""
+
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+
+METERS_PER_DEGREE = 111320
+
+
+def project_local(coordinates: Sequence[Tuple[float, float]]) -> np.ndarray:
+    """Proyecta [(lon, lat), ...] a metros (x, y) alrededor de su latitud media"""
+    coords = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+    if not len(coords):
+        return coords
+    cos_lat = np.cos(np.radians(coords[:, 1].mean()))
+    return np.column_stack((
+        coords[:, 0] * METERS_PER_DEGREE * cos_lat,
+        coords[:, 1] * METERS_PER_DEGREE,
+    ))
+
+
+def cluster_points(coordinates: Sequence[Tuple[float, float]], radius: float) -> np.ndarray:
+    """
+    Agrupa coordenadas (lon, lat) a menos de radius metros.
+
+    Returns:
+        Array de etiquetas de grupo (0..k-1) por punto, en orden de entrada
+    """
+    points = project_local(coordinates)
+    count = len(points)
+    parent = np.arange(count)
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    cells: Dict[Tuple[int, int], List[int]] = {}
+    keys = np.floor(points / radius).astype(np.int64) if count else np.empty((0, 2), dtype=np.int64)
+    for i, (cx, cy) in enumerate(keys.tolist()):
+        cells.setdefault((cx, cy), []).append(i)
+
+    radius_sq = radius * radius
+    for (cx, cy), members in cells.items():
+        candidates = [
+            j
+            for dx in (-1, 0, 1)
+            for dy in (-1, 0, 1)
+            for j in cells.get((cx + dx, cy + dy), ())
+        ]
+        candidates = np.asarray(candidates)
+        for i in members:
+            deltas = points[candidates] - points[i]
+            close = candidates[(deltas * deltas).sum(axis=1) <= radius_sq]
+            root = find(i)
+            for j in close.tolist():
+                other = find(j)
+                if other != root:
+                    parent[other] = root
+
+    roots = np.array([find(i) for i in range(count)], dtype=np.int64)
+    _, labels = np.unique(roots, return_inverse=True)
+    return labels
+
+
+def sweep_partition(
+    coordinates: Sequence[Tuple[float, float]],
+    center: Tuple[float, float],
+    max_size: int
+) -> List[List[int]]:
+    """
+    Divide puntos en grupos de como máximo max_size barriendo por ángulo
+    alrededor de center (sectores contiguos, apto para una ruta por grupo).
+
+    Returns:
+        Listas de índices de entrada
+    """
+    count = len(coordinates)
+    if count <= max_size:
+        return [list(range(count))] if count else []
+    points = project_local(list(coordinates) + [center])
+    deltas = points[:-1] - points[-1]
+    order = np.argsort(np.arctan2(deltas[:, 1], deltas[:, 0]), kind='stable')
+    groups = int(np.ceil(count / max_size))
+    return [chunk.tolist() for chunk in np.array_split(order, groups)]
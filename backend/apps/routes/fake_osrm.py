@@ -0,0 +1,300 @@
+"""
+Servidor HTTP que imita a OSRM para tests y benchmarks sin contenedor ni
+extracto de mapa.
+
+Implementa /route, /trip, /table, /match, /nearest y /health con las mismas
+formas de respuesta que OSRM v5, usando geometría en línea recta (haversine,
+ver approximate.py). /nearest ajusta a una grilla de "calles" simulada cada
+FakeOSRMServer.street_spacing grados. La latencia artificial y la tasa de
+fallos (503) se configuran al crear el servidor y pueden cambiarse en caliente
+para ejercitar reintentos y el circuit breaker.
+
+Uso:
+    server = FakeOSRMServer(latency_ms=20, failure_rate=0.05).start()
+    osrm = OSRMService(base_url=server.url)
+    ...
+    server.stop()
+
+o como proceso independiente: python manage.py run_fake_osrm --port 5001
+"""
+
+import json
+import logging
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from . import approximate
+
+logger = logging.getLogger(__name__)
+
+SERVICE_PATH = re.compile(r'^/(route|trip|table|match|nearest)/v1/[\w-]+/([^/?]+)$')
+
+
+class _InvalidInput(Exception):
+    pass
+
+
+def _parse_coordinates(raw: str) -> List[Tuple[float, float]]:
+    try:
+        coordinates = [tuple(float(v) for v in pair.split(',')) for pair in raw.split(';')]
+    except ValueError:
+        raise _InvalidInput('Coordenadas inválidas')
+    if any(len(c) != 2 or not -180 <= c[0] <= 180 or not -90 <= c[1] <= 90 for c in coordinates):
+        raise _InvalidInput('Coordenadas fuera de rango')
+    return coordinates
+
+
+def _indices(raw: Optional[str], count: int) -> List[int]:
+    if not raw or raw == 'all':
+        return list(range(count))
+    try:
+        indices = [int(i) for i in raw.split(';')]
+    except ValueError:
+        raise _InvalidInput('Índices inválidos')
+    if any(i < 0 or i >= count for i in indices):
+        raise _InvalidInput('Índice fuera de rango')
+    return indices
+
+
+def _decorate_legs(routes: List[Dict], params: Dict, path_by_route: List[List]):
+    """Añade steps y annotation (un segmento por tramo) como OSRM cuando se piden"""
+    steps = params.get('steps') == 'true'
+    annotations = params.get('annotations') in ('true', 'duration,distance', 'distance,duration')
+    node = 1000
+    for route, path in zip(routes, path_by_route):
+        for index, leg in enumerate(route['legs']):
+            start, end = path[index], path[index + 1]
+            if steps:
+                leg['steps'] = [
+                    {
+                        'name': 'Calle simulada', 'distance': leg['distance'], 'duration': leg['duration'],
+                        'maneuver': {'type': 'depart', 'location': list(start)},
+                    },
+                    {
+                        'name': 'Calle simulada', 'distance': 0, 'duration': 0,
+                        'maneuver': {'type': 'arrive', 'location': list(end)},
+                    },
+                ]
+            if annotations:
+                leg['annotation'] = {
+                    'duration': [leg['duration']],
+                    'distance': [leg['distance']],
+                    'speed': [round(leg['distance'] / leg['duration'], 1) if leg['duration'] else 0],
+                    'nodes': [node, node + 1],
+                }
+                node += 2
+
+
+class FakeOSRMServer:
+    """Servidor OSRM simulado en un thread (ThreadingHTTPServer)"""
+
+    def __init__(
+        self,
+        host: str = '127.0.0.1',
+        port: int = 0,
+        latency_ms: float = 0,
+        jitter_ms: float = 0,
+        failure_rate: float = 0.0,
+        street_spacing: float = 0.001,
+        seed: Optional[int] = None
+    ):
+        """
+        Args:
+            port: 0 elige un puerto libre (ver self.url tras start())
+            latency_ms: Latencia artificial media por petición
+            jitter_ms: Variación uniforme +/- de la latencia
+            failure_rate: Proporción de peticiones (excepto /health) que responden 503
+            street_spacing: Separación en grados de la grilla de calles de /nearest
+            seed: Semilla para latencias y fallos reproducibles
+        """
+        self.host = host
+        self.port = port
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.street_spacing = street_spacing
+        self.healthy = True
+        self.random = random.Random(seed)
+        self.requests = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> 'FakeOSRMServer':
+        handler = type('FakeOSRMHandler', (_Handler,), {'fake': self})
+        self._server = ThreadingHTTPServer((self.host, self.port), handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-osrm', daemon=True)
+        self._thread.start()
+        logger.info(f"🧪 OSRM simulado escuchando en {self.url}")
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ========== SIMULACIÓN ==========
+
+    def _count(self, service: str):
+        with self._lock:
+            self.requests[service] = self.requests.get(service, 0) + 1
+
+    def _delay(self):
+        if self.latency_ms or self.jitter_ms:
+            delay = self.latency_ms + self.random.uniform(-self.jitter_ms, self.jitter_ms)
+            time.sleep(max(delay, 0) / 1000)
+
+    def _should_fail(self) -> bool:
+        return self.failure_rate > 0 and self.random.random() < self.failure_rate
+
+    def _snap(self, coordinate: Tuple[float, float]) -> Tuple[List[float], float]:
+        """Proyecta a la calle más cercana de la grilla (línea de lon o lat constante)"""
+        lon, lat = coordinate
+        spacing = self.street_spacing
+        snapped_lon = round(lon / spacing) * spacing
+        snapped_lat = round(lat / spacing) * spacing
+        if abs(snapped_lon - lon) <= abs(snapped_lat - lat):
+            location = [round(snapped_lon, 6), round(lat, 6)]
+        else:
+            location = [round(lon, 6), round(snapped_lat, 6)]
+        distance = float(approximate.haversine_matrix([coordinate], [location])[0, 0])
+        return location, round(distance, 2)
+
+    def respond(self, path: str, params: Dict) -> Tuple[int, Dict]:
+        """Calcula (status, cuerpo JSON) para una petición"""
+        if path == '/health':
+            self._count('health')
+            return (200, {'status': 'ok'}) if self.healthy else (503, {'status': 'down'})
+
+        match = SERVICE_PATH.match(path)
+        if not match:
+            return 400, {'code': 'InvalidUrl', 'message': f'URL no soportada: {path}'}
+        service, raw = match.groups()
+        self._count(service)
+        self._delay()
+        if not self.healthy or self._should_fail():
+            return 503, {'code': 'ServiceUnavailable', 'message': 'Fallo simulado'}
+
+        try:
+            coordinates = _parse_coordinates(raw)
+            return 200, getattr(self, f'_{service}')(coordinates, params)
+        except _InvalidInput as e:
+            return 400, {'code': 'InvalidInput', 'message': str(e)}
+
+    def _route(self, coordinates, params):
+        if len(coordinates) < 2:
+            raise _InvalidInput('Se requieren al menos 2 coordenadas')
+        geometries = params.get('geometries', 'polyline')
+        data = approximate.route_data(coordinates, geometries)
+        _decorate_legs(data['routes'], params, [coordinates])
+        data.pop('approximate')
+        return data
+
+    def _trip(self, coordinates, params):
+        if len(coordinates) < 2:
+            raise _InvalidInput('Se requieren al menos 2 coordenadas')
+        roundtrip = params.get('roundtrip', 'true') == 'true'
+        data = approximate.trip_data(
+            coordinates,
+            roundtrip=roundtrip,
+            source=params.get('source', 'any'),
+            destination=params.get('destination', 'any'),
+            geometries=params.get('geometries', 'polyline')
+        )
+        position = {wp['waypoint_index']: i for i, wp in enumerate(data['waypoints'])}
+        path = [coordinates[position[p]] for p in range(len(coordinates))]
+        if roundtrip:
+            path.append(path[0])
+        _decorate_legs(data['trips'], params, [path])
+        data.pop('approximate')
+        return data
+
+    def _table(self, coordinates, params):
+        sources = _indices(params.get('sources'), len(coordinates))
+        destinations = _indices(params.get('destinations'), len(coordinates))
+        data = approximate.table_data(coordinates, sources, destinations)
+        data.pop('approximate')
+        annotations = params.get('annotations', 'duration')
+        if 'distance' not in annotations:
+            data.pop('distances')
+        if 'duration' not in annotations:
+            data.pop('durations')
+        data['sources'] = [{'location': list(coordinates[i]), 'name': ''} for i in sources]
+        data['destinations'] = [{'location': list(coordinates[i]), 'name': ''} for i in destinations]
+        return data
+
+    def _match(self, coordinates, params):
+        if len(coordinates) < 2:
+            raise _InvalidInput('Se requieren al menos 2 coordenadas')
+        snapped = [self._snap(c)[0] for c in coordinates]
+        data = approximate.route_data(snapped, params.get('geometries', 'polyline'))
+        _decorate_legs(data['routes'], params, [snapped])
+        matching = dict(data['routes'][0], confidence=0.9)
+        return {
+            'code': 'Ok',
+            'matchings': [matching],
+            'tracepoints': [
+                {'location': location, 'name': 'Calle simulada', 'matchings_index': 0, 'waypoint_index': i}
+                for i, location in enumerate(snapped)
+            ],
+        }
+
+    def _nearest(self, coordinates, params):
+        try:
+            number = max(int(params.get('number', 1)), 1)
+        except ValueError:
+            raise _InvalidInput('number inválido')
+        location, distance = self._snap(coordinates[0])
+        waypoints = [{'location': location, 'distance': distance, 'name': 'Calle simulada', 'hint': ''}]
+        for k in range(1, number):
+            # Puntos adicionales sobre la misma calle, cada vez más lejos
+            offset = k * self.street_spacing / 4
+            extra = [round(location[0] + offset, 6), location[1]]
+            waypoints.append({
+                'location': extra,
+                'distance': round(float(approximate.haversine_matrix([coordinates[0]], [extra])[0, 0]), 2),
+                'name': 'Calle simulada',
+                'hint': '',
+            })
+        return {'code': 'Ok', 'waypoints': waypoints}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    fake: FakeOSRMServer = None
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        parsed = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+        try:
+            status, body = self.fake.respond(parsed.path, params)
+        except Exception as e:
+            logger.error(f"Error en OSRM simulado: {e}")
+            status, body = 500, {'code': 'InternalError', 'message': str(e)}
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
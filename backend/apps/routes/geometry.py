@@ -0,0 +1,54 @@
+"""
+Construcción rápida de geometrías GEOS a partir de respuestas OSRM.
+
+Las geometrías overview=full tienen miles de vértices; crear un Point GEOS por
+vértice domina el tiempo de procesamiento. Aquí la LineString se arma en una
+sola llamada a GEOS leyendo un buffer EWKB construido con NumPy.
+"""
+
+import struct
+from typing import Optional, Sequence
+import numpy as np
+from django.contrib.gis.geos import GEOSGeometry, LineString
+
+from . import polyline
+
+# Cabecera EWKB: little-endian, tipo LineString (2) con flag de SRID
+_EWKB_LINESTRING_SRID = 0x20000002
+
+
+def linestring_from_coordinates(coordinates: Sequence[Sequence[float]], srid: int = 4326) -> Optional[LineString]:
+    """
+    Crea una LineString desde una secuencia [[lon, lat], ...] sin objetos por vértice.
+
+    Args:
+        coordinates: Coordenadas GeoJSON (lista de listas o np.ndarray Nx2)
+        srid: SRID de la geometría
+
+    Returns:
+        LineString, o None si hay menos de 2 vértices
+    """
+    coords = np.asarray(coordinates, dtype='<f8')
+    if coords.ndim != 2 or coords.shape[0] < 2:
+        return None
+    coords = np.ascontiguousarray(coords[:, :2])
+    header = struct.pack('<BIII', 1, _EWKB_LINESTRING_SRID, srid, coords.shape[0])
+    return GEOSGeometry(memoryview(header + coords.tobytes()), srid=srid)
+
+
+def linestring_from_geojson(geometry: dict, srid: int = 4326) -> Optional[LineString]:
+    """Convierte una geometría GeoJSON de OSRM a LineString (None si no aplica)"""
+    if not geometry or geometry.get('type') != 'LineString':
+        return None
+    return linestring_from_coordinates(geometry.get('coordinates', []), srid=srid)
+
+
+def linestring_from_osrm(geometry, geometries: str = 'geojson', srid: int = 4326) -> Optional[LineString]:
+    """
+    Convierte la geometría de una respuesta OSRM en cualquiera de sus formatos
+    (geojson, polyline, polyline6) a LineString.
+    """
+    if isinstance(geometry, str):
+        precision = 5 if geometries == 'polyline' else 6
+        return linestring_from_coordinates(polyline.decode(geometry, precision), srid=srid)
+    return linestring_from_geojson(geometry, srid=srid)
@@ -0,0 +1,98 @@
+"""
+Almacenamiento de los tramos (legs) OSRM de cada ruta.
+
+Se escriben con bulk_create junto con la ruta, para que ETA, reportes y
+re-optimización no tengan que volver a llamar a OSRM.
+"""
+
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from django.db.models import F, QuerySet
+
+from .models import Route, RouteLeg, RouteWaypoint
+
+
+def _pack(values, dtype: str) -> Optional[bytes]:
+    if not values:
+        return None
+    return np.asarray(values, dtype=dtype).tobytes()
+
+
+def _compact_steps(steps: Sequence[Dict]) -> List[List]:
+    """Reduce cada paso OSRM a [nombre, tipo, modificador, distancia, duración]"""
+    compact = []
+    for step in steps:
+        maneuver = step.get('maneuver', {})
+        compact.append([
+            step.get('name', ''),
+            maneuver.get('type'),
+            maneuver.get('modifier'),
+            round(step.get('distance', 0), 1),
+            round(step.get('duration', 0), 1),
+        ])
+    return compact
+
+
+def build_route_legs(
+    route: Route,
+    ordered_waypoints: Sequence[RouteWaypoint],
+    legs: Sequence[Dict]
+) -> List[RouteLeg]:
+    """
+    Construye (sin guardar) los RouteLeg de una ruta.
+
+    Args:
+        ordered_waypoints: Paradas en orden de visita
+        legs: Array 'legs' de la respuesta OSRM. Si tiene tantos tramos como
+            paradas, el último vuelve a la primera (viaje circular)
+    """
+    objects = []
+    count = len(ordered_waypoints)
+    for index, leg in enumerate(legs):
+        annotation = leg.get('annotation') or {}
+        steps = leg.get('steps') or []
+        to_index = index + 1 if index + 1 < count else (0 if count else None)
+        objects.append(RouteLeg(
+            route=route,
+            zone_id=route.zone_id,
+            leg_index=index,
+            from_waypoint=ordered_waypoints[index] if index < count else None,
+            to_waypoint=ordered_waypoints[to_index] if to_index is not None else None,
+            duration_seconds=leg.get('duration', 0),
+            distance_meters=leg.get('distance', 0),
+            step_count=len(steps),
+            steps=_compact_steps(steps),
+            segment_count=len(annotation.get('duration') or []),
+            annotation_durations=_pack(annotation.get('duration'), '<f4'),
+            annotation_distances=_pack(annotation.get('distance'), '<f4'),
+            annotation_speeds=_pack(annotation.get('speed'), '<f4'),
+            annotation_nodes=_pack(annotation.get('nodes'), '<i8'),
+        ))
+    return objects
+
+
+def replace_route_legs(
+    route: Route,
+    ordered_waypoints: Sequence[RouteWaypoint],
+    legs: Sequence[Dict]
+) -> List[RouteLeg]:
+    """Reemplaza los tramos guardados de una ruta (p. ej. tras re-optimizarla)"""
+    RouteLeg.objects.filter(route=route).delete()
+    return RouteLeg.objects.bulk_create(build_route_legs(route, ordered_waypoints, legs))
+
+
+def slowest_legs(zone_id=None, limit: int = 20) -> QuerySet:
+    """
+    Tramos más lentos (mayor duración) de una zona o de todas.
+    Usa el índice (zone, -duration_seconds); no llama a OSRM.
+    """
+    queryset = RouteLeg.objects.select_related('route', 'from_waypoint', 'to_waypoint').defer(
+        'steps', 'annotation_durations', 'annotation_distances', 'annotation_speeds', 'annotation_nodes',
+        'route__route_geometry', 'route__route_geometry_medium', 'route__route_geometry_low',
+        'route__route_polyline6'
+    )
+    if zone_id is not None:
+        queryset = queryset.filter(zone_id=zone_id)
+    return queryset.annotate(
+        speed_mps=F('distance_meters') / F('duration_seconds')
+    ).filter(duration_seconds__gt=0).order_by('-duration_seconds')[:limit]
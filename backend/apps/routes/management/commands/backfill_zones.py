@@ -0,0 +1,45 @@
+"""
+Asigna la zona de limpieza a incidencias y tareas existentes usando el
+índice de zonas en memoria (sin ST_Contains por fila en la base de datos).
+
+Uso:
+    python manage.py backfill_zones
+    python manage.py backfill_zones --model incidents --batch-size 5000
+    python manage.py backfill_zones --all   # recalcula también las ya asignadas
+"""
+
+import time
+from django.core.management.base import BaseCommand
+from apps.incidents.models import Incident
+from apps.routes.zone_index import assign_zones, zone_index
+from apps.tasks.models import Task
+
+
+MODELS = {
+    'incidents': Incident,
+    'tasks': Task,
+}
+
+
+class Command(BaseCommand):
+    help = 'Rellena por lotes el FK de zona de incidencias y tareas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=list(MODELS), action='append', help='Por defecto ambos')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--all', action='store_true', help='Recalcular también filas con zona')
+
+    def handle(self, *args, **options):
+        zone_index.rebuild()
+        for name in options['model'] or list(MODELS):
+            start = time.perf_counter()
+            result = assign_zones(
+                MODELS[name],
+                batch_size=options['batch_size'],
+                only_missing=not options['all']
+            )
+            elapsed = time.perf_counter() - start
+            self.stdout.write(self.style.SUCCESS(
+                f"{name}: {result['assigned']}/{result['scanned']} asignadas en {elapsed:.2f}s"
+            ))
+        self.stdout.write(f"Índice: {zone_index.get_stats()}")
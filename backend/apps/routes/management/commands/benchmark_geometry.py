@@ -0,0 +1,53 @@
+"""
+Microbenchmark de construcción de LineString desde respuestas OSRM.
+
+Uso:
+    python manage.py benchmark_geometry
+    python manage.py benchmark_geometry --sizes 500 5000 20000 --repeat 20
+"""
+
+import statistics
+import time
+import numpy as np
+from django.contrib.gis.geos import LineString, Point
+from django.core.management.base import BaseCommand
+from apps.routes.geometry import linestring_from_coordinates
+
+
+class Command(BaseCommand):
+    help = 'Compara la construcción de LineString con Point por vértice, NumPy y EWKB'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[100, 1000, 5000, 20000])
+        parser.add_argument('--repeat', type=int, default=10)
+    
+    def _coordinates(self, count):
+        # Simula la geometría GeoJSON de OSRM (lista de [lon, lat]) alrededor de Latacunga
+        rng = np.random.default_rng(42)
+        steps = rng.normal(scale=0.0001, size=(count, 2)).cumsum(axis=0)
+        return (steps + [-78.6166, -0.9363]).round(6).tolist()
+    
+    def _time(self, fn, coordinates, repeat):
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn(coordinates)
+            samples.append(time.perf_counter() - started)
+        return statistics.median(samples) * 1000
+    
+    def handle(self, *args, **options):
+        methods = [
+            ('Point por vértice', lambda c: LineString([Point(lon, lat) for lon, lat in c], srid=4326)),
+            ('np.ndarray', lambda c: LineString(np.asarray(c, dtype=float), srid=4326)),
+            ('EWKB', linestring_from_coordinates),
+        ]
+        
+        self.stdout.write(self.style.SUCCESS('⏱️  Construcción de LineString (mediana en ms)'))
+        self.stdout.write(f"{'vértices':>10}" + ''.join(f"{name:>20}" for name, _ in methods))
+        
+        for size in options['sizes']:
+            coordinates = self._coordinates(size)
+            reference = methods[0][1](coordinates)
+            assert linestring_from_coordinates(coordinates).equals_exact(reference)
+            timings = [self._time(fn, coordinates, options['repeat']) for _, fn in methods]
+            self.stdout.write(f"{size:>10}" + ''.join(f"{t:>20.2f}" for t in timings))
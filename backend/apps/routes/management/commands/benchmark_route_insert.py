@@ -0,0 +1,80 @@
+"""
+Benchmark de inserción de waypoints: INSERT por fila vs bulk_create.
+
+Uso:
+    python manage.py benchmark_route_insert
+    python manage.py benchmark_route_insert --sizes 10 100 300 1000 --repeat 5
+
+Todas las escrituras se revierten al terminar cada medición.
+"""
+
+import statistics
+import time
+from django.contrib.gis.geos import LineString, Point
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from apps.routes.bulk import build_waypoints
+from apps.routes.models import Route, RouteWaypoint
+
+
+class _Rollback(Exception):
+    """Fuerza el rollback de la transacción de la medición"""
+
+
+class Command(BaseCommand):
+    help = 'Compara el tiempo de inserción de waypoints por fila y con bulk_create'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[10, 50, 100, 300, 1000])
+        parser.add_argument('--repeat', type=int, default=3)
+    
+    def _waypoints(self, count):
+        # Puntos sintéticos alrededor del centro de Latacunga
+        return [
+            {'lat': -0.9363 + (i % 50) * 0.0004, 'lon': -78.6166 + (i // 50) * 0.0004}
+            for i in range(count)
+        ]
+    
+    def _new_route(self, waypoints):
+        return Route.objects.create(
+            route_name='benchmark',
+            route_geometry=LineString((-78.6166, -0.9363), (-78.6100, -0.9300), srid=4326),
+            waypoints=waypoints
+        )
+    
+    def _per_row(self, waypoints):
+        route = self._new_route(waypoints)
+        for i, wp in enumerate(waypoints):
+            RouteWaypoint.objects.create(
+                route=route,
+                waypoint_order=i,
+                location=Point(wp['lon'], wp['lat'], srid=4326)
+            )
+    
+    def _bulk(self, waypoints):
+        route = self._new_route(waypoints)
+        RouteWaypoint.objects.bulk_create(build_waypoints(route, waypoints))
+    
+    def _measure(self, fn, waypoints):
+        started = time.perf_counter()
+        try:
+            with transaction.atomic():
+                fn(waypoints)
+                elapsed = time.perf_counter() - started
+                raise _Rollback()
+        except _Rollback:
+            pass
+        return elapsed
+    
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        self.stdout.write(self.style.SUCCESS('⏱️  Benchmark de inserción de waypoints'))
+        self.stdout.write(f"{'waypoints':>10} {'por fila (ms)':>15} {'bulk (ms)':>12} {'speedup':>9}")
+        
+        for size in options['sizes']:
+            waypoints = self._waypoints(size)
+            per_row = statistics.median(self._measure(self._per_row, waypoints) for _ in range(repeat))
+            bulk = statistics.median(self._measure(self._bulk, waypoints) for _ in range(repeat))
+            self.stdout.write(
+                f"{size:>10} {per_row * 1000:>15.1f} {bulk * 1000:>12.1f} {per_row / bulk:>8.1f}x"
+            )
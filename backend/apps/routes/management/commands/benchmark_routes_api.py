@@ -0,0 +1,138 @@
+"""
+Benchmark de los endpoints de RouteViewSet contra el OSRM simulado.
+
+Las peticiones pasan por el stack completo de Django/DRF (URLs, middleware,
+serializers) con APIClient, en paralelo desde varios threads; OSRM es el
+servidor de apps/routes/fake_osrm.py con latencia y fallos configurables.
+
+Uso:
+    python manage.py benchmark_routes_api
+    python manage.py benchmark_routes_api --scenarios calculate optimize --requests 500 --concurrency 16
+    python manage.py benchmark_routes_api --latency 40 --jitter 20 --failure-rate 0.2
+    python manage.py benchmark_routes_api --osrm-url http://osrm:5000   # contra un OSRM real
+
+Los escenarios no escriben en la base de datos.
+"""
+
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIClient
+from apps.routes.fake_osrm import FakeOSRMServer
+from apps.routes.osrm_service import osrm_service
+
+
+# Centro de Latacunga
+CENTER_LAT = -0.9363
+CENTER_LON = -78.6166
+
+
+def _waypoints(rng, count):
+    return [
+        {'lat': CENTER_LAT + rng.uniform(-0.02, 0.02), 'lon': CENTER_LON + rng.uniform(-0.02, 0.02)}
+        for _ in range(count)
+    ]
+
+
+SCENARIOS = {
+    'calculate': lambda rng: ('/api/routes/calculate/', {'waypoints': _waypoints(rng, rng.randint(2, 10))}),
+    'optimize': lambda rng: ('/api/routes/calculate/', {'waypoints': _waypoints(rng, rng.randint(4, 25)), 'optimize': True}),
+    'polyline6': lambda rng: (
+        '/api/routes/calculate/?geometry_format=polyline6',
+        {'waypoints': _waypoints(rng, rng.randint(2, 10))}
+    ),
+    'batch': lambda rng: ('/api/routes/calculate_batch/', {
+        'items': [{'id': str(i), 'waypoints': _waypoints(rng, 5)} for i in range(20)]
+    }),
+}
+
+
+def _server_name() -> str:
+    """Host aceptado por ALLOWED_HOSTS (APIClient envía 'testserver' por defecto)"""
+    for host in settings.ALLOWED_HOSTS:
+        if host and host != '*' and not host.startswith('.'):
+            return host
+    return 'localhost'
+
+
+class Command(BaseCommand):
+    help = 'Mide latencia y throughput de los endpoints de rutas contra un OSRM simulado'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=['calculate', 'optimize', 'batch'])
+        parser.add_argument('--requests', type=int, default=200, help='Peticiones por escenario')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--latency', type=float, default=5, help='Latencia media del OSRM simulado (ms)')
+        parser.add_argument('--jitter', type=float, default=2, help='Variación de latencia (ms)')
+        parser.add_argument('--failure-rate', type=float, default=0.0, help='Proporción de 503 del OSRM simulado')
+        parser.add_argument('--osrm-url', help='Usar este OSRM en lugar del simulado')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def _request(self, user, path, body):
+        client = APIClient(SERVER_NAME=_server_name())
+        client.force_authenticate(user=user)
+        started = time.perf_counter()
+        response = client.post(path, body, format='json')
+        # Consumir la respuesta (calculate_batch responde en streaming)
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+        elapsed = time.perf_counter() - started
+        approximate = b'"approximate": true' in content or b'"approximate":true' in content
+        return response.status_code, elapsed, approximate
+
+    def _run(self, name, user, options):
+        rng = random.Random(options['seed'])
+        calls = [SCENARIOS[name](rng) for _ in range(options['requests'])]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            results = list(pool.map(lambda call: self._request(user, *call), calls))
+        wall = time.perf_counter() - started
+
+        times = sorted(r[1] * 1000 for r in results)
+        statuses = {}
+        for status_code, _, _ in results:
+            statuses[status_code] = statuses.get(status_code, 0) + 1
+        approximate = sum(1 for r in results if r[2])
+        p95 = times[min(int(len(times) * 0.95), len(times) - 1)]
+        self.stdout.write(
+            f"{name:>10}: {len(results) / wall:8.1f} req/s | "
+            f"p50 {statistics.median(times):7.1f} ms | p95 {p95:7.1f} ms | max {times[-1]:7.1f} ms | "
+            f"status {statuses} | aproximadas {approximate}"
+        )
+
+    def handle(self, *args, **options):
+        server = None
+        previous = osrm_service.base_url, osrm_service.cache
+        if options['osrm_url']:
+            osrm_service.base_url = options['osrm_url'].rstrip('/')
+        else:
+            server = FakeOSRMServer(
+                latency_ms=options['latency'],
+                jitter_ms=options['jitter'],
+                failure_rate=options['failure_rate'],
+                seed=options['seed']
+            ).start()
+            osrm_service.base_url = server.url
+        # Sin caché de rutas: cada petición llega a OSRM
+        osrm_service.cache = None
+        osrm_service.breaker.reset()
+
+        # Usuario en memoria (no se guarda) para pasar IsAuthenticatedOrReadOnly
+        user = get_user_model()(email='benchmark@example.com')
+        self.stdout.write(
+            f"OSRM: {osrm_service.base_url} | {options['requests']} peticiones x escenario, "
+            f"concurrencia {options['concurrency']}"
+        )
+        try:
+            for name in options['scenarios']:
+                self._run(name, user, options)
+        finally:
+            osrm_service.base_url, osrm_service.cache = previous
+            if server is not None:
+                server.stop()
+                self.stdout.write(f"Peticiones al OSRM simulado: {server.requests}")
+            self.stdout.write(f"Circuit breaker: {osrm_service.breaker.get_state()}")
+            osrm_service.breaker.reset()
@@ -0,0 +1,44 @@
+"""
+Levanta el OSRM simulado (apps/routes/fake_osrm.py) como proceso independiente.
+
+Uso:
+    python manage.py run_fake_osrm --port 5001
+    python manage.py run_fake_osrm --port 5001 --latency 30 --jitter 10 --failure-rate 0.05
+
+Luego apuntar el backend con OSRM_URL=http://localhost:5001.
+"""
+
+import time
+from django.core.management.base import BaseCommand
+from apps.routes.fake_osrm import FakeOSRMServer
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta un servidor OSRM simulado (línea recta) para pruebas y benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=5001)
+        parser.add_argument('--latency', type=float, default=0, help='Latencia media en ms')
+        parser.add_argument('--jitter', type=float, default=0, help='Variación de latencia en ms')
+        parser.add_argument('--failure-rate', type=float, default=0.0, help='Proporción de respuestas 503')
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        server = FakeOSRMServer(
+            host=options['host'],
+            port=options['port'],
+            latency_ms=options['latency'],
+            jitter_ms=options['jitter'],
+            failure_rate=options['failure_rate'],
+            seed=options['seed']
+        ).start()
+        self.stdout.write(self.style.SUCCESS(f"OSRM simulado en {server.url} (Ctrl+C para salir)"))
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.stop()
+            self.stdout.write(f"Peticiones atendidas: {server.requests}")
@@ -0,0 +1,55 @@
+"""
+Comando Django para precalcular las matrices de distancia de las zonas activas.
+
+Uso:
+    python manage.py warm_zone_matrices
+    python manage.py warm_zone_matrices --zone "Centro Histórico"
+"""
+
+import time
+from django.core.management.base import BaseCommand
+from apps.routes.models import CleaningZone
+from apps.routes.osrm_service import osrm_service
+from apps.routes.zone_matrix import get_zone_matrix, zone_stop_coordinates
+
+
+class Command(BaseCommand):
+    help = 'Precalcula (o actualiza de forma incremental) las matrices de distancia de las zonas activas'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--zone',
+            action='append',
+            dest='zones',
+            help='Nombre de zona a procesar (puede repetirse)'
+        )
+    
+    def handle(self, *args, **options):
+        zones = CleaningZone.objects.filter(status='active')
+        if options.get('zones'):
+            zones = zones.filter(zone_name__in=options['zones'])
+        
+        self.stdout.write(self.style.SUCCESS('🗺️  Precalculando matrices de distancia por zona'))
+        
+        warmed = failed = 0
+        for zone in zones:
+            coordinates = zone_stop_coordinates(zone)
+            if len(coordinates) < 2:
+                self.stdout.write(f'   - {zone.zone_name}: sin paradas suficientes, omitida')
+                continue
+            
+            started = time.perf_counter()
+            result = get_zone_matrix(zone, osrm_service, coordinates)
+            elapsed = time.perf_counter() - started
+            
+            if result.get('success'):
+                warmed += 1
+                self.stdout.write(
+                    f"   ✅ {zone.zone_name}: {len(result['coordinates'])} paradas "
+                    f"({result['reused']} reutilizadas, {result['fetched']} nuevas) en {elapsed:.2f}s"
+                )
+            else:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f"   ❌ {zone.zone_name}: {result.get('error')}"))
+        
+        self.stdout.write(self.style.SUCCESS(f'✅ Zonas actualizadas: {warmed} | Errores: {failed}'))
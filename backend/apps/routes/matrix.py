@@ -0,0 +1,123 @@
+"""
+Construcción de matrices de distancia/duración por bloques.
+
+OSRM limita el número de coordenadas por petición /table (--max-table-size,
+100 por defecto) y las URLs largas fallan antes de llegar al servidor. Para
+zonas con cientos de puntos la matriz N×M se divide en bloques que se piden
+en paralelo con un pool de workers acotado y se ensamblan en arrays float32.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def dedupe_coordinates(
+    sources: Sequence[Tuple[float, float]],
+    destinations: Sequence[Tuple[float, float]]
+) -> Tuple[List[Tuple[float, float]], List[int], List[int]]:
+    """
+    Une orígenes y destinos en una sola lista sin coordenadas repetidas.
+
+    Returns:
+        (coordenadas únicas, índices de orígenes, índices de destinos)
+    """
+    index: Dict[Tuple[float, float], int] = {}
+    coordinates: List[Tuple[float, float]] = []
+
+    def _index_of(coordinate):
+        key = (float(coordinate[0]), float(coordinate[1]))
+        position = index.get(key)
+        if position is None:
+            position = index[key] = len(coordinates)
+            coordinates.append(key)
+        return position
+
+    source_idx = [_index_of(c) for c in sources]
+    destination_idx = [_index_of(c) for c in destinations]
+    return coordinates, source_idx, destination_idx
+
+
+class MatrixBuilder:
+    """Arma matrices /table grandes a partir de bloques pedidos en paralelo"""
+
+    def __init__(self, osrm, max_table_size: int = 100, max_workers: int = 4, profile: str = 'driving'):
+        """
+        Args:
+            osrm: Instancia de OSRMService usada para cada bloque
+            max_table_size: Máximo de coordenadas por petición (igual que en osrm-routed)
+            max_workers: Peticiones concurrentes
+            profile: Perfil de ruta
+        """
+        self.osrm = osrm
+        self.block_size = max(max_table_size // 2, 1)
+        self.max_workers = max(max_workers, 1)
+        self.profile = profile
+
+    def _fetch_tile(self, sources, destinations) -> Dict:
+        coordinates, source_idx, destination_idx = dedupe_coordinates(sources, destinations)
+        data = self.osrm.table_request(coordinates, source_idx, destination_idx, profile=self.profile)
+        if data.get('code') != 'Ok':
+            raise RuntimeError(data.get('message', 'Unknown error'))
+        return data
+
+    def build(
+        self,
+        sources: Sequence[Tuple[float, float]],
+        destinations: Optional[Sequence[Tuple[float, float]]] = None
+    ) -> Dict:
+        """
+        Calcula la matriz completa.
+
+        Args:
+            sources: Lista de tuplas (lon, lat) de origen
+            destinations: Lista de tuplas (lon, lat) de destino (default: sources)
+
+        Returns:
+            Dict con 'durations' y 'distances' como np.ndarray float32 (NaN = sin ruta)
+            y approximate=True si algún bloque se estimó en línea recta
+        """
+        sources = list(sources)
+        destinations = sources if destinations is None else list(destinations)
+        n, m = len(sources), len(destinations)
+        durations = np.full((n, m), np.nan, dtype=np.float32)
+        distances = np.full((n, m), np.nan, dtype=np.float32)
+        approximate = False
+
+        size = self.block_size
+        tiles = [
+            (slice(i, min(i + size, n)), slice(j, min(j + size, m)))
+            for i in range(0, n, size)
+            for j in range(0, m, size)
+        ]
+
+        try:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(tiles) or 1)) as pool:
+                futures = {
+                    pool.submit(self._fetch_tile, sources[rows], destinations[cols]): (rows, cols)
+                    for rows, cols in tiles
+                }
+                for future in as_completed(futures):
+                    rows, cols = futures[future]
+                    data = future.result()
+                    approximate = approximate or bool(data.get('approximate'))
+                    durations[rows, cols] = np.array(data.get('durations', []), dtype=np.float32)
+                    if data.get('distances') is not None:
+                        distances[rows, cols] = np.array(data['distances'], dtype=np.float32)
+        except Exception as e:
+            logger.error(f"Error al construir matriz por bloques: {e}")
+            return {'success': False, 'error': str(e)}
+
+        logger.info(f"Matriz por bloques calculada: {n}x{m} en {len(tiles)} bloques")
+        return {
+            'success': True,
+            'durations': durations,
+            'distances': distances,
+            'sources': sources,
+            'destinations': destinations,
+            'tiles': len(tiles),
+            'approximate': approximate,
+        }
@@ -0,0 +1,31 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ZoneDistanceMatrix',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('size', models.IntegerField(default=0, help_text='Número de paradas (N)')),
+                ('coordinates', models.BinaryField(help_text='Array float64 Nx2 (lon, lat) en orden de matriz')),
+                ('durations', models.BinaryField(help_text='Array float32 NxN de duraciones en segundos')),
+                ('distances', models.BinaryField(help_text='Array float32 NxN de distancias en metros')),
+                ('fingerprint', models.CharField(db_index=True, help_text='SHA-256 del conjunto de coordenadas', max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('zone', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='distance_matrix', to='routes.cleaningzone')),
+            ],
+            options={
+                'verbose_name': 'Matriz de Distancias de Zona',
+                'verbose_name_plural': 'Matrices de Distancias de Zonas',
+                'db_table': 'zone_distance_matrices',
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+import django.contrib.gis.db.models.fields
+from django.db import migrations
+
+
+def populate_simplified(apps, schema_editor):
+    from apps.routes.models import GEOMETRY_TOLERANCES
+    Route = apps.get_model('routes', 'Route')
+    batch = []
+    for route in Route.objects.exclude(route_geometry=None).iterator(chunk_size=500):
+        for resolution, tolerance in GEOMETRY_TOLERANCES.items():
+            simplified = route.route_geometry.simplify(tolerance, preserve_topology=True)
+            if simplified.geom_type != 'LineString' or simplified.empty:
+                simplified = route.route_geometry
+            simplified.srid = route.route_geometry.srid
+            setattr(route, f'route_geometry_{resolution}', simplified)
+        batch.append(route)
+        if len(batch) >= 500:
+            Route.objects.bulk_update(batch, ['route_geometry_medium', 'route_geometry_low'])
+            batch = []
+    if batch:
+        Route.objects.bulk_update(batch, ['route_geometry_medium', 'route_geometry_low'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes', '0002_zonedistancematrix'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='route',
+            name='route_geometry_low',
+            field=django.contrib.gis.db.models.fields.LineStringField(blank=True, null=True, srid=4326),
+        ),
+        migrations.AddField(
+            model_name='route',
+            name='route_geometry_medium',
+            field=django.contrib.gis.db.models.fields.LineStringField(blank=True, null=True, srid=4326),
+        ),
+        migrations.RunPython(populate_simplified, migrations.RunPython.noop),
+    ]
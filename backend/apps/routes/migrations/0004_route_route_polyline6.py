@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+
+def populate_polyline6(apps, schema_editor):
+    from apps.routes.polyline import encode
+    Route = apps.get_model('routes', 'Route')
+    batch = []
+    for route in Route.objects.exclude(route_geometry=None).only('id', 'route_geometry').iterator(chunk_size=500):
+        route.route_polyline6 = encode(route.route_geometry.coords)
+        batch.append(route)
+        if len(batch) >= 500:
+            Route.objects.bulk_update(batch, ['route_polyline6'])
+            batch = []
+    if batch:
+        Route.objects.bulk_update(batch, ['route_polyline6'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes', '0003_route_simplified_geometries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='route',
+            name='route_polyline6',
+            field=models.TextField(blank=True, help_text='route_geometry codificada como polyline6', null=True),
+        ),
+        migrations.RunPython(populate_polyline6, migrations.RunPython.noop),
+    ]
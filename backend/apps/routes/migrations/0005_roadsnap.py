@@ -0,0 +1,27 @@
+import django.contrib.gis.db.models.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes', '0004_route_route_polyline6'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoadSnap',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cell', models.CharField(help_text="Celda de la grilla: '<tamaño_m>:<fila>:<columna>'", max_length=64, unique=True)),
+                ('snapped_location', django.contrib.gis.db.models.fields.PointField(help_text='Punto sobre la red vial', srid=4326)),
+                ('road_name', models.CharField(blank=True, default='', max_length=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Snap a Red Vial',
+                'verbose_name_plural': 'Snaps a Red Vial',
+                'db_table': 'road_snaps',
+            },
+        ),
+    ]
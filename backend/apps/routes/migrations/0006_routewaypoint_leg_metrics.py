@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes', '0005_roadsnap'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='routewaypoint',
+            name='leg_duration_seconds',
+            field=models.FloatField(blank=True, help_text='Duración OSRM desde la parada anterior', null=True),
+        ),
+        migrations.AddField(
+            model_name='routewaypoint',
+            name='leg_distance_meters',
+            field=models.FloatField(blank=True, help_text='Distancia OSRM desde la parada anterior', null=True),
+        ),
+    ]
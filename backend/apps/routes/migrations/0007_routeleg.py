@@ -0,0 +1,41 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes', '0006_routewaypoint_leg_metrics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RouteLeg',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('leg_index', models.IntegerField(help_text='Posición del tramo en la ruta (0 = primero)')),
+                ('duration_seconds', models.FloatField()),
+                ('distance_meters', models.FloatField()),
+                ('step_count', models.IntegerField(default=0)),
+                ('steps', models.JSONField(blank=True, default=list, help_text='Pasos [nombre, tipo, modificador, distancia, duración]')),
+                ('segment_count', models.IntegerField(default=0)),
+                ('annotation_durations', models.BinaryField(blank=True, help_text='float32 por segmento', null=True)),
+                ('annotation_distances', models.BinaryField(blank=True, help_text='float32 por segmento', null=True)),
+                ('annotation_speeds', models.BinaryField(blank=True, help_text='float32 por segmento', null=True)),
+                ('annotation_nodes', models.BinaryField(blank=True, help_text='int64 (ids de nodos OSM)', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('from_waypoint', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='outgoing_legs', to='routes.routewaypoint')),
+                ('route', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='legs', to='routes.route')),
+                ('to_waypoint', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='incoming_legs', to='routes.routewaypoint')),
+                ('zone', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='route_legs', to='routes.cleaningzone')),
+            ],
+            options={
+                'verbose_name': 'Tramo de Ruta',
+                'verbose_name_plural': 'Tramos de Ruta',
+                'db_table': 'route_legs',
+                'ordering': ['route', 'leg_index'],
+                'unique_together': {('route', 'leg_index')},
+                'indexes': [models.Index(fields=['zone', '-duration_seconds'], name='route_legs_zone_duration_idx')],
+            },
+        ),
+    ]
@@ -53,6 +53,14 @@ class CleaningZone(models.Model):
         return f"{self.zone_name} (Prioridad: {self.priority})"
 
 
+# Tolerancias Douglas-Peucker (en grados, SRID 4326) de las versiones simplificadas.
+# ~0.00005° ≈ 5 m y ~0.0002° ≈ 22 m en la latitud de Latacunga.
+GEOMETRY_TOLERANCES = {
+    'medium': 0.00005,
+    'low': 0.0002,
+}
+
+
 class Route(models.Model):
     """Ruta optimizada para limpieza"""
     
@@ -72,6 +80,14 @@ class Route(models.Model):
         blank=True
     )
     route_geometry = models.LineStringField(srid=4326)  # LineString geográfica
+    # Versiones simplificadas precalculadas para zooms bajos (ver GEOMETRY_TOLERANCES)
+    route_geometry_medium = models.LineStringField(srid=4326, null=True, blank=True)
+    route_geometry_low = models.LineStringField(srid=4326, null=True, blank=True)
+    route_polyline6 = models.TextField(
+        null=True,
+        blank=True,
+        help_text="route_geometry codificada como polyline6"
+    )
     waypoints = models.JSONField(help_text="Array de puntos con lat/lon")
     total_distance_km = models.DecimalField(
         max_digits=10,
@@ -101,6 +117,51 @@ class Route(models.Model):
     
     def __str__(self):
         return f"{self.route_name} ({self.total_distance_km}km)"
+    
+    def refresh_simplified_geometries(self):
+        """Recalcula las geometrías simplificadas a partir de route_geometry"""
+        for resolution, tolerance in GEOMETRY_TOLERANCES.items():
+            simplified = None
+            if self.route_geometry:
+                simplified = self.route_geometry.simplify(tolerance, preserve_topology=True)
+                if simplified.geom_type != 'LineString' or simplified.empty:
+                    simplified = self.route_geometry
+                simplified.srid = self.route_geometry.srid
+            setattr(self, f'route_geometry_{resolution}', simplified)
+    
+    def refresh_encoded_geometry(self):
+        """Recalcula la versión polyline6 de route_geometry"""
+        from .polyline import encode
+        self.route_polyline6 = encode(self.route_geometry.coords) if self.route_geometry else None
+    
+    def refresh_derived_geometries(self):
+        """Recalcula todas las geometrías derivadas de route_geometry"""
+        self.refresh_simplified_geometries()
+        self.refresh_encoded_geometry()
+    
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'route_geometry' in update_fields:
+            self.refresh_derived_geometries()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {
+                    f'route_geometry_{resolution}' for resolution in GEOMETRY_TOLERANCES
+                } | {'route_polyline6'}
+        super().save(*args, **kwargs)
+    
+    def geometry_for(self, resolution: str = 'full'):
+        """Retorna la geometría en la resolución pedida (full, medium, low)"""
+        if resolution in GEOMETRY_TOLERANCES:
+            return getattr(self, f'route_geometry_{resolution}') or self.route_geometry
+        return self.route_geometry
+    
+    def polyline_for(self, resolution: str = 'full'):
+        """Retorna la geometría en la resolución pedida codificada como polyline6"""
+        if resolution == 'full' and self.route_polyline6:
+            return self.route_polyline6
+        from .polyline import encode
+        geom = self.geometry_for(resolution)
+        return encode(geom.coords) if geom else None
 
 
 class RouteWaypoint(models.Model):
@@ -129,6 +190,17 @@ class RouteWaypoint(models.Model):
         blank=True
     )
     estimated_service_minutes = models.IntegerField(default=5)
+    # Tramo OSRM que llega a esta parada desde la anterior (None en la primera)
+    leg_duration_seconds = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="Duración OSRM desde la parada anterior"
+    )
+    leg_distance_meters = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="Distancia OSRM desde la parada anterior"
+    )
     notes = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
@@ -141,3 +213,134 @@ class RouteWaypoint(models.Model):
     
     def __str__(self):
         return f"{self.route.route_name} - Waypoint {self.waypoint_order}"
+
+
+class ZoneDistanceMatrix(models.Model):
+    """
+    Matriz de duraciones/distancias precalculada entre las paradas de una zona.
+    Las matrices se guardan como blobs float32 (fila mayor) para evitar
+    consultar /table en cada optimización.
+    """
+    
+    zone = models.OneToOneField(
+        CleaningZone,
+        on_delete=models.CASCADE,
+        related_name='distance_matrix'
+    )
+    size = models.IntegerField(default=0, help_text="Número de paradas (N)")
+    coordinates = models.BinaryField(help_text="Array float64 Nx2 (lon, lat) en orden de matriz")
+    durations = models.BinaryField(help_text="Array float32 NxN de duraciones en segundos")
+    distances = models.BinaryField(help_text="Array float32 NxN de distancias en metros")
+    fingerprint = models.CharField(
+        max_length=64,
+        db_index=True,
+        help_text="SHA-256 del conjunto de coordenadas"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'zone_distance_matrices'
+        verbose_name = 'Matriz de Distancias de Zona'
+        verbose_name_plural = 'Matrices de Distancias de Zonas'
+    
+    def __str__(self):
+        return f"{self.zone.zone_name} ({self.size}x{self.size})"
+
+
+class RoadSnap(models.Model):
+    """
+    Resultado persistido de OSRM /nearest para una celda de la grilla de
+    snapping (ver snapping.py). Sobrevive a reinicios y se comparte entre
+    workers; la caché LRU de cada proceso se llena desde aquí.
+    """
+    
+    cell = models.CharField(
+        max_length=64,
+        unique=True,
+        help_text="Celda de la grilla: '<tamaño_m>:<fila>:<columna>'"
+    )
+    snapped_location = models.PointField(srid=4326, help_text="Punto sobre la red vial")
+    road_name = models.CharField(max_length=200, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'road_snaps'
+        verbose_name = 'Snap a Red Vial'
+        verbose_name_plural = 'Snaps a Red Vial'
+    
+    def __str__(self):
+        return f"{self.cell} -> {self.road_name or 'sin nombre'}"
+
+
+class RouteLeg(models.Model):
+    """
+    Tramo OSRM entre dos paradas consecutivas de una ruta.
+
+    Duración y distancia son columnas normales (consultas SQL directas, p. ej.
+    tramos más lentos por zona); las anotaciones por segmento se guardan como
+    arrays empaquetados y los pasos como JSON reducido.
+    """
+    
+    route = models.ForeignKey(
+        Route,
+        on_delete=models.CASCADE,
+        related_name='legs'
+    )
+    # Denormalizado desde la ruta para agrupar por zona sin JOIN
+    zone = models.ForeignKey(
+        CleaningZone,
+        on_delete=models.SET_NULL,
+        related_name='route_legs',
+        null=True,
+        blank=True
+    )
+    leg_index = models.IntegerField(help_text="Posición del tramo en la ruta (0 = primero)")
+    from_waypoint = models.ForeignKey(
+        RouteWaypoint,
+        on_delete=models.SET_NULL,
+        related_name='outgoing_legs',
+        null=True,
+        blank=True
+    )
+    to_waypoint = models.ForeignKey(
+        RouteWaypoint,
+        on_delete=models.SET_NULL,
+        related_name='incoming_legs',
+        null=True,
+        blank=True
+    )
+    duration_seconds = models.FloatField()
+    distance_meters = models.FloatField()
+    step_count = models.IntegerField(default=0)
+    steps = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="Pasos [nombre, tipo, modificador, distancia, duración]"
+    )
+    segment_count = models.IntegerField(default=0)
+    annotation_durations = models.BinaryField(null=True, blank=True, help_text="float32 por segmento")
+    annotation_distances = models.BinaryField(null=True, blank=True, help_text="float32 por segmento")
+    annotation_speeds = models.BinaryField(null=True, blank=True, help_text="float32 por segmento")
+    annotation_nodes = models.BinaryField(null=True, blank=True, help_text="int64 (ids de nodos OSM)")
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'route_legs'
+        verbose_name = 'Tramo de Ruta'
+        verbose_name_plural = 'Tramos de Ruta'
+        ordering = ['route', 'leg_index']
+        unique_together = ['route', 'leg_index']
+        indexes = [
+            models.Index(fields=['zone', '-duration_seconds'], name='route_legs_zone_duration_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.route.route_name} - Tramo {self.leg_index}"
+    
+    def annotation(self, name: str):
+        """Array NumPy de la anotación empaquetada (durations, distances, speeds, nodes)"""
+        import numpy as np
+        raw = getattr(self, f'annotation_{name}')
+        dtype = '<i8' if name == 'nodes' else '<f4'
+        return np.frombuffer(bytes(raw), dtype=dtype) if raw else np.empty(0, dtype=dtype)
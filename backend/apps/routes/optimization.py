@@ -0,0 +1,483 @@
+"""
+Motor de optimización de rutas en proceso (VRP).
+
+Resuelve el problema de ruteo de vehículos con capacidad y ventanas de tiempo
+(CVRPTW) a partir de la matriz de duraciones de OSRM (/table):
+  1. Construcción por vecino más cercano, vectorizada con NumPy
+  2. Búsqueda local 2-opt (intra-ruta) y Or-opt (intra e inter-ruta)
+     con presupuesto de tiempo
+"""
+
+import logging
+import math
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from django.contrib.gis.geos import Point
+from django.db import transaction
+from django.db.models import F
+
+from .zone_matrix import get_zone_matrix, submatrix
+
+logger = logging.getLogger(__name__)
+
+
+ALGORITHM_NAME = 'vrp-nn-2opt-oropt'
+
+
+class VRPApplyError(Exception):
+    """No se pudo calcular con OSRM la ruta de algún vehículo: no se guardó nada"""
+
+    def __init__(self, message: str, approximate: bool = False):
+        super().__init__(message)
+        self.approximate = approximate
+
+
+class VRPSolver:
+    """Solver CVRPTW: vecino más cercano + 2-opt/Or-opt"""
+
+    def __init__(
+        self,
+        durations: Sequence[Sequence[Optional[float]]],
+        service_times: Optional[Sequence[float]] = None,
+        demands: Optional[Sequence[float]] = None,
+        vehicle_count: int = 1,
+        vehicle_capacity: Optional[float] = None,
+        time_windows: Optional[Sequence[Tuple[float, float]]] = None,
+        max_route_duration: Optional[float] = None,
+        depot: int = 0,
+        time_budget: float = 2.0
+    ):
+        """
+        Args:
+            durations: Matriz NxN de duraciones en segundos (None = sin ruta)
+            service_times: Tiempo de servicio en segundos por nodo
+            demands: Demanda por nodo (default: 1 por parada, 0 en el depósito)
+            vehicle_count: Número de vehículos/equipos disponibles
+            vehicle_capacity: Capacidad por vehículo (default: reparto equitativo)
+            time_windows: Ventanas (inicio, fin) en segundos desde el inicio del turno
+            max_route_duration: Duración máxima de cada ruta en segundos
+            depot: Índice del depósito (inicio y fin de cada ruta)
+            time_budget: Tiempo máximo de búsqueda local en segundos
+        """
+        D = np.array(durations, dtype=np.float64)
+        if D.ndim != 2 or D.shape[0] != D.shape[1]:
+            raise ValueError("La matriz de duraciones debe ser cuadrada")
+        D[~np.isfinite(D)] = np.inf
+        self.durations = D
+        self.n = D.shape[0]
+        self.depot = depot
+        self.vehicle_count = max(int(vehicle_count), 1)
+        self.time_budget = time_budget
+
+        self.service = (
+            np.array(service_times, dtype=np.float64) if service_times is not None
+            else np.zeros(self.n)
+        )
+        self.service[depot] = 0.0
+
+        if demands is not None:
+            self.demands = np.array(demands, dtype=np.float64)
+        else:
+            self.demands = np.ones(self.n)
+        self.demands[depot] = 0.0
+
+        if vehicle_capacity is None:
+            vehicle_capacity = math.ceil(self.demands.sum() / self.vehicle_count) or 1
+        self.capacity = float(vehicle_capacity)
+
+        if time_windows is not None:
+            tw = np.array(time_windows, dtype=np.float64)
+            self.tw_start, self.tw_end = tw[:, 0].copy(), tw[:, 1].copy()
+        else:
+            self.tw_start = np.zeros(self.n)
+            self.tw_end = np.full(self.n, np.inf)
+        if max_route_duration is not None:
+            self.tw_end[depot] = min(self.tw_end[depot], self.tw_start[depot] + max_route_duration)
+
+    # ========== EVALUACIÓN ==========
+
+    def route_cost(self, route: Sequence[int]) -> float:
+        """
+        Costo (segundos de viaje) de una ruta de clientes, o inf si es infactible.
+        La ruta no incluye el depósito; se asume salida y regreso a él.
+        """
+        if not route:
+            return 0.0
+        if self.demands[list(route)].sum() > self.capacity:
+            return math.inf
+
+        D = self.durations
+        t = self.tw_start[self.depot]
+        travel = 0.0
+        prev = self.depot
+        for node in route:
+            leg = D[prev, node]
+            travel += leg
+            t = max(t + leg, self.tw_start[node])
+            if t > self.tw_end[node]:
+                return math.inf
+            t += self.service[node]
+            prev = node
+        leg = D[prev, self.depot]
+        travel += leg
+        if t + leg > self.tw_end[self.depot]:
+            return math.inf
+        return travel
+
+    def route_duration(self, route: Sequence[int]) -> float:
+        """Duración total (viaje + espera + servicio) de una ruta en segundos"""
+        D = self.durations
+        start = self.tw_start[self.depot]
+        t = start
+        prev = self.depot
+        for node in route:
+            t = max(t + D[prev, node], self.tw_start[node]) + self.service[node]
+            prev = node
+        return float(t + D[prev, self.depot] - start)
+
+    # ========== CONSTRUCCIÓN ==========
+
+    def _nearest_neighbour(self) -> Tuple[List[List[int]], List[int]]:
+        """Construye rutas por vecino más cercano evaluando todos los candidatos en bloque"""
+        D = self.durations
+        depot = self.depot
+        unvisited = np.ones(self.n, dtype=bool)
+        unvisited[depot] = False
+        return_leg = D[:, depot]
+        routes = []
+
+        for _ in range(self.vehicle_count):
+            route = []
+            current = depot
+            t = self.tw_start[depot]
+            load = 0.0
+            while unvisited.any():
+                begin = np.maximum(t + D[current], self.tw_start)
+                feasible = (
+                    unvisited
+                    & np.isfinite(begin)
+                    & (begin <= self.tw_end)
+                    & (load + self.demands <= self.capacity)
+                    & (begin + self.service + return_leg <= self.tw_end[depot])
+                )
+                if not feasible.any():
+                    break
+                score = np.where(feasible, begin - t, np.inf)
+                nxt = int(np.argmin(score))
+                route.append(nxt)
+                unvisited[nxt] = False
+                load += self.demands[nxt]
+                t = begin[nxt] + self.service[nxt]
+                current = nxt
+            routes.append(route)
+
+        return routes, [int(i) for i in np.flatnonzero(unvisited)]
+
+    # ========== BÚSQUEDA LOCAL ==========
+
+    def _two_opt(self, route: List[int], cost: float, deadline: float) -> Tuple[List[int], float]:
+        """Invierte segmentos de la ruta mientras mejore el costo"""
+        improved = True
+        while improved and time.perf_counter() < deadline:
+            improved = False
+            for i in range(len(route) - 1):
+                for j in range(i + 2, len(route) + 1):
+                    candidate = route[:i] + route[i:j][::-1] + route[j:]
+                    candidate_cost = self.route_cost(candidate)
+                    if candidate_cost < cost - 1e-9:
+                        route, cost = candidate, candidate_cost
+                        improved = True
+                        break
+                if improved or time.perf_counter() >= deadline:
+                    break
+        return route, cost
+
+    def _or_opt(self, routes: List[List[int]], costs: List[float], deadline: float) -> bool:
+        """
+        Mueve segmentos de 1 a 3 paradas a otra posición (misma u otra ruta).
+        Aplica la primera mejora encontrada; retorna True si hubo movimiento.
+        """
+        for a, source in enumerate(routes):
+            for seg_len in (1, 2, 3):
+                for i in range(len(source) - seg_len + 1):
+                    segment = source[i:i + seg_len]
+                    remainder = source[:i] + source[i + seg_len:]
+                    remainder_cost = self.route_cost(remainder)
+                    if not math.isfinite(remainder_cost):
+                        continue
+                    for b, target in enumerate(routes):
+                        base = remainder if a == b else target
+                        base_cost = costs[a] if a == b else costs[a] + costs[b]
+                        for j in range(len(base) + 1):
+                            if a == b and j == i:
+                                continue
+                            for seg in (segment, segment[::-1]):
+                                moved = base[:j] + seg + base[j:]
+                                moved_cost = self.route_cost(moved)
+                                new_cost = moved_cost if a == b else moved_cost + remainder_cost
+                                if new_cost < base_cost - 1e-9:
+                                    if a == b:
+                                        routes[a], costs[a] = moved, moved_cost
+                                    else:
+                                        routes[a], costs[a] = remainder, remainder_cost
+                                        routes[b], costs[b] = moved, moved_cost
+                                    return True
+                        if time.perf_counter() >= deadline:
+                            return False
+        return False
+
+    def _insert_unassigned(
+        self,
+        routes: List[List[int]],
+        costs: List[float],
+        unassigned: List[int],
+        deadline: float = math.inf
+    ) -> List[int]:
+        """
+        Intenta insertar las paradas pendientes en la posición más barata factible;
+        al llegar a deadline las que falten quedan sin asignar.
+        """
+        remaining = []
+        for index, node in enumerate(unassigned):
+            if time.perf_counter() >= deadline:
+                remaining.extend(unassigned[index:])
+                break
+            best = None
+            for r, route in enumerate(routes):
+                for j in range(len(route) + 1):
+                    candidate = route[:j] + [node] + route[j:]
+                    delta = self.route_cost(candidate) - costs[r]
+                    if math.isfinite(delta) and (best is None or delta < best[0]):
+                        best = (delta, r, candidate)
+            if best is None:
+                remaining.append(node)
+                continue
+            _, r, candidate = best
+            routes[r] = candidate
+            costs[r] = self.route_cost(candidate)
+        return remaining
+
+    # ========== API PÚBLICA ==========
+
+    def solve(self) -> Dict:
+        """
+        Resuelve el problema.
+
+        Returns:
+            Dict con rutas por vehículo (índices de nodos, sin depósito),
+            duraciones, paradas no asignadas y estadísticas de búsqueda
+        """
+        started = time.perf_counter()
+        deadline = started + self.time_budget
+
+        routes, unassigned = self._nearest_neighbour()
+        costs = [self.route_cost(route) for route in routes]
+        unassigned = self._insert_unassigned(routes, costs, unassigned, deadline)
+        initial_cost = sum(costs)
+
+        iterations = 0
+        while time.perf_counter() < deadline:
+            iterations += 1
+            for r in range(len(routes)):
+                routes[r], costs[r] = self._two_opt(routes[r], costs[r], deadline)
+            if not self._or_opt(routes, costs, deadline):
+                break
+
+        elapsed = time.perf_counter() - started
+        total = float(sum(costs))
+        logger.info(
+            f"VRP resuelto: {self.n - 1} paradas, {self.vehicle_count} vehículos, "
+            f"costo {initial_cost:.0f}s -> {total:.0f}s en {elapsed:.2f}s"
+        )
+
+        return {
+            'success': True,
+            'algorithm': ALGORITHM_NAME,
+            'routes': routes,
+            'route_travel_seconds': [float(c) for c in costs],
+            'route_durations_seconds': [self.route_duration(route) for route in routes],
+            'total_travel_seconds': total,
+            'initial_travel_seconds': float(initial_cost),
+            'unassigned': unassigned,
+            'iterations': iterations,
+            'elapsed_seconds': round(elapsed, 4),
+        }
+
+
+def solve_route_waypoints(
+    route,
+    osrm,
+    vehicle_count: Optional[int] = None,
+    vehicle_capacity: Optional[float] = None,
+    time_windows: Optional[Dict[int, Tuple[float, float]]] = None,
+    max_route_minutes: Optional[int] = None,
+    time_budget: float = 2.0
+) -> Dict:
+    """
+    Resuelve el VRP para los waypoints de una ruta existente.
+
+    La matriz de duraciones se toma de ZoneDistanceMatrix cuando la ruta tiene
+    zona. El primer waypoint (o el de tipo 'start') actúa como depósito. El número de
+    vehículos se toma de CleaningZone.assigned_team_size y los tiempos de
+    servicio de RouteWaypoint.estimated_service_minutes.
+
+    Args:
+        route: Instancia de Route
+        osrm: Servicio OSRM usado para la matriz de duraciones
+        vehicle_count: Vehículos disponibles (default: equipo asignado a la zona)
+        vehicle_capacity: Paradas máximas por vehículo
+        time_windows: {waypoint_order: (inicio_min, fin_min)} desde el inicio del turno
+        max_route_minutes: Duración máxima por ruta
+        time_budget: Presupuesto de búsqueda local en segundos
+    """
+    waypoints = list(route.route_waypoints.order_by('waypoint_order'))
+    if len(waypoints) < 2:
+        return {'success': False, 'error': 'La ruta necesita al menos 2 waypoints'}
+
+    depot = next((i for i, wp in enumerate(waypoints) if wp.waypoint_type == 'start'), 0)
+    if vehicle_count is None:
+        vehicle_count = route.zone.assigned_team_size if route.zone_id else 1
+
+    coordinates = [(wp.location.x, wp.location.y) for wp in waypoints]
+    durations = None
+    approximate = False
+    if route.zone_id:
+        zone_matrix = get_zone_matrix(route.zone, osrm)
+        if zone_matrix.get('success'):
+            durations = submatrix(zone_matrix, coordinates)
+            approximate = zone_matrix.get('approximate', False)
+    if durations is None:
+        matrix = osrm.calculate_matrix(coordinates, compact=True)
+        if not matrix.get('success'):
+            return {'success': False, 'error': matrix.get('error', 'Error al calcular matriz')}
+        durations = matrix['durations']
+        approximate = matrix.get('approximate', False)
+
+    windows = None
+    if time_windows:
+        windows = [
+            tuple(m * 60 for m in time_windows.get(wp.waypoint_order, (0, math.inf)))
+            for wp in waypoints
+        ]
+
+    solver = VRPSolver(
+        durations=durations,
+        service_times=[wp.estimated_service_minutes * 60 for wp in waypoints],
+        vehicle_count=vehicle_count,
+        vehicle_capacity=vehicle_capacity,
+        time_windows=windows,
+        max_route_duration=max_route_minutes * 60 if max_route_minutes else None,
+        depot=depot,
+        time_budget=time_budget
+    )
+    result = solver.solve()
+    result['waypoints'] = waypoints
+    result['depot'] = depot
+    result['approximate'] = approximate
+    return result
+
+
+def apply_vrp_solution(route, solution: Dict, osrm) -> List:
+    """
+    Persiste la solución del VRP.
+
+    La primera ruta de vehículo reescribe la ruta original; las restantes se
+    crean como rutas nuevas en la misma zona, partiendo del mismo depósito.
+
+    Las rutas OSRM de todos los vehículos se calculan antes de abrir la
+    transacción (sin bloquear filas durante las peticiones). Si alguna falla o
+    es una estimación en línea recta (circuito abierto) no se guarda nada.
+
+    Raises:
+        VRPApplyError: Si OSRM no devolvió una ruta real para algún vehículo
+
+    Returns:
+        Lista de rutas (Route) resultantes
+    """
+    from .bulk import apply_leg_metrics
+    from .legs import replace_route_legs
+    from .models import Route, RouteWaypoint
+
+    waypoints = solution['waypoints']
+    depot_wp = waypoints[solution['depot']]
+    vehicle_routes = [r for r in solution['routes'] if r]
+    if not vehicle_routes:
+        return [route]
+
+    plans = []
+    for nodes in vehicle_routes:
+        ordered = [waypoints[i] for i in nodes]
+        coordinates = [(depot_wp.location.x, depot_wp.location.y)]
+        coordinates += [(wp.location.x, wp.location.y) for wp in ordered]
+        coordinates.append(coordinates[0])
+        osrm_result = osrm.calculate_route(coordinates)
+        if not osrm_result.get('success'):
+            raise VRPApplyError(osrm_result.get('error', 'Error al calcular ruta'))
+        if osrm_result.get('approximate'):
+            raise VRPApplyError('OSRM no disponible (circuito abierto)', approximate=True)
+        plans.append((ordered, coordinates, osrm_result))
+
+    results = []
+    with transaction.atomic():
+        # Desplazar órdenes para no violar unique_together durante la reasignación
+        RouteWaypoint.objects.filter(route=route).update(waypoint_order=F('waypoint_order') * -1 - 1)
+
+        for k, (ordered, coordinates, osrm_result) in enumerate(plans):
+            if k == 0:
+                target = route
+                depot_wp.waypoint_order = 0
+                depot_wp.leg_duration_seconds = None
+                depot_wp.leg_distance_meters = None
+                depot_wp.save(update_fields=['waypoint_order', 'leg_duration_seconds', 'leg_distance_meters'])
+                start_wp = depot_wp
+            else:
+                target = Route.objects.create(
+                    route_name=f"{route.route_name} ({k + 1}/{len(vehicle_routes)})",
+                    zone_id=route.zone_id,
+                    route_geometry=osrm_result['geometry'],
+                    waypoints=[],
+                    optimization_algorithm=solution['algorithm']
+                )
+                start_wp = RouteWaypoint.objects.create(
+                    route=target,
+                    waypoint_order=0,
+                    location=Point(depot_wp.location.x, depot_wp.location.y, srid=4326),
+                    address=depot_wp.address,
+                    waypoint_type=depot_wp.waypoint_type,
+                    estimated_service_minutes=depot_wp.estimated_service_minutes,
+                    notes=depot_wp.notes
+                )
+
+            for order, wp in enumerate(ordered, start=1):
+                wp.route = target
+                wp.waypoint_order = order
+            legs = osrm_result.get('legs', [])
+            apply_leg_metrics([start_wp] + ordered, legs)
+            RouteWaypoint.objects.bulk_update(
+                ordered, ['route', 'waypoint_order', 'leg_duration_seconds', 'leg_distance_meters']
+            )
+
+            target.waypoints = [{'lat': lat, 'lon': lon} for lon, lat in coordinates[:-1]]
+            target.optimization_algorithm = solution['algorithm']
+            target.route_geometry = osrm_result['geometry']
+            target.total_distance_km = osrm_result['distance_km']
+            target.estimated_duration_minutes = osrm_result['duration_minutes']
+            target.save()
+            replace_route_legs(target, [start_wp] + ordered, legs)
+            results.append(target)
+
+        # Paradas no asignadas: se conservan al final de la ruta original
+        next_order = len(vehicle_routes[0]) + 1
+        leftovers = [waypoints[i] for i in solution['unassigned']]
+        for order, wp in enumerate(leftovers, start=next_order):
+            wp.waypoint_order = order
+            # Fuera del recorrido calculado: sin tramo OSRM conocido
+            wp.leg_duration_seconds = None
+            wp.leg_distance_meters = None
+        if leftovers:
+            RouteWaypoint.objects.bulk_update(
+                leftovers, ['waypoint_order', 'leg_duration_seconds', 'leg_distance_meters']
+            )
+
+    return results
@@ -5,25 +5,219 @@ para cálculo de rutas optimizadas en el sistema de gestión de residuos.
 
 import requests
 import logging
+import numpy as np
+import threading
 from typing import List, Dict, Tuple, Optional
-from django.contrib.gis.geos import LineString, Point
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.conf import settings
 from decimal import Decimal
+from . import approximate
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .route_cache import RouteCache
+from .geometry import linestring_from_osrm
+from .matrix import MatrixBuilder, dedupe_coordinates
 
 logger = logging.getLogger(__name__)
 
 
+# Timeouts por endpoint: (conexión, lectura) en segundos
+DEFAULT_TIMEOUTS = {
+    'route': (3.05, 30),
+    'trip': (3.05, 30),
+    'table': (3.05, 30),
+    'match': (3.05, 30),
+    'nearest': (3.05, 10),
+    'health': (2, 5),
+}
+
+
 class OSRMService:
     """Cliente para interactuar con el servicio OSRM"""
     
-    def __init__(self, base_url: str = "http://osrm:5000"):
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        pool_size: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        backoff_factor: Optional[float] = None,
+        timeouts: Optional[Dict[str, Tuple[float, float]]] = None,
+        cache: Optional[RouteCache] = None
+    ):
         """
-        Inicializa el servicio OSRM.
+        Inicializa el servicio OSRM con una sesión HTTP persistente.
         
         Args:
             base_url: URL base del servicio OSRM (default: contenedor Docker)
+            pool_size: Máximo de conexiones keep-alive reutilizables
+            max_retries: Reintentos ante errores de conexión o 502/503/504
+            backoff_factor: Factor de espera exponencial entre reintentos
+            timeouts: Timeouts (conexión, lectura) por endpoint
+            cache: Caché de respuestas para /route, /trip y /table (opcional)
         """
+        base_url = base_url or getattr(settings, 'OSRM_URL', 'http://osrm:5000')
         self.base_url = base_url.rstrip('/')
         self.timeout = 30  # segundos
+        self.pool_size = pool_size or getattr(settings, 'OSRM_POOL_SIZE', 10)
+        self.max_retries = (
+            max_retries if max_retries is not None
+            else getattr(settings, 'OSRM_MAX_RETRIES', 2)
+        )
+        self.backoff_factor = (
+            backoff_factor if backoff_factor is not None
+            else getattr(settings, 'OSRM_RETRY_BACKOFF', 0.3)
+        )
+        self.timeouts = dict(DEFAULT_TIMEOUTS)
+        self.timeouts.update(getattr(settings, 'OSRM_TIMEOUTS', {}))
+        if timeouts:
+            self.timeouts.update(timeouts)
+        
+        self._metrics_lock = threading.Lock()
+        self._metrics = {'requests': 0, 'errors': 0, 'by_endpoint': {}}
+        self.max_table_size = getattr(settings, 'OSRM_MAX_TABLE_SIZE', 100)
+        self.matrix_workers = getattr(settings, 'OSRM_MATRIX_WORKERS', 4)
+        self.session = self._build_session()
+        self.cache = cache
+        # Con el circuito abierto /route, /trip y /table responden con estimaciones en línea recta
+        self.breaker = CircuitBreaker('osrm', probe=self.health_check)
+    
+    def _build_session(self) -> requests.Session:
+        """
+        Crea la sesión HTTP con pool de conexiones y reintentos.
+
+        Se reintentan los errores de conexión y las respuestas 502/503/504, que
+        fallan rápido. Los timeouts de lectura no: cada uno ya consumió el timeout
+        completo y reintentarlo multiplicaría la espera del cliente; ese fallo lo
+        cuenta el circuit breaker.
+        """
+        retry = Retry(
+            total=self.max_retries,
+            connect=self.max_retries,
+            read=0,
+            status=self.max_retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(['GET']),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.pool_size,
+            max_retries=retry
+        )
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update({'Connection': 'keep-alive'})
+        return session
+    
+    def _get(self, endpoint: str, url: str, params: Optional[Dict] = None) -> requests.Response:
+        """
+        Ejecuta un GET sobre la sesión compartida aplicando el timeout del endpoint.
+        
+        Args:
+            endpoint: Nombre del servicio OSRM (route, trip, table, ...)
+            url: URL completa de la petición
+            params: Parámetros de query string
+        """
+        timeout = self.timeouts.get(endpoint, (3.05, self.timeout))
+        # La sonda de salud no pasa por el circuito: es la que lo vuelve a cerrar
+        guarded = endpoint != 'health'
+        if guarded:
+            self.breaker.check()
+        try:
+            response = self.session.get(url, params=params, timeout=timeout)
+        except requests.exceptions.RequestException:
+            self._record_request(endpoint, failed=True)
+            if guarded:
+                self.breaker.record_failure()
+            raise
+        self._record_request(endpoint, failed=response.status_code >= 400)
+        if guarded:
+            # 4xx es un error de la petición (NoRoute, NoMatch...), no una caída de OSRM
+            if response.status_code >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+        return response
+    
+    def _fetch_json(
+        self,
+        endpoint: str,
+        url: str,
+        params: Optional[Dict] = None,
+        cache_key: Optional[str] = None
+    ) -> Dict:
+        """
+        Obtiene la respuesta JSON de OSRM, consultando primero la caché si hay clave.
+        Solo se almacenan respuestas con code == 'Ok'.
+        """
+        if cache_key and self.cache is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        response = self._get(endpoint, url, params=params)
+        response.raise_for_status()
+        data = response.json()
+        
+        if cache_key and self.cache is not None and data.get('code') == 'Ok':
+            self.cache.set(cache_key, data)
+        return data
+    
+    def _cache_key(self, service: str, profile: str, coordinates, params: Dict) -> Optional[str]:
+        """Clave de caché para la petición, o None si la caché está deshabilitada"""
+        if self.cache is None:
+            return None
+        return self.cache.make_key(service, profile, coordinates, params)
+    
+    def _record_request(self, endpoint: str, failed: bool = False):
+        """Acumula contadores de peticiones por endpoint"""
+        with self._metrics_lock:
+            self._metrics['requests'] += 1
+            stats = self._metrics['by_endpoint'].setdefault(
+                endpoint, {'requests': 0, 'errors': 0}
+            )
+            stats['requests'] += 1
+            if failed:
+                self._metrics['errors'] += 1
+                stats['errors'] += 1
+    
+    def get_metrics(self) -> Dict:
+        """
+        Retorna métricas de uso del cliente, incluyendo reutilización de conexiones.
+        
+        Returns:
+            Dict con peticiones, errores y conexiones abiertas/reutilizadas
+        """
+        connections_opened = 0
+        pool_requests = 0
+        adapter = self.session.get_adapter(self.base_url)
+        for key in list(adapter.poolmanager.pools.keys()):
+            pool = adapter.poolmanager.pools.get(key)
+            if pool is None:
+                continue
+            connections_opened += pool.num_connections
+            pool_requests += pool.num_requests
+        
+        with self._metrics_lock:
+            metrics = {
+                'requests': self._metrics['requests'],
+                'errors': self._metrics['errors'],
+                'by_endpoint': {k: dict(v) for k, v in self._metrics['by_endpoint'].items()},
+            }
+        metrics.update({
+            'pool_size': self.pool_size,
+            'connections_opened': connections_opened,
+            'connections_reused': max(pool_requests - connections_opened, 0),
+        })
+        if self.cache is not None:
+            metrics['cache'] = self.cache.get_stats()
+        return metrics
+    
+    def close(self):
+        """Cierra las conexiones del pool"""
+        self.session.close()
     
     def calculate_route(
         self,
@@ -57,14 +251,12 @@ class OSRMService:
         }
         
         try:
-            response = requests.get(url, params=params, timeout=self.timeout)
-            response.raise_for_status()
-            
-            data = response.json()
+            cache_key = self._cache_key('route', profile, coordinates, params)
+            data = self._fetch_json('route', url, params=params, cache_key=cache_key)
             
             if data.get('code') == 'Ok':
                 logger.info(f"Ruta calculada exitosamente: {len(coordinates)} puntos")
-                return self._process_route_response(data)
+                return self._process_route_response(data, geometries)
             else:
                 logger.error(f"Error OSRM: {data.get('message', 'Unknown error')}")
                 return {
@@ -72,6 +264,9 @@ class OSRMService:
                     'error': data.get('message', 'Unknown error')
                 }
         
+        except CircuitOpenError:
+            return self._process_route_response(approximate.route_data(coordinates, geometries), geometries)
+        
         except requests.exceptions.Timeout:
             logger.error(f"Timeout al conectar con OSRM: {url}")
             return {'success': False, 'error': 'Timeout al calcular ruta'}
@@ -89,7 +284,9 @@ class OSRMService:
         coordinates: List[Tuple[float, float]],
         roundtrip: bool = True,
         source: str = 'first',
-        destination: str = 'last'
+        destination: str = 'last',
+        geometries: str = 'geojson',
+        annotations: bool = False
     ) -> Dict:
         """
         Optimiza el orden de visita de múltiples puntos (Travelling Salesman Problem).
@@ -99,6 +296,8 @@ class OSRMService:
             roundtrip: Si True, retorna al punto de inicio
             source: Índice del punto de inicio ('first', 'any', o índice)
             destination: Índice del punto final ('last', 'any', o índice)
+            geometries: Formato de geometría (geojson, polyline, polyline6)
+            annotations: Incluir anotaciones por segmento en cada leg
         
         Returns:
             Dict con ruta optimizada
@@ -111,20 +310,20 @@ class OSRMService:
             'roundtrip': str(roundtrip).lower(),
             'source': source,
             'destination': destination,
-            'geometries': 'geojson',
+            'geometries': geometries,
             'overview': 'full',
             'steps': 'true'
         }
+        if annotations:
+            params['annotations'] = 'true'
         
         try:
-            response = requests.get(url, params=params, timeout=self.timeout)
-            response.raise_for_status()
-            
-            data = response.json()
+            cache_key = self._cache_key('trip', 'driving', coordinates, params)
+            data = self._fetch_json('trip', url, params=params, cache_key=cache_key)
             
             if data.get('code') == 'Ok':
                 logger.info(f"Ruta optimizada exitosamente: {len(coordinates)} puntos")
-                return self._process_trip_response(data)
+                return self._process_trip_response(data, geometries)
             else:
                 logger.error(f"Error OSRM trip: {data.get('message', 'Unknown error')}")
                 return {
@@ -132,6 +331,10 @@ class OSRMService:
                     'error': data.get('message', 'Unknown error')
                 }
         
+        except CircuitOpenError:
+            data = approximate.trip_data(coordinates, roundtrip, source, destination, geometries)
+            return self._process_trip_response(data, geometries)
+        
         except Exception as e:
             logger.error(f"Error al optimizar ruta: {e}")
             return {'success': False, 'error': str(e)}
@@ -139,37 +342,44 @@ class OSRMService:
     def calculate_matrix(
         self,
         sources: List[Tuple[float, float]],
-        destinations: Optional[List[Tuple[float, float]]] = None
+        destinations: Optional[List[Tuple[float, float]]] = None,
+        compact: bool = False
     ) -> Dict:
         """
         Calcula matriz de distancias/duraciones entre múltiples puntos.
         
+        Las matrices que superan max_table_size se piden por bloques en paralelo.
+        
         Args:
             sources: Lista de tuplas (lon, lat) de origen
             destinations: Lista de tuplas (lon, lat) de destino (opcional)
+            compact: Si True, retorna np.ndarray float32 en lugar de listas
         
         Returns:
-            Dict con matrices de distancias y duraciones
+            Dict con matrices de distancias y duraciones; approximate=True si
+            alguna parte se estimó en línea recta (circuito OSRM abierto)
         """
         if destinations is None:
             destinations = sources
         
-        all_coords = sources + destinations
-        coords_string = ';'.join([f"{lon},{lat}" for lon, lat in all_coords])
-        
-        url = f"{self.base_url}/table/v1/driving/{coords_string}"
-        
-        params = {
-            'sources': ';'.join([str(i) for i in range(len(sources))]),
-            'destinations': ';'.join([str(i + len(sources)) for i in range(len(destinations))]),
-            'annotations': 'duration,distance'
-        }
+        coordinates, source_idx, destination_idx = dedupe_coordinates(sources, destinations)
+        
+        if compact or len(coordinates) > self.max_table_size:
+            builder = MatrixBuilder(
+                self,
+                max_table_size=self.max_table_size,
+                max_workers=self.matrix_workers
+            )
+            result = builder.build(sources, destinations)
+            if result.get('success') and not compact:
+                for key in ('durations', 'distances'):
+                    matrix = result[key].astype(object)
+                    matrix[np.isnan(result[key])] = None
+                    result[key] = matrix.tolist()
+            return result
         
         try:
-            response = requests.get(url, params=params, timeout=self.timeout)
-            response.raise_for_status()
-            
-            data = response.json()
+            data = self.table_request(coordinates, source_idx, destination_idx)
             
             if data.get('code') == 'Ok':
                 logger.info(f"Matriz calculada: {len(sources)}x{len(destinations)}")
@@ -178,7 +388,8 @@ class OSRMService:
                     'durations': data.get('durations', []),
                     'distances': data.get('distances', []),
                     'sources': sources,
-                    'destinations': destinations
+                    'destinations': destinations,
+                    'approximate': bool(data.get('approximate'))
                 }
             else:
                 return {'success': False, 'error': data.get('message', 'Unknown error')}
@@ -187,11 +398,46 @@ class OSRMService:
             logger.error(f"Error al calcular matriz: {e}")
             return {'success': False, 'error': str(e)}
     
+    def table_request(
+        self,
+        coordinates: List[Tuple[float, float]],
+        sources: List[int],
+        destinations: List[int],
+        profile: str = 'driving'
+    ) -> Dict:
+        """
+        Ejecuta una única petición /table y retorna la respuesta cruda de OSRM.
+        
+        Args:
+            coordinates: Lista de tuplas (lon, lat) sin repetidos
+            sources: Índices de origen dentro de coordinates
+            destinations: Índices de destino dentro de coordinates
+            profile: Perfil de ruta
+        """
+        coords_string = ';'.join([f"{lon},{lat}" for lon, lat in coordinates])
+        
+        url = f"{self.base_url}/table/v1/{profile}/{coords_string}"
+        
+        params = {
+            'sources': ';'.join([str(i) for i in sources]),
+            'destinations': ';'.join([str(i) for i in destinations]),
+            'annotations': 'duration,distance'
+        }
+        
+        cache_key = self._cache_key('table', profile, coordinates, params)
+        try:
+            return self._fetch_json('table', url, params=params, cache_key=cache_key)
+        except CircuitOpenError:
+            return approximate.table_data(coordinates, sources, destinations)
+    
     def match_route(
         self,
         coordinates: List[Tuple[float, float]],
         timestamps: Optional[List[int]] = None,
-        radiuses: Optional[List[int]] = None
+        radiuses: Optional[List[int]] = None,
+        geometries: str = 'geojson',
+        annotations: bool = True,
+        gaps: str = 'split'
     ) -> Dict:
         """
         Hace map-matching de coordenadas GPS a la red vial.
@@ -201,18 +447,23 @@ class OSRMService:
             coordinates: Lista de tuplas (lon, lat)
             timestamps: Timestamps Unix de cada coordenada (opcional)
             radiuses: Radio de búsqueda en metros para cada punto (opcional)
+            geometries: Formato de geometría (geojson, polyline, polyline6)
+            annotations: Incluir anotaciones por segmento (respuesta más pesada)
+            gaps: 'split' corta la traza en huecos temporales grandes, 'ignore' no
         
         Returns:
-            Dict con ruta ajustada a la red vial
+            Dict con ruta ajustada a la red vial. 'matchings' contiene todos los
+            tramos ajustados (OSRM divide la traza si no puede unirla)
         """
         coords_string = ';'.join([f"{lon},{lat}" for lon, lat in coordinates])
         
         url = f"{self.base_url}/match/v1/driving/{coords_string}"
         
         params = {
-            'geometries': 'geojson',
+            'geometries': geometries,
             'overview': 'full',
-            'annotations': 'true'
+            'annotations': str(annotations).lower(),
+            'gaps': gaps
         }
         
         if timestamps:
@@ -222,16 +473,26 @@ class OSRMService:
             params['radiuses'] = ';'.join([str(r) for r in radiuses])
         
         try:
-            response = requests.get(url, params=params, timeout=self.timeout)
-            response.raise_for_status()
+            response = self._get('match', url, params=params)
+            # OSRM responde 400 con JSON (code=NoMatch, TooBig...) si la traza no se puede ajustar
+            if response.status_code >= 500:
+                response.raise_for_status()
             
             data = response.json()
             
             if data.get('code') == 'Ok':
                 logger.info(f"Map matching exitoso: {len(coordinates)} puntos")
-                return self._process_route_response(data)
+                return self._process_match_response(data, geometries)
             else:
-                return {'success': False, 'error': data.get('message', 'Unknown error')}
+                return {
+                    'success': False,
+                    'code': data.get('code'),
+                    'error': data.get('message', 'Unknown error')
+                }
+        
+        except CircuitOpenError as e:
+            # Sin estimación posible: el llamador reintenta cuando OSRM vuelva
+            return {'success': False, 'code': 'CircuitOpen', 'error': str(e)}
         
         except Exception as e:
             logger.error(f"Error en map matching: {e}")
@@ -258,7 +519,7 @@ class OSRMService:
         params = {'number': number}
         
         try:
-            response = requests.get(url, params=params, timeout=self.timeout)
+            response = self._get('nearest', url, params=params)
             response.raise_for_status()
             
             data = response.json()
@@ -271,6 +532,9 @@ class OSRMService:
             else:
                 return {'success': False, 'error': data.get('message', 'Unknown error')}
         
+        except CircuitOpenError as e:
+            return {'success': False, 'code': 'CircuitOpen', 'error': str(e)}
+        
         except Exception as e:
             logger.error(f"Error al buscar punto cercano: {e}")
             return {'success': False, 'error': str(e)}
@@ -283,7 +547,7 @@ class OSRMService:
             True si está disponible, False en caso contrario
         """
         try:
-            response = requests.get(f"{self.base_url}/health", timeout=5)
+            response = self._get('health', f"{self.base_url}/health")
             return response.status_code == 200
         except Exception as e:
             logger.warning(f"OSRM no disponible: {e}")
@@ -291,7 +555,8 @@ class OSRMService:
     
     # ========== MÉTODOS PRIVADOS ==========
     
-    def _process_route_response(self, data: Dict) -> Dict:
+    @staticmethod
+    def _process_route_response(data: Dict, geometries: str = 'geojson') -> Dict:
         """Procesa la respuesta de /route o /match"""
         routes = data.get('routes', [])
         
@@ -301,12 +566,8 @@ class OSRMService:
         route = routes[0]
         geometry = route.get('geometry', {})
         
-        # Convertir geometría GeoJSON a LineString de Django
-        if geometry.get('type') == 'LineString':
-            coordinates = geometry.get('coordinates', [])
-            linestring = LineString([Point(lon, lat) for lon, lat in coordinates], srid=4326)
-        else:
-            linestring = None
+        # Convertir geometría a LineString de Django (vía EWKB, sin Point por vértice)
+        linestring = linestring_from_osrm(geometry, geometries)
         
         return {
             'success': True,
@@ -317,10 +578,24 @@ class OSRMService:
             'duration_minutes': int(route.get('duration', 0) / 60),
             'legs': route.get('legs', []),
             'waypoints': data.get('waypoints', []),
-            'raw_geometry': geometry
+            'raw_geometry': geometry,
+            'polyline6': geometry if geometries == 'polyline6' else None,
+            'approximate': bool(data.get('approximate'))
         }
     
-    def _process_trip_response(self, data: Dict) -> Dict:
+    @staticmethod
+    def _process_match_response(data: Dict, geometries: str = 'geojson') -> Dict:
+        """Procesa la respuesta de /match ('matchings' tiene la misma forma que 'routes')"""
+        matchings = data.get('matchings', [])
+        result = OSRMService._process_route_response(dict(data, routes=matchings), geometries)
+        if result.get('success'):
+            result['confidence'] = matchings[0].get('confidence')
+            result['matchings'] = matchings
+            result['tracepoints'] = data.get('tracepoints', [])
+        return result
+    
+    @staticmethod
+    def _process_trip_response(data: Dict, geometries: str = 'geojson') -> Dict:
         """Procesa la respuesta de /trip (optimización)"""
         trips = data.get('trips', [])
         
@@ -331,11 +606,7 @@ class OSRMService:
         geometry = trip.get('geometry', {})
         
         # Convertir geometría
-        if geometry.get('type') == 'LineString':
-            coordinates = geometry.get('coordinates', [])
-            linestring = LineString([Point(lon, lat) for lon, lat in coordinates], srid=4326)
-        else:
-            linestring = None
+        linestring = linestring_from_osrm(geometry, geometries)
         
         # Obtener orden optimizado de waypoints
         waypoints = data.get('waypoints', [])
@@ -351,9 +622,11 @@ class OSRMService:
             'legs': trip.get('legs', []),
             'waypoints': waypoints,
             'optimized_order': optimized_order,
-            'raw_geometry': geometry
+            'raw_geometry': geometry,
+            'polyline6': geometry if geometries == 'polyline6' else None,
+            'approximate': bool(data.get('approximate'))
         }
 
 
 # Instancia global del servicio
-osrm_service = OSRMService()
+osrm_service = OSRMService(cache=RouteCache.from_settings())
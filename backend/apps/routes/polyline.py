@@ -0,0 +1,71 @@
+"""
+Codificación/decodificación de geometrías en formato Google Encoded Polyline.
+
+OSRM usa polyline (precisión 5) y polyline6 (precisión 6). El orden de las
+coordenadas en el formato es (lat, lon); estas funciones reciben y retornan
+(lon, lat) como GeoJSON. Ambas operaciones están vectorizadas con NumPy.
+"""
+
+from typing import Sequence
+import numpy as np
+
+# Un int64 zigzag ocupa como máximo 13 grupos de 5 bits
+_MAX_CHUNKS = 13
+
+
+def encode(coordinates: Sequence[Sequence[float]], precision: int = 6) -> str:
+    """
+    Codifica [[lon, lat], ...] como polyline.
+
+    Args:
+        coordinates: Coordenadas (lista de listas o np.ndarray Nx2)
+        precision: Decimales (5 = polyline, 6 = polyline6)
+    """
+    coords = np.asarray(coordinates, dtype=np.float64)
+    if coords.size == 0:
+        return ''
+    scaled = np.round(coords[:, 1::-1] * (10 ** precision)).astype(np.int64)
+    deltas = np.diff(scaled, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+
+    # Zigzag: enteros con signo -> sin signo
+    values = ((deltas << 1) ^ (deltas >> 63)).astype(np.uint64)
+
+    shifts = np.arange(_MAX_CHUNKS, dtype=np.uint64) * np.uint64(5)
+    chunks = (values[:, None] >> shifts) & np.uint64(0x1f)
+
+    # Número de grupos necesarios por valor (al menos uno)
+    nonzero = (values[:, None] >> shifts) > 0
+    counts = np.maximum(nonzero.sum(axis=1), 1)
+    position = np.arange(_MAX_CHUNKS)
+    used = position[None, :] < counts[:, None]
+    continuation = position[None, :] < (counts[:, None] - 1)
+
+    chars = (chunks | np.where(continuation, np.uint64(0x20), np.uint64(0))) + np.uint64(63)
+    return chars[used].astype(np.uint8).tobytes().decode('ascii')
+
+
+def decode(encoded: str, precision: int = 6) -> np.ndarray:
+    """
+    Decodifica una polyline a np.ndarray Nx2 de (lon, lat).
+
+    Args:
+        encoded: Texto codificado
+        precision: Decimales (5 = polyline, 6 = polyline6)
+    """
+    if not encoded:
+        return np.empty((0, 2), dtype=np.float64)
+    data = np.frombuffer(encoded.encode('ascii'), dtype=np.uint8).astype(np.int64) - 63
+
+    ends = (data & 0x20) == 0
+    end_positions = np.flatnonzero(ends)
+    starts = np.concatenate(([0], end_positions[:-1] + 1))
+
+    # Posición de cada byte dentro de su valor
+    group = np.repeat(np.arange(len(starts)), end_positions - starts + 1)
+    offset = np.arange(len(data)) - starts[group]
+    contributions = (data & 0x1f) << (5 * offset)
+    values = np.add.reduceat(contributions, starts)
+
+    deltas = (values >> 1) ^ -(values & 1)
+    coords = np.cumsum(deltas.reshape(-1, 2), axis=0) / (10 ** precision)
+    return coords[:, ::-1]
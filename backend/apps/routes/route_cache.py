@@ -0,0 +1,285 @@
+"""
+Caché de respuestas OSRM direccionada por contenido.
+
+Las respuestas de /route, /trip y /table se indexan por un hash canónico del
+servicio, perfil, coordenadas redondeadas y parámetros de la petición.
+Se usan dos niveles:
+  - LRU local en proceso (acceso inmediato, por worker)
+  - Redis compartido entre workers (mismo servidor que CELERY_BROKER_URL)
+
+Si Redis falla no se vuelve a consultar hasta pasados
+ROUTE_CACHE_REDIS_RETRY_INTERVAL segundos (solo nivel local mientras tanto),
+así los misses no esperan el timeout del socket una y otra vez. Un valor de
+Redis que no se puede decodificar se trata como miss y se borra.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LocalLRUCache:
+    """LRU en memoria con expiración por TTL, seguro entre threads"""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._data: 'OrderedDict[str, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: int):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class InMemoryRedis:
+    """
+    Sustituto local de Redis con la misma interfaz mínima (get/setex/delete).
+    Se usa en pruebas y en entornos donde Redis no está disponible.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[float, bytes]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._data[key]
+                return None
+            return value
+
+    def setex(self, key: str, ttl: int, value: bytes):
+        with self._lock:
+            self._data[key] = (time.time() + ttl, value)
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            return sum(1 for key in keys if self._data.pop(key, None) is not None)
+
+    def flushdb(self):
+        with self._lock:
+            self._data.clear()
+
+
+class RouteCache:
+    """Caché de dos niveles (LRU local + Redis) para respuestas OSRM"""
+
+    KEY_PREFIX = 'osrm:v1:'
+
+    def __init__(
+        self,
+        redis_client: Any = None,
+        ttl: int = 6 * 3600,
+        local_size: int = 512,
+        coord_precision: int = 5,
+        redis_retry_interval: float = 30
+    ):
+        """
+        Args:
+            redis_client: Cliente con interfaz get/setex (redis.Redis o InMemoryRedis).
+                Si es None solo se usa el nivel local.
+            ttl: Tiempo de vida de las entradas en segundos
+            local_size: Máximo de entradas en el LRU local
+            coord_precision: Decimales conservados al redondear coordenadas
+            redis_retry_interval: Segundos sin usar Redis tras un error de conexión
+        """
+        self.redis = redis_client
+        self.ttl = ttl
+        self.coord_precision = coord_precision
+        self.redis_retry_interval = redis_retry_interval
+        self.local = LocalLRUCache(max_entries=local_size)
+        self._redis_unavailable_until = 0.0
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'local_hits': 0,
+            'redis_hits': 0,
+            'misses': 0,
+            'sets': 0,
+            'redis_errors': 0,
+            'redis_skipped': 0,
+            'redis_corrupt': 0,
+        }
+
+    @classmethod
+    def from_settings(cls) -> Optional['RouteCache']:
+        """Construye la caché a partir de la configuración de Django"""
+        if not getattr(settings, 'ROUTE_CACHE_ENABLED', True):
+            return None
+
+        redis_client = None
+        redis_url = getattr(settings, 'ROUTE_CACHE_REDIS_URL', None)
+        if redis_url:
+            try:
+                import redis
+                redis_client = redis.Redis.from_url(
+                    redis_url,
+                    socket_connect_timeout=0.5,
+                    socket_timeout=0.5
+                )
+            except ImportError:
+                logger.warning("redis no instalado, caché de rutas solo en memoria local")
+
+        return cls(
+            redis_client=redis_client,
+            ttl=getattr(settings, 'ROUTE_CACHE_TTL', 6 * 3600),
+            local_size=getattr(settings, 'ROUTE_CACHE_LOCAL_SIZE', 512),
+            coord_precision=getattr(settings, 'ROUTE_CACHE_COORD_PRECISION', 5),
+            redis_retry_interval=getattr(settings, 'ROUTE_CACHE_REDIS_RETRY_INTERVAL', 30)
+        )
+
+    def make_key(
+        self,
+        service: str,
+        profile: str,
+        coordinates: Iterable[Tuple[float, float]],
+        params: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        Genera la clave canónica de una petición OSRM.
+
+        Args:
+            service: Servicio OSRM (route, trip, table)
+            profile: Perfil de ruta (driving, foot, ...)
+            coordinates: Lista de tuplas (lon, lat)
+            params: Parámetros de la petición (el orden no importa)
+        """
+        precision = self.coord_precision
+        canonical = {
+            'service': service,
+            'profile': profile,
+            'coordinates': [
+                [round(float(lon), precision), round(float(lat), precision)]
+                for lon, lat in coordinates
+            ],
+            'params': {str(k): str(v) for k, v in (params or {}).items()},
+        }
+        encoded = json.dumps(canonical, sort_keys=True, separators=(',', ':'))
+        return self.KEY_PREFIX + hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+    # ========== REDIS ==========
+
+    def _redis_available(self) -> bool:
+        if self.redis is None:
+            return False
+        if time.monotonic() < self._redis_unavailable_until:
+            self._incr('redis_skipped')
+            return False
+        return True
+
+    def _redis_failed(self, action: str, error: Exception):
+        self._redis_unavailable_until = time.monotonic() + self.redis_retry_interval
+        logger.warning(
+            f"Error {action} caché Redis: {error} "
+            f"(solo caché local durante {self.redis_retry_interval}s)"
+        )
+        self._incr('redis_errors')
+
+    def _decode(self, key: str, raw: bytes) -> Optional[Dict]:
+        """Decodifica un valor de Redis; si está corrupto o no es nuestro lo borra"""
+        try:
+            return json.loads(zlib.decompress(raw))
+        except (zlib.error, ValueError, TypeError) as e:
+            logger.warning(f"Valor inválido en caché Redis ({key}): {e}")
+            self._incr('redis_corrupt')
+            try:
+                self.redis.delete(key)
+            except Exception as delete_error:
+                self._redis_failed('borrando', delete_error)
+            return None
+
+    # ========== API ==========
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Busca una respuesta en el LRU local y luego en Redis.
+        Los valores retornados se comparten entre llamadas y no deben mutarse.
+        """
+        value = self.local.get(key)
+        if value is not None:
+            self._incr('local_hits')
+            return value
+
+        if self._redis_available():
+            try:
+                raw = self.redis.get(key)
+            except Exception as e:
+                self._redis_failed('leyendo', e)
+                raw = None
+            value = self._decode(key, raw) if raw is not None else None
+            if value is not None:
+                self.local.set(key, value, self.ttl)
+                self._incr('redis_hits')
+                return value
+
+        self._incr('misses')
+        return None
+
+    def set(self, key: str, value: Dict):
+        """Guarda una respuesta en ambos niveles"""
+        self.local.set(key, value, self.ttl)
+        self._incr('sets')
+
+        if self._redis_available():
+            try:
+                payload = zlib.compress(json.dumps(value, separators=(',', ':')).encode('utf-8'))
+                self.redis.setex(key, self.ttl, payload)
+            except Exception as e:
+                self._redis_failed('escribiendo', e)
+
+    def clear_local(self):
+        """Vacía el nivel local (p. ej. entre pruebas)"""
+        self.local.clear()
+
+    def get_stats(self) -> Dict:
+        """Retorna contadores de aciertos/fallos y ocupación"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        hits = stats['local_hits'] + stats['redis_hits']
+        total = hits + stats['misses']
+        stats.update({
+            'hit_ratio': round(hits / total, 4) if total else 0.0,
+            'local_entries': len(self.local),
+            'local_evictions': self.local.evictions,
+            'redis_enabled': self.redis is not None,
+        })
+        return stats
+
+    def _incr(self, counter: str):
+        with self._stats_lock:
+            self._stats[counter] += 1
@@ -1,6 +1,45 @@
+from django.conf import settings
 from rest_framework import serializers
+from rest_framework_gis.fields import GeometryField
 from rest_framework_gis.serializers import GeoFeatureModelSerializer
-from .models import CleaningZone, Route, RouteWaypoint
+from .models import CleaningZone, Route, RouteLeg, RouteWaypoint, GEOMETRY_TOLERANCES
+
+
+def geometry_resolution(request) -> str:
+    """
+    Resuelve la resolución de geometría pedida en la query string.
+    ?resolution=full|medium|low tiene prioridad sobre ?zoom=N.
+    """
+    if request is None:
+        return 'full'
+    params = request.query_params if hasattr(request, 'query_params') else request.GET
+    resolution = params.get('resolution')
+    if resolution in GEOMETRY_TOLERANCES or resolution == 'full':
+        return resolution
+    try:
+        zoom = int(params.get('zoom'))
+    except (TypeError, ValueError):
+        return 'full'
+    if zoom >= 16:
+        return 'full'
+    if zoom >= 13:
+        return 'medium'
+    return 'low'
+
+
+GEOMETRY_FORMATS = ('geojson', 'polyline6')
+
+
+def geometry_format(request) -> str:
+    """
+    Resuelve el formato de geometría pedido con ?geometry_format=geojson|polyline6.
+    Por defecto geojson, para no romper a los clientes actuales.
+    """
+    if request is None:
+        return 'geojson'
+    params = request.query_params if hasattr(request, 'query_params') else request.GET
+    value = params.get('geometry_format')
+    return value if value in GEOMETRY_FORMATS else 'geojson'
 
 
 class CleaningZoneListSerializer(serializers.ModelSerializer):
@@ -87,10 +126,25 @@ class RouteListSerializer(serializers.ModelSerializer):
         return 'RESIDENCIAL'
 
 
+class RouteGeometryField(GeometryField):
+    """
+    Geometría de la ruta: se escribe como el campo del modelo y al leer respeta
+    ?resolution/?zoom y ?geometry_format (en polyline6 viaja solo codificada).
+    """
+    
+    def get_attribute(self, instance):
+        request = self.context.get('request')
+        if geometry_format(request) == 'polyline6':
+            return None
+        return instance.geometry_for(geometry_resolution(request))
+
+
 class RouteSerializer(GeoFeatureModelSerializer):
     """Serializer para rutas con geometría (detalles)."""
     
     zone_name = serializers.CharField(source='zone.zone_name', read_only=True)
+    route_geometry = RouteGeometryField()
+    route_polyline6 = serializers.SerializerMethodField()
     route_waypoints = RouteWaypointSerializer(many=True, read_only=True)
     # Campos en español para compatibilidad con frontend
     nombre = serializers.CharField(source='route_name', read_only=True)
@@ -107,7 +161,7 @@ class RouteSerializer(GeoFeatureModelSerializer):
         model = Route
         geo_field = 'route_geometry'
         fields = [
-            'id', 'route_name', 'zone', 'zone_name', 'route_geometry',
+            'id', 'route_name', 'zone', 'zone_name', 'route_geometry', 'route_polyline6',
             'waypoints', 'total_distance_km', 'estimated_duration_minutes',
             'optimization_algorithm', 'status', 'route_waypoints',
             'created_at', 'updated_at',
@@ -117,6 +171,17 @@ class RouteSerializer(GeoFeatureModelSerializer):
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
 
+    def _resolution(self):
+        return geometry_resolution(self.context.get('request'))
+    
+    def _polyline_mode(self):
+        return geometry_format(self.context.get('request')) == 'polyline6'
+    
+    def get_route_polyline6(self, obj):
+        if not self._polyline_mode():
+            return None
+        return obj.polyline_for(self._resolution())
+
     def get_descripcion(self, obj):
         # No hay campo description en Route; devolver una descripción derivada o vacía
         return getattr(obj, 'description', '') or ''
@@ -126,10 +191,12 @@ class RouteSerializer(GeoFeatureModelSerializer):
         return 'RESIDENCIAL'
 
     def get_puntos_ruta(self, obj):
-        if obj.route_geometry:
-            geom = obj.route_geometry
+        if self._polyline_mode():
+            return None
+        geom = obj.geometry_for(self._resolution())
+        if geom:
             # route_geometry es LineString: extraer coordenadas (x,y)
-            coords = [[pt.x, pt.y] for pt in geom.coords]
+            coords = [list(pt) for pt in geom.coords]
             return {
                 'type': 'LineString',
                 'coordinates': coords
@@ -186,6 +253,29 @@ class CalculateRouteRequestSerializer(serializers.Serializer):
         return value
 
 
+class CalculateBatchRequestSerializer(serializers.Serializer):
+    """Serializer para cálculo de muchas rutas en una sola petición"""
+    
+    items = serializers.ListField(
+        child=serializers.DictField(),
+        min_length=1,
+        max_length=500,
+        help_text="Lista de solicitudes {id?, waypoints, optimize?, roundtrip?}"
+    )
+    
+    def validate_items(self, value):
+        """Validar cada ítem con el mismo serializer que /calculate/"""
+        items = []
+        for i, item in enumerate(value):
+            serializer = CalculateRouteRequestSerializer(data=item)
+            if not serializer.is_valid():
+                raise serializers.ValidationError({i: serializer.errors})
+            data = dict(serializer.validated_data)
+            data['id'] = item.get('id', i)
+            items.append(data)
+        return items
+
+
 class CreateRouteRequestSerializer(serializers.Serializer):
     """Serializer para crear una ruta desde waypoints"""
     
@@ -199,8 +289,68 @@ class CreateRouteRequestSerializer(serializers.Serializer):
     waypoint_details = serializers.ListField(
         child=serializers.DictField(),
         required=False,
-        help_text="Detalles adicionales de cada waypoint (address, type, notes)"
+        help_text="Detalles adicionales de cada waypoint (address, type, notes, service_minutes)"
+    )
+
+
+class BulkImportRoutesRequestSerializer(serializers.Serializer):
+    """Serializer para importar muchas rutas en una sola petición"""
+    
+    routes = serializers.ListField(
+        child=serializers.DictField(),
+        min_length=1,
+        max_length=200
     )
+    
+    def validate_routes(self, value):
+        """Validar cada ruta con CreateRouteRequestSerializer"""
+        routes = []
+        for i, item in enumerate(value):
+            serializer = CreateRouteRequestSerializer(data=item)
+            if not serializer.is_valid():
+                raise serializers.ValidationError({i: serializer.errors})
+            routes.append(serializer.validated_data)
+        return routes
+
+
+class OptimizeRouteRequestSerializer(serializers.Serializer):
+    """Serializer para optimizar una ruta existente con el motor VRP"""
+    
+    vehicles = serializers.IntegerField(
+        required=False,
+        min_value=1,
+        help_text="Vehículos disponibles (default: assigned_team_size de la zona)"
+    )
+    vehicle_capacity = serializers.IntegerField(
+        required=False,
+        min_value=1,
+        help_text="Paradas máximas por vehículo"
+    )
+    max_route_minutes = serializers.IntegerField(required=False, min_value=1)
+    time_windows = serializers.DictField(
+        child=serializers.ListField(child=serializers.FloatField(min_value=0), min_length=2, max_length=2),
+        required=False,
+        help_text="{waypoint_order: [inicio_min, fin_min]} desde el inicio del turno"
+    )
+    time_budget_seconds = serializers.FloatField(default=2.0, min_value=0.1, max_value=30)
+    apply = serializers.BooleanField(
+        default=False,
+        help_text="Si True, persiste el nuevo orden y crea rutas por vehículo"
+    )
+    
+    def validate_time_windows(self, value):
+        windows = {}
+        for key, (start, end) in value.items():
+            try:
+                order = int(key)
+            except (TypeError, ValueError):
+                raise serializers.ValidationError(f"waypoint_order inválido: {key}")
+            if start > end:
+                raise serializers.ValidationError(
+                    f"Ventana inválida para waypoint {order}: inicio > fin"
+                )
+            windows[order] = (start, end)
+        return windows
 
 
 class RouteOptimizationResultSerializer(serializers.Serializer):
@@ -221,3 +371,53 @@ class NearestRoadRequestSerializer(serializers.Serializer):
     lat = serializers.FloatField(min_value=-90, max_value=90)
     lon = serializers.FloatField(min_value=-180, max_value=180)
     number = serializers.IntegerField(default=1, min_value=1, max_value=10)
+
+
+class SnapPointSerializer(serializers.Serializer):
+    """Punto a ajustar a la red vial"""
+    
+    id = serializers.CharField(required=False, max_length=64)
+    lat = serializers.FloatField(min_value=-90, max_value=90)
+    lon = serializers.FloatField(min_value=-180, max_value=180)
+
+
+class SnapPointsRequestSerializer(serializers.Serializer):
+    """Serializer para ajustar muchos puntos y/o incidencias a la red vial"""
+    
+    points = SnapPointSerializer(many=True, required=False, default=list)
+    incident_ids = serializers.ListField(
+        child=serializers.UUIDField(),
+        required=False,
+        default=list
+    )
+    
+    def validate(self, data):
+        total = len(data['points']) + len(data['incident_ids'])
+        if total == 0:
+            raise serializers.ValidationError("Se requiere 'points' o 'incident_ids'")
+        max_points = getattr(settings, 'ROUTE_SNAP_MAX_POINTS', 1000)
+        if total > max_points:
+            raise serializers.ValidationError(f"Máximo {max_points} puntos por solicitud")
+        return data
+
+
+class RouteLegSerializer(serializers.ModelSerializer):
+    """Serializer para tramos OSRM guardados (sin anotaciones empaquetadas)"""
+    
+    route_name = serializers.CharField(source='route.route_name', read_only=True)
+    from_waypoint_order = serializers.IntegerField(source='from_waypoint.waypoint_order', read_only=True, allow_null=True)
+    to_waypoint_order = serializers.IntegerField(source='to_waypoint.waypoint_order', read_only=True, allow_null=True)
+    speed_kmh = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = RouteLeg
+        fields = [
+            'id', 'route', 'route_name', 'zone', 'leg_index',
+            'from_waypoint', 'from_waypoint_order', 'to_waypoint', 'to_waypoint_order',
+            'duration_seconds', 'distance_meters', 'speed_kmh', 'step_count', 'segment_count'
+        ]
+    
+    def get_speed_kmh(self, obj):
+        if not obj.duration_seconds:
+            return None
+        return round(obj.distance_meters / obj.duration_seconds * 3.6, 1)
@@ -0,0 +1,56 @@
+"""
+Señales del app de rutas: invalidación de la caché de teselas vectoriales y
+del índice de zonas, y asignación de zona a incidencias y tareas nuevas.
+"""
+
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from apps.incidents.models import Incident
+from apps.tasks.models import Task
+from .models import CleaningZone, Route
+from .tiles import invalidate_layer
+from .zone_index import zone_index
+
+logger = logging.getLogger(__name__)
+
+
+LAYER_BY_MODEL = {
+    CleaningZone: 'cleaning_zones',
+    Route: 'routes',
+    Incident: 'incidents',
+}
+
+
+@receiver(post_save, sender=CleaningZone)
+@receiver(post_save, sender=Route)
+@receiver(post_save, sender=Incident)
+@receiver(post_delete, sender=CleaningZone)
+@receiver(post_delete, sender=Route)
+@receiver(post_delete, sender=Incident)
+def invalidate_tiles(sender, **kwargs):
+    """Invalida la capa del modelo modificado una vez confirmada la transacción"""
+    layer = LAYER_BY_MODEL[sender]
+    transaction.on_commit(lambda: invalidate_layer(layer))
+
+
+@receiver(post_save, sender=CleaningZone)
+@receiver(post_delete, sender=CleaningZone)
+def invalidate_zone_index(sender, **kwargs):
+    """Reconstruye el índice de zonas tras confirmar el cambio de una zona"""
+    transaction.on_commit(zone_index.invalidate)
+
+
+@receiver(pre_save, sender=Incident)
+@receiver(pre_save, sender=Task)
+def assign_zone(sender, instance, **kwargs):
+    """Asigna la zona que contiene la ubicación al crear una incidencia o tarea"""
+    if not instance._state.adding or instance.zone_id is not None or instance.location is None:
+        return
+    try:
+        instance.zone_id = zone_index.zone_for_point(instance.location)
+    except Exception as e:
+        logger.warning(f"No se pudo asignar zona a {sender.__name__}: {e}")
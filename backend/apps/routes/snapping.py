@@ -0,0 +1,197 @@
+"""
+Caché de snapping a la red vial (OSRM /nearest).
+
+Las coordenadas se cuantizan a una grilla de celdas de ~ROUTE_SNAP_CELL_METERS
+y se consulta OSRM una sola vez por celda (desde su centro). El resultado se
+guarda en un LRU por proceso y, opcionalmente, en la tabla road_snaps para
+compartirlo entre workers y reinicios. Dos incidencias a pocos metros una de
+otra comparten así el mismo snap sin llamar a OSRM.
+"""
+
+import logging
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+from django.conf import settings
+from django.contrib.gis.geos import Point
+
+from .models import RoadSnap
+from .osrm_service import OSRMService, osrm_service
+from .route_cache import LocalLRUCache
+
+logger = logging.getLogger(__name__)
+
+
+METERS_PER_DEGREE = 111320
+EARTH_RADIUS_METERS = 6371008.8
+
+
+def grid_cell(lon: float, lat: float, cell_meters: float) -> Tuple[str, float, float]:
+    """
+    Celda de la grilla que contiene el punto.
+
+    Returns:
+        (clave, lon del centro, lat del centro)
+    """
+    lat_step = cell_meters / METERS_PER_DEGREE
+    row = math.floor(lat / lat_step)
+    center_lat = (row + 0.5) * lat_step
+    # El ancho en grados de la celda depende de la latitud de su fila
+    lon_step = cell_meters / (METERS_PER_DEGREE * max(math.cos(math.radians(center_lat)), 0.01))
+    col = math.floor(lon / lon_step)
+    center_lon = (col + 0.5) * lon_step
+    return f"{cell_meters:g}:{row}:{col}", center_lon, center_lat
+
+
+def haversine_meters(lon1: float, lat1: float, lon2: float, lat2: float) -> float:
+    """Distancia de gran círculo entre dos puntos en metros"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * math.asin(math.sqrt(a))
+
+
+class SnapCache:
+    """Snapping a la red vial con caché por celda (LRU local + tabla road_snaps)"""
+
+    def __init__(
+        self,
+        osrm: OSRMService,
+        cell_meters: float = 5,
+        local_size: int = 10000,
+        ttl: int = 24 * 3600,
+        persist: bool = True,
+        max_workers: int = 8
+    ):
+        """
+        Args:
+            osrm: Cliente OSRM para las celdas sin caché
+            cell_meters: Lado aproximado de la celda en metros
+            local_size: Máximo de celdas en el LRU del proceso
+            ttl: Segundos que una celda permanece en el LRU
+            persist: Guardar/leer las celdas en la tabla road_snaps
+            max_workers: Peticiones /nearest simultáneas en snap_many
+        """
+        self.osrm = osrm
+        self.cell_meters = cell_meters
+        self.ttl = ttl
+        self.persist = persist
+        self.max_workers = max_workers
+        self.local = LocalLRUCache(local_size)
+        self._stats_lock = threading.Lock()
+        self._stats = {'memory_hits': 0, 'db_hits': 0, 'osrm_calls': 0, 'errors': 0}
+
+    @classmethod
+    def from_settings(cls, osrm: OSRMService) -> 'SnapCache':
+        """Construye la caché a partir de la configuración de Django"""
+        return cls(
+            osrm,
+            cell_meters=getattr(settings, 'ROUTE_SNAP_CELL_METERS', 5),
+            local_size=getattr(settings, 'ROUTE_SNAP_CACHE_SIZE', 10000),
+            ttl=getattr(settings, 'ROUTE_SNAP_CACHE_TTL', 24 * 3600),
+            persist=getattr(settings, 'ROUTE_SNAP_PERSIST', True),
+            max_workers=getattr(settings, 'ROUTE_SNAP_CONCURRENCY', 8)
+        )
+
+    def _incr(self, name: str, amount: int = 1):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def get_stats(self) -> Dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['local_entries'] = len(self.local)
+        stats['cell_meters'] = self.cell_meters
+        return stats
+
+    # ========== SNAPPING ==========
+
+    def _nearest(self, center: Tuple[float, float]) -> Optional[Tuple[float, float, str]]:
+        """Consulta OSRM /nearest para el centro de una celda"""
+        self._incr('osrm_calls')
+        result = self.osrm.nearest_road(center, 1)
+        waypoints = result.get('waypoints') if result.get('success') else None
+        if not waypoints:
+            self._incr('errors')
+            logger.warning(f"Snap sin resultado para {center}: {result.get('error', 'sin waypoints')}")
+            return None
+        lon, lat = waypoints[0]['location']
+        return lon, lat, waypoints[0].get('name', '')
+
+    def snap_many(self, coordinates: Sequence[Tuple[float, float]]) -> List[Dict]:
+        """
+        Ajusta una lista de coordenadas (lon, lat) a la red vial.
+        Las coordenadas de una misma celda se resuelven una sola vez.
+
+        Returns:
+            Un dict por coordenada, en el mismo orden de entrada
+        """
+        cells = [grid_cell(float(lon), float(lat), self.cell_meters) for lon, lat in coordinates]
+        centers = {key: (center_lon, center_lat) for key, center_lon, center_lat in cells}
+
+        resolved: Dict[str, Tuple[float, float, str]] = {}
+        sources: Dict[str, str] = {}
+        for key in centers:
+            value = self.local.get(key)
+            if value is not None:
+                resolved[key] = value
+                sources[key] = 'memory'
+        self._incr('memory_hits', len(resolved))
+
+        missing = [key for key in centers if key not in resolved]
+        if missing and self.persist:
+            for snap in RoadSnap.objects.filter(cell__in=missing):
+                value = (snap.snapped_location.x, snap.snapped_location.y, snap.road_name)
+                resolved[snap.cell] = value
+                sources[snap.cell] = 'db'
+                self.local.set(snap.cell, value, self.ttl)
+            self._incr('db_hits', sum(1 for key in missing if key in resolved))
+            missing = [key for key in missing if key not in resolved]
+
+        if missing:
+            workers = max(min(self.max_workers, len(missing)), 1)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                fetched = list(pool.map(lambda key: self._nearest(centers[key]), missing))
+            new_snaps = []
+            for key, value in zip(missing, fetched):
+                if value is None:
+                    continue
+                resolved[key] = value
+                sources[key] = 'osrm'
+                self.local.set(key, value, self.ttl)
+                new_snaps.append(RoadSnap(
+                    cell=key,
+                    snapped_location=Point(value[0], value[1], srid=4326),
+                    road_name=(value[2] or '')[:200]
+                ))
+            if new_snaps and self.persist:
+                RoadSnap.objects.bulk_create(new_snaps, ignore_conflicts=True)
+
+        results = []
+        for (lon, lat), (key, _, _) in zip(coordinates, cells):
+            value = resolved.get(key)
+            if value is None:
+                results.append({'success': False, 'error': 'No se encontró la red vial cercana'})
+                continue
+            snapped_lon, snapped_lat, name = value
+            results.append({
+                'success': True,
+                'location': [snapped_lon, snapped_lat],
+                'name': name,
+                'distance_meters': round(haversine_meters(float(lon), float(lat), snapped_lon, snapped_lat), 2),
+                'source': sources[key]
+            })
+        return results
+
+    def snap(self, coordinate: Tuple[float, float]) -> Dict:
+        """Ajusta una coordenada (lon, lat) a la red vial"""
+        return self.snap_many([coordinate])[0]
+
+    def clear_local(self):
+        self.local.clear()
+
+
+# Instancia global
+snap_cache = SnapCache.from_settings(osrm_service)
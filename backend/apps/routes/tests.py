@@ -0,0 +1,290 @@
+"""
+Tests de los endpoints de cálculo de RouteViewSet contra el OSRM simulado
+(fixture fake_osrm de conftest.py) y de RouteCache con InMemoryRedis en lugar
+de Redis. No escriben en la base de datos.
+"""
+
+import json
+import pytest
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+from apps.routes import route_cache
+from apps.routes.osrm_service import osrm_service
+from apps.routes.route_cache import InMemoryRedis, RouteCache
+
+
+WAYPOINTS = [
+    {'lat': -0.93517, 'lon': -78.61478},
+    {'lat': -0.93612, 'lon': -78.61556},
+    {'lat': -0.93702, 'lon': -78.61634},
+    {'lat': -0.93810, 'lon': -78.61520},
+]
+
+
+@pytest.fixture
+def api_client():
+    client = APIClient(SERVER_NAME='localhost')
+    # Usuario en memoria: IsAuthenticatedOrReadOnly solo exige autenticación
+    client.force_authenticate(user=get_user_model()(email='tests@example.com'))
+    return client
+
+
+def _stream_lines(response):
+    content = b''.join(response.streaming_content)
+    return [json.loads(line) for line in content.decode('utf-8').splitlines() if line]
+
+
+def test_calculate(fake_osrm, api_client):
+    response = api_client.post('/api/routes/calculate/', {'waypoints': WAYPOINTS[:2]}, format='json')
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data['success'] is True
+    assert data['approximate'] is False
+    assert data['distance_meters'] > 0
+    assert len(data['legs']) == 1
+    assert fake_osrm.requests.get('route') == 1
+
+
+def test_calculate_polyline6(fake_osrm, api_client):
+    response = api_client.post(
+        '/api/routes/calculate/?geometry_format=polyline6',
+        {'waypoints': WAYPOINTS[:2]},
+        format='json'
+    )
+
+    data = response.json()
+    assert data['success'] is True
+    assert data['polyline6']
+    assert 'geometry' not in data
+
+
+def test_optimize(fake_osrm, api_client):
+    response = api_client.post(
+        '/api/routes/calculate/',
+        {'waypoints': WAYPOINTS, 'optimize': True},
+        format='json'
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data['success'] is True
+    assert sorted(data['optimized_order']) == list(range(len(WAYPOINTS)))
+    assert fake_osrm.requests.get('trip') == 1
+
+
+def test_calculate_batch(fake_osrm, api_client):
+    items = [
+        {'id': 'a', 'waypoints': WAYPOINTS[:2]},
+        {'id': 'b', 'waypoints': WAYPOINTS[:2]},
+        {'id': 'c', 'waypoints': WAYPOINTS, 'optimize': True},
+    ]
+    response = api_client.post('/api/routes/calculate_batch/', {'items': items}, format='json')
+
+    assert response.status_code == 200
+    assert response['X-Batch-Size'] == '3'
+    assert response['X-Batch-Unique'] == '2'
+    lines = sorted(_stream_lines(response), key=lambda line: line['index'])
+    assert [line['id'] for line in lines] == ['a', 'b', 'c']
+    assert all(line['success'] for line in lines)
+    # Las solicitudes idénticas se calculan una sola vez
+    assert fake_osrm.requests.get('route') == 1
+    assert fake_osrm.requests.get('trip') == 1
+
+
+def _open_breaker(fake_osrm, api_client):
+    fake_osrm.failure_rate = 1.0
+    for _ in range(osrm_service.breaker.min_calls):
+        api_client.post('/api/routes/calculate/', {'waypoints': WAYPOINTS[:2]}, format='json')
+    assert osrm_service.breaker.state == osrm_service.breaker.OPEN
+
+
+def test_create_from_waypoints_refuses_estimates(fake_osrm, api_client):
+    _open_breaker(fake_osrm, api_client)
+
+    response = api_client.post(
+        '/api/routes/create_from_waypoints/',
+        {'route_name': 'Estimada', 'waypoints': WAYPOINTS},
+        format='json'
+    )
+
+    assert response.status_code == 503
+    assert response.json()['approximate'] is True
+
+
+def test_bulk_import_refuses_estimates(fake_osrm, api_client):
+    _open_breaker(fake_osrm, api_client)
+
+    response = api_client.post(
+        '/api/routes/bulk_import/',
+        {'routes': [{'route_name': 'Estimada', 'waypoints': WAYPOINTS}]},
+        format='json'
+    )
+
+    assert response.status_code == 503
+    assert response.json()['approximate'] is True
+
+
+def test_breaker_falls_back_to_estimate(fake_osrm, api_client):
+    fake_osrm.failure_rate = 1.0
+    body = {'waypoints': WAYPOINTS[:2]}
+
+    # Hasta reunir min_calls fallos el circuito sigue cerrado y el error llega al cliente
+    for _ in range(osrm_service.breaker.min_calls):
+        data = api_client.post('/api/routes/calculate/', body, format='json').json()
+        assert data['success'] is False
+    assert osrm_service.breaker.state == osrm_service.breaker.OPEN
+
+    requests_before = dict(fake_osrm.requests)
+    data = api_client.post('/api/routes/calculate/', body, format='json').json()
+    assert data['success'] is True
+    assert data['approximate'] is True
+    assert data['distance_meters'] > 0
+    # Con el circuito abierto la petición no llega a OSRM
+    assert fake_osrm.requests == requests_before
+
+
+# ========== ROUTE CACHE ==========
+
+class FakeClock:
+    """Reloj controlable para ambos niveles (monotonic en el LRU, time en InMemoryRedis)"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class FailingRedis:
+    """Redis caído: cada llamada falla como un timeout de conexión"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def get(self, key):
+        self.calls += 1
+        raise ConnectionError('timeout')
+
+    def setex(self, key, ttl, value):
+        self.calls += 1
+        raise ConnectionError('timeout')
+
+    def delete(self, *keys):
+        self.calls += 1
+        raise ConnectionError('timeout')
+
+
+ROUTE = [(-78.61478, -0.93517), (-78.61556, -0.93612)]
+RESPONSE = {'code': 'Ok', 'routes': [{'distance': 120.5, 'duration': 30.2}]}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(route_cache, 'time', fake)
+    return fake
+
+
+@pytest.fixture
+def cache(clock):
+    return RouteCache(redis_client=InMemoryRedis(), ttl=60, local_size=2)
+
+
+def test_cache_hit_and_miss_counters(cache):
+    key = cache.make_key('route', 'driving', ROUTE, {'overview': 'full'})
+
+    assert cache.get(key) is None
+    cache.set(key, RESPONSE)
+    assert cache.get(key) == RESPONSE
+    cache.clear_local()
+    assert cache.get(key) == RESPONSE
+
+    stats = cache.get_stats()
+    assert stats['misses'] == 1
+    assert stats['sets'] == 1
+    assert stats['local_hits'] == 1
+    assert stats['redis_hits'] == 1
+    assert stats['hit_ratio'] == round(2 / 3, 4)
+
+
+def test_cache_ttl_expires_in_both_tiers(cache, clock):
+    key = cache.make_key('route', 'driving', ROUTE)
+    cache.set(key, RESPONSE)
+
+    clock.advance(59)
+    assert cache.local.get(key) == RESPONSE
+    assert cache.redis.get(key) is not None
+
+    clock.advance(2)
+    assert cache.local.get(key) is None
+    assert cache.redis.get(key) is None
+    assert cache.get(key) is None
+
+
+def test_cache_local_lru_eviction(cache):
+    a, b, c = (cache.make_key('route', 'driving', ROUTE, {'n': n}) for n in range(3))
+    cache.set(a, {'n': 0})
+    cache.set(b, {'n': 1})
+    assert cache.get(a) == {'n': 0}  # a pasa a ser el más reciente
+    cache.set(c, {'n': 2})
+
+    assert cache.local.get(b) is None
+    assert cache.local.get(a) == {'n': 0}
+    assert cache.local.evictions == 1
+    # El expulsado del nivel local sigue en Redis
+    assert cache.get(b) == {'n': 1}
+    assert cache.get_stats()['redis_hits'] == 1
+
+
+def test_cache_key_canonicalisation(cache):
+    key = cache.make_key('route', 'driving', ROUTE, {'overview': 'full', 'steps': 'true'})
+
+    # Coordenadas iguales al redondear a coord_precision (5 decimales)
+    nearby = [(lon + 0.000001, lat - 0.000001) for lon, lat in ROUTE]
+    assert cache.make_key('route', 'driving', nearby, {'overview': 'full', 'steps': 'true'}) == key
+    # Orden de parámetros y tipos de valor no cambian la clave
+    assert cache.make_key('route', 'driving', ROUTE, {'steps': 'true', 'overview': 'full'}) == key
+    assert cache.make_key('route', 'driving', ROUTE, {'n': 1}) == cache.make_key('route', 'driving', ROUTE, {'n': '1'})
+
+    moved = [(lon + 0.0001, lat) for lon, lat in ROUTE]
+    assert cache.make_key('route', 'driving', moved, {'overview': 'full', 'steps': 'true'}) != key
+    assert cache.make_key('route', 'driving', ROUTE[::-1], {'overview': 'full', 'steps': 'true'}) != key
+    assert cache.make_key('trip', 'driving', ROUTE, {'overview': 'full', 'steps': 'true'}) != key
+
+
+def test_cache_corrupt_redis_value_is_a_miss(cache):
+    key = cache.make_key('route', 'driving', ROUTE)
+    cache.redis.setex(key, 60, b'no es zlib')
+
+    assert cache.get(key) is None
+    assert cache.redis.get(key) is None
+    stats = cache.get_stats()
+    assert stats['redis_corrupt'] == 1
+    assert stats['misses'] == 1
+
+
+def test_cache_skips_redis_while_unavailable(clock):
+    redis = FailingRedis()
+    cache = RouteCache(redis_client=redis, ttl=60, redis_retry_interval=30)
+    key = cache.make_key('route', 'driving', ROUTE)
+
+    assert cache.get(key) is None
+    cache.set(key, RESPONSE)
+    assert redis.calls == 1
+    assert cache.get(key) == RESPONSE  # nivel local
+
+    clock.advance(31)
+    cache.clear_local()
+    assert cache.get(key) is None
+    assert redis.calls == 2
+    stats = cache.get_stats()
+    assert stats['redis_errors'] == 2
+    assert stats['redis_skipped'] == 1
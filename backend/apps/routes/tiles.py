@@ -0,0 +1,218 @@
+"""
+Vector tiles (MVT) para las capas del mapa: zonas, rutas e incidentes.
+
+GET /api/tiles/{layer}/{z}/{x}/{y}.pbf[?fields=a,b]
+
+Las teselas se generan en PostGIS con ST_AsMVT/ST_AsMVTGeom y se guardan en
+disco (TILE_CACHE_DIR). La caché de una capa se invalida completa cuando
+cambia cualquier fila de su tabla (ver signals.py; las escrituras masivas que
+no emiten señales llaman a invalidate_layer directamente).
+
+Cada capa tiene una generación en disco (.{layer}.generation) que forma parte
+de la ruta de sus teselas e invalidate_layer renueva: una tesela que empezó a
+generarse antes de la invalidación no se escribe (y si llegara a escribirse
+quedaría en el directorio de la generación anterior, que ya no se lee).
+Además una tesela cacheada con más de TILE_CACHE_TTL segundos se regenera,
+como red de seguridad para escrituras que no invaliden la capa.
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from django.conf import settings
+from django.db import connection
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.views import View
+
+logger = logging.getLogger(__name__)
+
+
+# Atributos disponibles por capa: nombre -> expresión SQL sobre la tabla (alias t)
+LAYERS = {
+    'cleaning_zones': {
+        'table': 'cleaning_zones',
+        'geometry': 'zone_polygon',
+        'attributes': {
+            'id': 't.id::text',
+            'zone_name': 't.zone_name',
+            'priority': 't.priority',
+            'frequency': 't.frequency',
+            'status': 't.status',
+            'assigned_team_size': 't.assigned_team_size',
+        },
+        'default_fields': ['id', 'zone_name', 'priority', 'status'],
+    },
+    'routes': {
+        'table': 'routes',
+        'geometry': 'route_geometry',
+        'attributes': {
+            'id': 't.id::text',
+            'route_name': 't.route_name',
+            'zone_id': 't.zone_id::text',
+            'status': 't.status',
+            'total_distance_km': 't.total_distance_km::float8',
+            'estimated_duration_minutes': 't.estimated_duration_minutes',
+            'optimization_algorithm': 't.optimization_algorithm',
+        },
+        'default_fields': ['id', 'route_name', 'zone_id', 'status'],
+    },
+    'incidents': {
+        'table': 'incidents',
+        'geometry': 'location',
+        'attributes': {
+            'id': 't.id::text',
+            'incident_type': 't.incident_type',
+            'status': 't.status',
+            'address': 't.address',
+            'created_at': "to_char(t.created_at, 'YYYY-MM-DD\"T\"HH24:MI:SSOF')",
+        },
+        'default_fields': ['id', 'incident_type', 'status'],
+    },
+}
+
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+MAX_ZOOM = 22
+
+
+def _cache_root() -> Path:
+    return Path(getattr(settings, 'TILE_CACHE_DIR', settings.BASE_DIR / 'tile_cache'))
+
+
+def _geometry_column(layer: str, z: int) -> str:
+    """Para rutas usa la versión simplificada que corresponde al zoom"""
+    if layer == 'routes':
+        if z < 13:
+            return 'COALESCE(t.route_geometry_low, t.route_geometry)'
+        if z < 16:
+            return 'COALESCE(t.route_geometry_medium, t.route_geometry)'
+    return f"t.{LAYERS[layer]['geometry']}"
+
+
+def render_tile(layer: str, z: int, x: int, y: int, fields) -> bytes:
+    """Genera la tesela MVT de una capa en PostGIS"""
+    config = LAYERS[layer]
+    geometry = _geometry_column(layer, z)
+    attributes = ''.join(
+        f", {config['attributes'][name]} AS \"{name}\"" for name in fields
+    )
+    sql = f"""
+        WITH bounds AS (
+            SELECT ST_TileEnvelope(%s, %s, %s) AS geom
+        ),
+        mvtgeom AS (
+            SELECT ST_AsMVTGeom(
+                       ST_Transform({geometry}, 3857), bounds.geom,
+                       {TILE_EXTENT}, {TILE_BUFFER}, true
+                   ) AS geom{attributes}
+            FROM {config['table']} t, bounds
+            WHERE {geometry} && ST_Transform(bounds.geom, 4326)
+        )
+        SELECT ST_AsMVT(mvtgeom.*, %s, {TILE_EXTENT}, 'geom')
+        FROM mvtgeom
+        WHERE geom IS NOT NULL
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [z, x, y, layer])
+        row = cursor.fetchone()
+    return bytes(row[0]) if row and row[0] is not None else b''
+
+
+def _generation_file(layer: str) -> Path:
+    return _cache_root() / f".{layer}.generation"
+
+
+def layer_generation(layer: str) -> str:
+    """Generación actual de la caché de una capa ('0' si nunca se invalidó)"""
+    try:
+        return _generation_file(layer).read_text().strip() or '0'
+    except OSError:
+        return '0'
+
+
+def _bump_generation(layer: str):
+    root = _cache_root()
+    root.mkdir(parents=True, exist_ok=True)
+    tmp = root / f".{layer}.generation.{uuid.uuid4().hex}.tmp"
+    tmp.write_text(uuid.uuid4().hex[:12])
+    os.replace(tmp, _generation_file(layer))
+
+
+def _read_cached(path: Path):
+    """Bytes de la tesela cacheada, o None si no existe o superó TILE_CACHE_TTL"""
+    ttl = getattr(settings, 'TILE_CACHE_TTL', 3600)
+    try:
+        if ttl and time.time() - path.stat().st_mtime > ttl:
+            return None
+        return path.read_bytes()
+    except FileNotFoundError:
+        return None
+
+
+def _store_tile(layer: str, generation: str, path: Path, tile: bytes):
+    """Escribe la tesela solo si la capa no se invalidó mientras se generaba"""
+    if layer_generation(layer) != generation:
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+    tmp.write_bytes(tile)
+    os.replace(tmp, path)
+
+
+def invalidate_layer(layer: str):
+    """Renueva la generación de una capa y elimina del disco sus teselas cacheadas"""
+    try:
+        _bump_generation(layer)
+    except OSError as e:
+        logger.warning(f"No se pudo renovar la generación de teselas '{layer}': {e}")
+    layer_dir = _cache_root() / layer
+    if not layer_dir.exists():
+        return
+    # Renombrar primero para que las lecturas concurrentes no vean teselas a medio borrar
+    trash = _cache_root() / f".{layer}-{uuid.uuid4().hex}.trash"
+    try:
+        os.replace(layer_dir, trash)
+    except OSError as e:
+        logger.warning(f"No se pudo invalidar la caché de teselas '{layer}': {e}")
+        return
+    shutil.rmtree(trash, ignore_errors=True)
+    logger.info(f"🗑️ Caché de teselas invalidada: {layer}")
+
+
+class TileView(View):
+    """Sirve teselas vectoriales con ETag, Cache-Control y caché en disco"""
+
+    def get(self, request, layer, z, x, y):
+        if layer not in LAYERS:
+            raise Http404(f"Capa desconocida: {layer}")
+        if z > MAX_ZOOM or x >= 2 ** z or y >= 2 ** z:
+            raise Http404("Tesela fuera de rango")
+
+        config = LAYERS[layer]
+        requested = request.GET.get('fields')
+        if requested:
+            fields = [f for f in requested.split(',') if f in config['attributes']]
+        else:
+            fields = list(config['default_fields'])
+        fields_key = hashlib.md5(','.join(fields).encode('utf-8')).hexdigest()[:12]
+
+        generation = layer_generation(layer)
+        path = _cache_root() / layer / generation / fields_key / str(z) / str(x) / f"{y}.pbf"
+        tile = _read_cached(path)
+        if tile is None:
+            tile = render_tile(layer, z, x, y, fields)
+            _store_tile(layer, generation, path, tile)
+
+        etag = f'"{hashlib.md5(tile).hexdigest()}"'
+        max_age = getattr(settings, 'TILE_CACHE_MAX_AGE', 300)
+        if request.headers.get('If-None-Match') == etag:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(tile, content_type='application/vnd.mapbox-vector-tile')
+        response['ETag'] = etag
+        response['Cache-Control'] = f'public, max-age={max_age}'
+        return response
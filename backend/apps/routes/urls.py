@@ -1,9 +1,12 @@
 from django.urls import path
 from rest_framework.routers import DefaultRouter
 from .views import CleaningZoneViewSet, RouteViewSet
+from .tiles import TileView
 
 router = DefaultRouter()
 router.register(r'zones', CleaningZoneViewSet, basename='cleaning-zone')
 router.register(r'routes', RouteViewSet, basename='route')
 
-urlpatterns = router.urls
\ No newline at end of file
+urlpatterns = router.urls + [
+    path('tiles/<str:layer>/<int:z>/<int:x>/<int:y>.pbf', TileView.as_view(), name='vector-tile'),
+]
\ No newline at end of file
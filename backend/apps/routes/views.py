@@ -1,19 +1,59 @@
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.conf import settings
+from django.db.models import Count
+from django.http import StreamingHttpResponse
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.contrib.gis.geos import Point, LineString
-from .models import CleaningZone, Route, RouteWaypoint
+from rest_framework.utils.encoders import JSONEncoder
+from django.contrib.gis.geos import GEOSGeometry
+from .models import CleaningZone, Route
 from .serializers import (
-    CleaningZoneSerializer, CleaningZoneListSerializer, RouteSerializer, RouteWaypointSerializer,
+    CleaningZoneSerializer, CleaningZoneListSerializer, RouteSerializer,
     CalculateRouteRequestSerializer, CreateRouteRequestSerializer,
-    NearestRoadRequestSerializer, RouteListSerializer
+    NearestRoadRequestSerializer, RouteListSerializer, OptimizeRouteRequestSerializer,
+    CalculateBatchRequestSerializer, BulkImportRoutesRequestSerializer, SnapPointsRequestSerializer,
+    RouteLegSerializer, geometry_resolution, geometry_format
 )
 from .osrm_service import osrm_service
+from .optimization import VRPApplyError, apply_vrp_solution, solve_route_waypoints
+from .bulk import create_routes_bulk
+from .snapping import snap_cache
+from .legs import slowest_legs
+from .zone_index import zone_index
+from apps.incidents.models import Incident
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+class OSRMResultEncoder(JSONEncoder):
+    """Encoder JSON que serializa geometrías GEOS como GeoJSON"""
+    
+    def default(self, obj):
+        if isinstance(obj, GEOSGeometry):
+            return json.loads(obj.geojson)
+        return super().default(obj)
+
+
+def _approximate_response():
+    """Las rutas que se guardan necesitan OSRM: no persistir estimaciones en línea recta"""
+    return Response(
+        {'error': 'OSRM no disponible (circuito abierto); la ruta no se guardó', 'approximate': True},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+
+
+def _polyline_result(result):
+    """En modo polyline6 la respuesta lleva solo la geometría codificada"""
+    if result.get('success'):
+        result = dict(result)
+        result.pop('geometry', None)
+        result.pop('raw_geometry', None)
+    return result
+
+
 class CleaningZoneViewSet(viewsets.ModelViewSet):
     """ViewSet para zonas de limpieza"""
     queryset = CleaningZone.objects.all()
@@ -37,8 +77,51 @@ class CleaningZoneViewSet(viewsets.ModelViewSet):
         """Obtener todas las rutas de una zona"""
         zone = self.get_object()
         routes = zone.routes.all()
-        serializer = RouteSerializer(routes, many=True)
+        serializer = RouteSerializer(routes, many=True, context={'request': request})
         return Response(serializer.data)
+    
+    @action(detail=True, methods=['get'])
+    def slowest_legs(self, request, pk=None):
+        """
+        Tramos más lentos de las rutas de una zona
+        GET /api/zones/{id}/slowest_legs/?limit=20
+        """
+        zone = self.get_object()
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 200)
+        except ValueError:
+            limit = 20
+        legs = slowest_legs(zone_id=zone.pk, limit=limit)
+        return Response(RouteLegSerializer(legs, many=True).data)
+
+    @action(detail=False, methods=['get'])
+    def dashboard(self, request):
+        """
+        Incidencias y tareas por zona y estado (usa el FK zone, sin ST_Contains)
+        GET /api/zones/dashboard/
+        """
+        from apps.tasks.models import Task
+
+        summary = {
+            str(zone['id']): {
+                'zone_name': zone['zone_name'],
+                'priority': zone['priority'],
+                'incidents': {},
+                'tasks': {},
+            }
+            for zone in CleaningZone.objects.values('id', 'zone_name', 'priority')
+        }
+        unassigned = {'zone_name': None, 'priority': None, 'incidents': {}, 'tasks': {}}
+        for key, model in (('incidents', Incident), ('tasks', Task)):
+            rows = model.objects.values('zone_id', 'status').annotate(total=Count('pk')).order_by()
+            for row in rows:
+                target = summary.get(str(row['zone_id']), unassigned) if row['zone_id'] else unassigned
+                target[key][row['status']] = row['total']
+        return Response({
+            'zones': summary,
+            'unassigned': unassigned,
+            'zone_index': zone_index.get_stats(),
+        })
 
 
 class RouteViewSet(viewsets.ModelViewSet):
@@ -52,6 +135,29 @@ class RouteViewSet(viewsets.ModelViewSet):
             return RouteListSerializer
         return RouteSerializer
     
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            # RouteListSerializer no expone geometrías
+            return queryset.defer('route_geometry', 'route_geometry_medium', 'route_geometry_low')
+        if self.action == 'retrieve':
+            # Cargar solo la columna de geometría que se va a serializar
+            resolution = geometry_resolution(self.request)
+            unused = {'route_geometry_medium', 'route_geometry_low'}
+            unused.discard(f'route_geometry_{resolution}')
+            return queryset.defer(*unused)
+        return queryset
+    
+    @action(detail=True, methods=['get'])
+    def legs(self, request, pk=None):
+        """
+        Tramos OSRM guardados de la ruta, en orden
+        GET /api/routes/{id}/legs/
+        """
+        route = self.get_object()
+        legs = route.legs.select_related('route', 'from_waypoint', 'to_waypoint')
+        return Response(RouteLegSerializer(legs, many=True).data)
+    
     @action(detail=False, methods=['post'])
     def calculate(self, request):
         """
@@ -70,16 +176,83 @@ class RouteViewSet(viewsets.ModelViewSet):
         optimize = serializer.validated_data['optimize']
         roundtrip = serializer.validated_data['roundtrip']
         
+        geometries = geometry_format(request)
+        
         # Convertir a formato OSRM (lon, lat)
         coordinates = [(wp['lon'], wp['lat']) for wp in waypoints]
         
         if optimize:
-            result = osrm_service.optimize_route(coordinates, roundtrip=roundtrip)
+            result = osrm_service.optimize_route(coordinates, roundtrip=roundtrip, geometries=geometries)
         else:
-            result = osrm_service.calculate_route(coordinates)
+            result = osrm_service.calculate_route(coordinates, geometries=geometries)
         
+        if geometries == 'polyline6':
+            result = _polyline_result(result)
         return Response(result)
     
+    @action(detail=False, methods=['post'])
+    def calculate_batch(self, request):
+        """
+        Calcular muchas rutas en paralelo, devolviendo NDJSON a medida que terminan
+        POST /api/v1/routes/calculate_batch/
+        {
+            "items": [
+                {"id": "zona-1", "waypoints": [{"lat": -0.9367, "lon": -78.6185}, ...]},
+                {"id": "zona-2", "waypoints": [...], "optimize": true}
+            ]
+        }
+        
+        Cada línea de la respuesta es {"index", "id", ...resultado}. Las solicitudes
+        idénticas dentro del lote se calculan una sola vez y los errores de un
+        ítem no interrumpen el resto.
+        """
+        serializer = CalculateBatchRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data['items']
+        geometries = geometry_format(request)
+        
+        # Agrupar solicitudes idénticas (mismos puntos y opciones)
+        groups = {}
+        for index, item in enumerate(items):
+            coordinates = tuple((float(wp['lon']), float(wp['lat'])) for wp in item['waypoints'])
+            key = (coordinates, item['optimize'], item['roundtrip'])
+            groups.setdefault(key, []).append(index)
+        
+        def _calculate(key):
+            coordinates, optimize, roundtrip = key
+            if optimize:
+                result = osrm_service.optimize_route(
+                    list(coordinates), roundtrip=roundtrip, geometries=geometries
+                )
+            else:
+                result = osrm_service.calculate_route(list(coordinates), geometries=geometries)
+            return _polyline_result(result) if geometries == 'polyline6' else result
+        
+        def _stream():
+            workers = min(getattr(settings, 'ROUTE_BATCH_CONCURRENCY', 8), len(groups))
+            pool = ThreadPoolExecutor(max_workers=workers)
+            futures = {pool.submit(_calculate, key): key for key in groups}
+            try:
+                for future in as_completed(futures):
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.error(f"Error en cálculo por lote: {e}")
+                        result = {'success': False, 'error': str(e)}
+                    for index in groups[futures[future]]:
+                        line = {'index': index, 'id': items[index]['id']}
+                        line.update(result)
+                        yield json.dumps(line, cls=OSRMResultEncoder) + '\n'
+            finally:
+                # Si el cliente se desconecta (GeneratorExit) no esperar a los
+                # cálculos pendientes: se cancelan los que aún no empezaron
+                pool.shutdown(wait=False, cancel_futures=True)
+        
+        response = StreamingHttpResponse(_stream(), content_type='application/x-ndjson')
+        response['X-Batch-Size'] = str(len(items))
+        response['X-Batch-Unique'] = str(len(groups))
+        return response
+    
     @action(detail=False, methods=['post'])
     def create_from_waypoints(self, request):
         """
@@ -93,47 +266,143 @@ class RouteViewSet(viewsets.ModelViewSet):
         waypoints = data['waypoints']
         optimize = data.get('optimize', False)
         
-        # Calcular ruta con OSRM
+        # Calcular ruta con OSRM. polyline6 conserva la precisión de OSRM (1e-6)
+        # con una respuesta mucho más pequeña que GeoJSON
         coordinates = [(wp['lon'], wp['lat']) for wp in waypoints]
         
         if optimize:
-            osrm_result = osrm_service.optimize_route(coordinates)
+            osrm_result = osrm_service.optimize_route(coordinates, geometries='polyline6', annotations=True)
         else:
-            osrm_result = osrm_service.calculate_route(coordinates)
+            osrm_result = osrm_service.calculate_route(coordinates, geometries='polyline6')
         
         if not osrm_result.get('success'):
             return Response(
                 {'error': osrm_result.get('error', 'Error al calcular ruta')},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        if osrm_result.get('approximate'):
+            return _approximate_response()
         
-        # Crear ruta en BD
-        route = Route.objects.create(
-            route_name=data['route_name'],
-            zone_id=data.get('zone_id'),
-            route_geometry=osrm_result['geometry'],
-            waypoints=waypoints,
-            total_distance_km=osrm_result['distance_km'],
-            estimated_duration_minutes=osrm_result['duration_minutes'],
-            optimization_algorithm='osrm' if optimize else 'osrm-direct'
+        # Crear ruta y waypoints en una sola transacción
+        route = create_routes_bulk([
+            {'data': data, 'osrm_result': osrm_result, 'optimize': optimize}
+        ])[0]
+        
+        serializer = RouteSerializer(route, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    
+    @action(detail=False, methods=['post'])
+    def bulk_import(self, request):
+        """
+        Importar muchas rutas (con sus waypoints) en una sola petición.
+        Las rutas se calculan en paralelo y se guardan en una única transacción;
+        si alguna falla no se guarda ninguna.
+        POST /api/v1/routes/bulk_import/
+        {
+            "routes": [
+                {"route_name": "...", "zone_id": "...", "waypoints": [...], "optimize": false},
+                ...
+            ]
+        }
+        """
+        serializer = BulkImportRoutesRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        specs = serializer.validated_data['routes']
+        
+        def _calculate(data):
+            coordinates = [(wp['lon'], wp['lat']) for wp in data['waypoints']]
+            if data.get('optimize', False):
+                return osrm_service.optimize_route(coordinates, geometries='polyline6', annotations=True)
+            return osrm_service.calculate_route(coordinates, geometries='polyline6')
+        
+        workers = min(getattr(settings, 'ROUTE_BATCH_CONCURRENCY', 8), len(specs))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_calculate, specs))
+        
+        errors = {
+            i: result.get('error', 'Error al calcular ruta')
+            for i, result in enumerate(results)
+            if not result.get('success')
+        }
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        if any(result.get('approximate') for result in results):
+            return _approximate_response()
+        
+        routes = create_routes_bulk([
+            {'data': data, 'osrm_result': result, 'optimize': data.get('optimize', False)}
+            for data, result in zip(specs, results)
+        ])
+        
+        return Response({
+            'success': True,
+            'created': len(routes),
+            'routes': RouteListSerializer(routes, many=True).data
+        }, status=status.HTTP_201_CREATED)
+    
+    @action(detail=True, methods=['post'])
+    def optimize(self, request, pk=None):
+        """
+        Optimizar una ruta existente con el motor VRP (multi-vehículo, capacidad
+        y ventanas de tiempo).
+        POST /api/v1/routes/{id}/optimize/
+        {
+            "vehicles": 2,
+            "vehicle_capacity": 40,
+            "time_windows": {"3": [0, 120]},
+            "apply": true
+        }
+        """
+        route = self.get_object()
+        serializer = OptimizeRouteRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        
+        solution = solve_route_waypoints(
+            route,
+            osrm_service,
+            vehicle_count=data.get('vehicles'),
+            vehicle_capacity=data.get('vehicle_capacity'),
+            time_windows=data.get('time_windows'),
+            max_route_minutes=data.get('max_route_minutes'),
+            time_budget=data['time_budget_seconds']
         )
         
-        # Crear waypoints
-        waypoint_details = data.get('waypoint_details', [])
-        for i, wp in enumerate(waypoints):
-            details = waypoint_details[i] if i < len(waypoint_details) else {}
-            
-            RouteWaypoint.objects.create(
-                route=route,
-                waypoint_order=i,
-                location=Point(wp['lon'], wp['lat'], srid=4326),
-                address=details.get('address'),
-                waypoint_type=details.get('type'),
-                notes=details.get('notes')
+        if not solution.get('success'):
+            return Response(
+                {'error': solution.get('error', 'Error al optimizar ruta')},
+                status=status.HTTP_400_BAD_REQUEST
             )
         
-        serializer = RouteSerializer(route)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        waypoints = solution['waypoints']
+        response = {
+            'success': True,
+            'algorithm': solution['algorithm'],
+            'vehicles': [
+                {
+                    'waypoint_orders': [waypoints[i].waypoint_order for i in nodes],
+                    'travel_seconds': solution['route_travel_seconds'][k],
+                    'duration_seconds': solution['route_durations_seconds'][k],
+                }
+                for k, nodes in enumerate(solution['routes'])
+            ],
+            'unassigned_waypoint_orders': [waypoints[i].waypoint_order for i in solution['unassigned']],
+            'total_travel_seconds': solution['total_travel_seconds'],
+            'initial_travel_seconds': solution['initial_travel_seconds'],
+            'elapsed_seconds': solution['elapsed_seconds'],
+        }
+        
+        if data['apply']:
+            try:
+                routes = apply_vrp_solution(route, solution, osrm_service)
+            except VRPApplyError as e:
+                return Response(
+                    {'error': str(e), 'approximate': e.approximate},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE if e.approximate else status.HTTP_400_BAD_REQUEST
+                )
+            response['routes'] = RouteSerializer(routes, many=True, context={'request': request}).data
+        
+        return Response(response)
     
     @action(detail=False, methods=['post'])
     def nearest_road(self, request):
@@ -153,8 +422,70 @@ class RouteViewSet(viewsets.ModelViewSet):
         coordinate = (data['lon'], data['lat'])
         number = data.get('number', 1)
         
-        result = osrm_service.nearest_road(coordinate, number)
-        return Response(result)
+        if number > 1:
+            return Response(osrm_service.nearest_road(coordinate, number))
+        
+        # Un solo punto: resolver por la caché de celdas
+        snap = snap_cache.snap(coordinate)
+        if not snap['success']:
+            return Response(snap)
+        return Response({
+            'success': True,
+            'waypoints': [{
+                'location': snap['location'],
+                'name': snap['name'],
+                'distance': snap['distance_meters']
+            }],
+            'cached': snap['source'] != 'osrm'
+        })
+    
+    @action(detail=False, methods=['post'])
+    def snap(self, request):
+        """
+        Ajustar muchos puntos y/o incidencias a la red vial en una sola llamada
+        POST /api/v1/routes/snap/
+        {
+            "points": [{"id": "a", "lat": -0.9367, "lon": -78.6185}, ...],
+            "incident_ids": ["uuid", ...]
+        }
+        
+        Los puntos de una misma celda de la grilla se resuelven una sola vez y
+        las consultas a OSRM se hacen en paralelo (ROUTE_SNAP_CONCURRENCY).
+        """
+        serializer = SnapPointsRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        
+        items = [
+            {'id': point.get('id'), 'lat': point['lat'], 'lon': point['lon']}
+            for point in data['points']
+        ]
+        if data['incident_ids']:
+            incidents = Incident.objects.filter(id__in=data['incident_ids']).only('id', 'location')
+            found = {incident.id: incident for incident in incidents}
+            for incident_id in data['incident_ids']:
+                incident = found.get(incident_id)
+                if incident is None or incident.location is None:
+                    items.append({'incident_id': str(incident_id), 'error': 'Incidencia sin ubicación'})
+                else:
+                    items.append({
+                        'incident_id': str(incident_id),
+                        'lat': incident.location.y,
+                        'lon': incident.location.x
+                    })
+        
+        to_snap = [item for item in items if 'error' not in item]
+        snaps = snap_cache.snap_many([(item['lon'], item['lat']) for item in to_snap])
+        for item, snap in zip(to_snap, snaps):
+            item.update(snap)
+        for item in items:
+            item.setdefault('success', False)
+        
+        return Response({
+            'success': True,
+            'count': len(items),
+            'results': items
+        })
     
     @action(detail=False, methods=['get'])
     def health(self, request):
@@ -162,5 +493,8 @@ class RouteViewSet(viewsets.ModelViewSet):
         is_healthy = osrm_service.health_check()
         return Response({
             'osrm_status': 'available' if is_healthy else 'unavailable',
-            'healthy': is_healthy
+            'healthy': is_healthy,
+            'circuit_breaker': osrm_service.breaker.get_state(),
+            'metrics': osrm_service.get_metrics(),
+            'snap_cache': snap_cache.get_stats()
         })
@@ -0,0 +1,162 @@
+"""
+Índice en memoria de zonas de limpieza para asignar puntos a su zona sin
+hacer ST_Contains contra todos los polígonos en la base de datos.
+
+Los polígonos se guardan preparados (GEOS PreparedGeometry) y se indexan en
+una grilla por su bounding box: una consulta solo evalúa las zonas cuyo
+rectángulo cubre la celda del punto. El índice se carga en el primer uso, se
+reconstruye al guardar/eliminar una CleaningZone en este proceso y, para
+enterarse de cambios hechos por otros procesos, compara cada
+ZONE_INDEX_REFRESH_SECONDS la firma (cantidad, último updated_at) de la tabla.
+"""
+
+import logging
+import math
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+from django.conf import settings
+from django.db.models import Count, Max
+
+logger = logging.getLogger(__name__)
+
+
+class _Snapshot:
+    """Estado inmutable del índice; se reemplaza entero al reconstruir"""
+
+    def __init__(self, zones, cell_size: float, signature):
+        self.cell_size = cell_size
+        self.signature = signature
+        self.count = len(zones)
+        self.cells: Dict[Tuple[int, int], List[Tuple[int, object, object]]] = {}
+        # Las de mayor prioridad primero: ante solapamientos gana la más prioritaria
+        for zone in sorted(zones, key=lambda z: -z.priority):
+            polygon = zone.zone_polygon
+            entry = (zone.priority, zone.pk, polygon.prepared)
+            xmin, ymin, xmax, ymax = polygon.extent
+            for cx in range(self._cell(xmin), self._cell(xmax) + 1):
+                for cy in range(self._cell(ymin), self._cell(ymax) + 1):
+                    self.cells.setdefault((cx, cy), []).append(entry)
+
+    def _cell(self, value: float) -> int:
+        return math.floor(value / self.cell_size)
+
+    def lookup(self, point):
+        for _, zone_id, prepared in self.cells.get((self._cell(point.x), self._cell(point.y)), ()):
+            if prepared.covers(point):
+                return zone_id
+        return None
+
+
+class ZoneIndex:
+    """Asigna puntos (SRID 4326) a la CleaningZone activa que los contiene"""
+
+    def __init__(self, cell_size: Optional[float] = None, refresh_seconds: Optional[int] = None):
+        self.cell_size = cell_size or getattr(settings, 'ZONE_INDEX_CELL_DEGREES', 0.01)
+        self.refresh_seconds = (
+            refresh_seconds if refresh_seconds is not None
+            else getattr(settings, 'ZONE_INDEX_REFRESH_SECONDS', 60)
+        )
+        self._snapshot: Optional[_Snapshot] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.rebuilds = 0
+
+    def _signature(self):
+        from .models import CleaningZone
+
+        stats = CleaningZone.objects.filter(status='active').aggregate(
+            count=Count('pk'), updated=Max('updated_at')
+        )
+        return stats['count'], stats['updated']
+
+    def rebuild(self):
+        """Recarga los polígonos de las zonas activas"""
+        from .models import CleaningZone
+
+        with self._lock:
+            signature = self._signature()
+            zones = list(CleaningZone.objects.filter(status='active').only('id', 'priority', 'zone_polygon'))
+            self._snapshot = _Snapshot(zones, self.cell_size, signature)
+            self._checked_at = time.monotonic()
+            self.rebuilds += 1
+        logger.info(f"🗺️ Índice de zonas cargado: {len(zones)} zonas")
+
+    def invalidate(self):
+        """Fuerza la reconstrucción en la próxima consulta"""
+        self._snapshot = None
+
+    def _current(self) -> _Snapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            self.rebuild()
+            return self._snapshot
+        if time.monotonic() - self._checked_at >= self.refresh_seconds:
+            self._checked_at = time.monotonic()
+            if self._signature() != snapshot.signature:
+                self.rebuild()
+                return self._snapshot
+        return snapshot
+
+    def zone_for_point(self, point):
+        """ID de la zona que contiene el punto, o None"""
+        if point is None:
+            return None
+        self.lookups += 1
+        return self._current().lookup(point)
+
+    def zones_for_points(self, points: Sequence) -> List:
+        """Como zone_for_point para muchos puntos, con una sola verificación de frescura"""
+        snapshot = self._current()
+        self.lookups += len(points)
+        return [snapshot.lookup(point) if point is not None else None for point in points]
+
+    def get_stats(self) -> Dict:
+        snapshot = self._snapshot
+        return {
+            'zones': snapshot.count if snapshot else 0,
+            'cells': len(snapshot.cells) if snapshot else 0,
+            'cell_size': self.cell_size,
+            'lookups': self.lookups,
+            'rebuilds': self.rebuilds,
+        }
+
+
+# Instancia global
+zone_index = ZoneIndex()
+
+
+def assign_zones(model, batch_size: int = 2000, only_missing: bool = True) -> Dict:
+    """
+    Rellena por lotes el FK zone de un modelo con campo location (Incident, Task).
+
+    Recorre la tabla por pk en orden (keyset), así cada lote es una consulta
+    indexada y el progreso no depende de las filas ya actualizadas.
+    """
+    queryset = model.objects.exclude(location__isnull=True).only('pk', 'location', 'zone')
+    if only_missing:
+        queryset = queryset.filter(zone__isnull=True)
+    queryset = queryset.order_by('pk')
+
+    scanned = assigned = 0
+    last_pk = None
+    while True:
+        page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        batch = list(page[:batch_size])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        zone_ids = zone_index.zones_for_points([obj.location for obj in batch])
+        changed = []
+        for obj, zone_id in zip(batch, zone_ids):
+            if obj.zone_id != zone_id:
+                obj.zone_id = zone_id
+                changed.append(obj)
+        if changed:
+            model.objects.bulk_update(changed, ['zone'], batch_size=batch_size)
+        scanned += len(batch)
+        assigned += sum(1 for obj in changed if obj.zone_id is not None)
+
+    logger.info(f"✅ {model.__name__}: {assigned} de {scanned} filas asignadas a zona")
+    return {'scanned': scanned, 'assigned': assigned}
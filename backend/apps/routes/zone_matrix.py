@@ -0,0 +1,172 @@
+"""
+Matrices de distancia precalculadas por zona de limpieza.
+
+Cada CleaningZone guarda la matriz /table entre todas las paradas de sus rutas
+(ZoneDistanceMatrix). Cuando cambian los RouteWaypoint de la zona solo se
+piden a OSRM las filas y columnas de las paradas nuevas; las eliminadas se
+descartan sin nuevas consultas.
+
+Las matrices estimadas en línea recta (circuito OSRM abierto) se devuelven
+pero no se guardan: la próxima consulta las pedirá de nuevo a OSRM.
+"""
+
+import hashlib
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+from .models import CleaningZone, RouteWaypoint, ZoneDistanceMatrix
+
+logger = logging.getLogger(__name__)
+
+
+COORD_DECIMALS = 6
+
+
+def _normalize(coordinates: Sequence[Tuple[float, float]]) -> List[Tuple[float, float]]:
+    """Redondea y elimina coordenadas repetidas conservando el orden"""
+    seen = {}
+    for lon, lat in coordinates:
+        key = (round(float(lon), COORD_DECIMALS), round(float(lat), COORD_DECIMALS))
+        seen.setdefault(key, None)
+    return list(seen)
+
+
+def coordinates_fingerprint(coordinates: Sequence[Tuple[float, float]]) -> str:
+    """SHA-256 del conjunto de coordenadas (independiente del orden)"""
+    ordered = np.array(sorted(_normalize(coordinates)), dtype=np.float64)
+    return hashlib.sha256(ordered.tobytes()).hexdigest()
+
+
+def zone_stop_coordinates(zone: CleaningZone) -> List[Tuple[float, float]]:
+    """Coordenadas (lon, lat) únicas de todos los waypoints de las rutas de la zona"""
+    locations = (
+        RouteWaypoint.objects
+        .filter(route__zone=zone)
+        .order_by('route_id', 'waypoint_order')
+        .values_list('location', flat=True)
+    )
+    return _normalize((point.x, point.y) for point in locations)
+
+
+def load_arrays(matrix: ZoneDistanceMatrix) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Decodifica los blobs de una matriz guardada"""
+    n = matrix.size
+    coordinates = np.frombuffer(bytes(matrix.coordinates), dtype=np.float64).reshape(n, 2)
+    durations = np.frombuffer(bytes(matrix.durations), dtype=np.float32).reshape(n, n)
+    distances = np.frombuffer(bytes(matrix.distances), dtype=np.float32).reshape(n, n)
+    return coordinates, durations, distances
+
+
+def get_zone_matrix(zone: CleaningZone, osrm, coordinates: Optional[Sequence[Tuple[float, float]]] = None) -> Dict:
+    """
+    Retorna la matriz de la zona, actualizándola de forma incremental si el
+    conjunto de paradas cambió desde el último cálculo.
+
+    Args:
+        zone: Zona de limpieza
+        osrm: Servicio OSRM para las filas/columnas nuevas
+        coordinates: Paradas de la zona (default: waypoints de sus rutas)
+
+    Returns:
+        Dict con coordenadas, matrices float32 y contadores de filas pedidas/reutilizadas
+    """
+    current = _normalize(coordinates) if coordinates is not None else zone_stop_coordinates(zone)
+    fingerprint = coordinates_fingerprint(current)
+    stored = ZoneDistanceMatrix.objects.filter(zone=zone).first()
+
+    if stored is not None and stored.fingerprint == fingerprint:
+        coords, durations, distances = load_arrays(stored)
+        return {
+            'success': True,
+            'coordinates': [tuple(c) for c in coords.tolist()],
+            'durations': durations,
+            'distances': distances,
+            'reused': stored.size,
+            'fetched': 0,
+            'approximate': False,
+        }
+
+    if stored is not None:
+        old_coords, old_durations, old_distances = load_arrays(stored)
+        old_index = {tuple(c): i for i, c in enumerate(old_coords.tolist())}
+    else:
+        old_durations = old_distances = None
+        old_index = {}
+
+    kept = [c for c in current if c in old_index]
+    added = [c for c in current if c not in old_index]
+    ordered = kept + added
+    k, n = len(kept), len(ordered)
+
+    durations = np.full((n, n), np.nan, dtype=np.float32)
+    distances = np.full((n, n), np.nan, dtype=np.float32)
+    approximate = False
+
+    if kept:
+        idx = np.array([old_index[c] for c in kept])
+        durations[:k, :k] = old_durations[np.ix_(idx, idx)]
+        distances[:k, :k] = old_distances[np.ix_(idx, idx)]
+
+    if added:
+        rows = osrm.calculate_matrix(added, ordered, compact=True)
+        if not rows.get('success'):
+            return {'success': False, 'error': rows.get('error', 'Error al calcular matriz')}
+        durations[k:, :] = rows['durations']
+        distances[k:, :] = rows['distances']
+        approximate = bool(rows.get('approximate'))
+
+        if kept:
+            cols = osrm.calculate_matrix(kept, added, compact=True)
+            if not cols.get('success'):
+                return {'success': False, 'error': cols.get('error', 'Error al calcular matriz')}
+            durations[:k, k:] = cols['durations']
+            distances[:k, k:] = cols['distances']
+            approximate = approximate or bool(cols.get('approximate'))
+
+    result = {
+        'success': True,
+        'coordinates': ordered,
+        'durations': durations,
+        'distances': distances,
+        'reused': k,
+        'fetched': len(added),
+        'approximate': approximate,
+    }
+    if approximate:
+        # No persistir distancias en línea recta (como las rutas en route_generation)
+        logger.warning(f"Matriz de zona {zone.zone_name} estimada sin OSRM: no se guarda")
+        return result
+
+    ZoneDistanceMatrix.objects.update_or_create(
+        zone=zone,
+        defaults={
+            'size': n,
+            'coordinates': np.array(ordered, dtype=np.float64).reshape(n, 2).tobytes(),
+            'durations': durations.tobytes(),
+            'distances': distances.tobytes(),
+            'fingerprint': fingerprint,
+        }
+    )
+    logger.info(
+        f"Matriz de zona {zone.zone_name} actualizada: {n} paradas "
+        f"({k} reutilizadas, {len(added)} nuevas, "
+        f"{len(old_index) - k} eliminadas)"
+    )
+    return result
+
+
+def submatrix(zone_matrix: Dict, coordinates: Sequence[Tuple[float, float]], key: str = 'durations') -> Optional[np.ndarray]:
+    """
+    Extrae la submatriz correspondiente a las coordenadas indicadas (en ese orden).
+    Retorna None si alguna coordenada no pertenece a la matriz de la zona.
+    """
+    index = {tuple(c): i for i, c in enumerate(zone_matrix['coordinates'])}
+    try:
+        idx = np.array([
+            index[(round(float(lon), COORD_DECIMALS), round(float(lat), COORD_DECIMALS))]
+            for lon, lat in coordinates
+        ])
+    except KeyError:
+        return None
+    return zone_matrix[key][np.ix_(idx, idx)]
@@ -44,7 +44,7 @@ class TaskAdmin(GISModelAdmin):
             'fields': ('started_at', 'completed_at', 'paused_at')
         }),
         ('Recursos', {
-            'fields': ('team_size', 'equipment_needed', 'materials_needed')
+            'fields': ('vehicle_id', 'team_size', 'equipment_needed', 'materials_needed')
         }),
         ('Progreso', {
             'fields': (
@@ -0,0 +1,256 @@
+"""
+Motor de ETA incremental para tareas en curso.
+
+El tiempo restante de una tarea con ruta se compone de:
+- el tramo en vivo desde la posición actual del vehículo hasta la próxima
+  parada (única consulta a OSRM, vía /table 1x1 y con caché),
+- los tramos OSRM ya guardados en RouteWaypoint entre las paradas restantes,
+- el tiempo de servicio de cada parada restante.
+
+Las paradas se dan por visitadas según los TaskCheckpoint completados y su
+enlace route_waypoint. Los checkpoints sin enlace (tareas anteriores) solo se
+usan con la convención checkpoint N = parada con waypoint_order N - 1 si la
+tarea la cumple: un checkpoint por parada y cada uno a menos de
+ETA_CHECKPOINT_MATCH_METERS de su parada. Nunca se vuelve a calcular la ruta
+completa.
+
+La posición en vivo es la del vehículo de la tarea (Task.vehicle_id) en el
+buffer de seguimiento.
+"""
+
+import logging
+import time
+from typing import Dict, List, Optional, Set, Tuple
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.utils import timezone
+
+from apps.routes.osrm_service import OSRMService, osrm_service
+from apps.routes.snapping import haversine_meters
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+
+def live_position(task: Task) -> Optional[Tuple[float, float]]:
+    """Última posición (lon, lat) reciente del vehículo de la tarea (Task.vehicle_id)"""
+    if not task.vehicle_id:
+        return None
+    from apps.tracking.buffer import get_fix_buffer
+
+    try:
+        fixes = get_fix_buffer().read(task.vehicle_id)
+    except Exception as e:
+        logger.warning(f"No se pudo leer la posición de la tarea {task.task_id}: {e}")
+        return None
+    if not len(fixes):
+        return None
+    last = fixes[fixes['ts'].argmax()]
+    max_age = getattr(settings, 'ETA_POSITION_MAX_AGE', 300)
+    if time.time() - int(last['ts']) > max_age:
+        return None
+    return float(last['lon']), float(last['lat'])
+
+
+def _convention_holds(checkpoints: List, by_order: Dict) -> bool:
+    """True si los checkpoints siguen checkpoint N = parada N - 1 (uno por parada, en su ubicación)"""
+    if len(checkpoints) != len(by_order):
+        return False
+    max_meters = getattr(settings, 'ETA_CHECKPOINT_MATCH_METERS', 50)
+    for cp in checkpoints:
+        wp = by_order.get(cp.checkpoint_order - 1)
+        if wp is None:
+            return False
+        if cp.location and wp.location and haversine_meters(
+            cp.location.x, cp.location.y, wp.location.x, wp.location.y
+        ) > max_meters:
+            return False
+    return True
+
+
+def visited_waypoints(task: Task, waypoints: List) -> Set[int]:
+    """waypoint_order de las paradas cuyo checkpoint está completado"""
+    by_id = {wp.pk: wp for wp in waypoints}
+    by_order = {wp.waypoint_order: wp for wp in waypoints}
+    checkpoints = list(task.checkpoints.all())
+
+    visited = set()
+    unlinked = []
+    for cp in checkpoints:
+        if cp.route_waypoint_id is None:
+            unlinked.append(cp)
+        elif cp.is_completed and cp.route_waypoint_id in by_id:
+            visited.add(by_id[cp.route_waypoint_id].waypoint_order)
+
+    completed = [cp for cp in unlinked if cp.is_completed]
+    if completed:
+        if _convention_holds(checkpoints, by_order):
+            visited.update(cp.checkpoint_order - 1 for cp in completed)
+        else:
+            logger.warning(
+                f"Tarea {task.task_id}: {len(completed)} checkpoints completados sin parada "
+                "enlazada no coinciden con la ruta; no se descuentan de la ETA"
+            )
+    return visited
+
+
+def _leg_seconds(previous, waypoint, speed_mps: float) -> float:
+    """Duración guardada del tramo; estimación en línea recta si la ruta es anterior a los tramos"""
+    if waypoint.leg_duration_seconds is not None:
+        return waypoint.leg_duration_seconds
+    if previous is None:
+        return 0.0
+    return haversine_meters(
+        previous.location.x, previous.location.y, waypoint.location.x, waypoint.location.y
+    ) / speed_mps
+
+
+def _live_leg_seconds(osrm: OSRMService, position: Tuple[float, float], waypoint) -> Optional[float]:
+    """Duración OSRM desde la posición actual hasta la parada"""
+    try:
+        data = osrm.table_request(
+            [position, (waypoint.location.x, waypoint.location.y)], [0], [1]
+        )
+    except Exception as e:
+        logger.warning(f"Error al calcular tramo en vivo: {e}")
+        return None
+    if data.get('code') != 'Ok':
+        return None
+    duration = (data.get('durations') or [[None]])[0][0]
+    return float(duration) if duration is not None else None
+
+
+def compute_task_eta(
+    task: Task,
+    position: Optional[Tuple[float, float]] = None,
+    osrm: Optional[OSRMService] = None
+) -> Dict:
+    """
+    Calcula el tiempo restante de una tarea.
+
+    Args:
+        task: Tarea (con route y checkpoints)
+        position: (lon, lat) actual; por defecto, la del buffer de seguimiento
+        osrm: Cliente OSRM para el tramo en vivo
+
+    Returns:
+        Dict con remaining_seconds, next_waypoint_order y la ETA de cada parada restante
+    """
+    osrm = osrm or osrm_service
+    result = {
+        'task_id': task.task_id,
+        'route_id': str(task.route_id) if task.route_id else None,
+        'status': task.status,
+        'remaining_seconds': 0,
+        'next_waypoint_order': None,
+        'live_leg_seconds': None,
+        'position': list(position) if position else None,
+        'stops': [],
+    }
+
+    if task.status in ('completed', 'cancelled'):
+        return result
+
+    if task.route_id is None:
+        # Sin ruta: repartir la duración estimada según el progreso
+        remaining = task.estimated_duration * 60 * (100 - task.completion_percentage) / 100
+        result['remaining_seconds'] = int(remaining)
+        return result
+
+    waypoints = sorted(task.route.route_waypoints.all(), key=lambda wp: wp.waypoint_order)
+    visited = visited_waypoints(task, waypoints)
+    remaining = [wp for wp in waypoints if wp.waypoint_order not in visited]
+    if not remaining:
+        return result
+
+    if position is None:
+        position = live_position(task)
+        result['position'] = list(position) if position else None
+
+    speed_mps = getattr(settings, 'ETA_FALLBACK_SPEED_KMH', 25) / 3.6
+    by_order = {wp.waypoint_order: wp for wp in waypoints}
+    next_stop = remaining[0]
+
+    # Tramo hasta la próxima parada: en vivo si hay posición, si no el tramo guardado
+    first_leg = _live_leg_seconds(osrm, position, next_stop) if position else None
+    result['live_leg_seconds'] = first_leg
+    if first_leg is None:
+        first_leg = _leg_seconds(by_order.get(next_stop.waypoint_order - 1), next_stop, speed_mps)
+
+    elapsed = first_leg
+    stops: List[Dict] = []
+    previous = None
+    for wp in remaining:
+        if previous is not None:
+            elapsed += _leg_seconds(previous, wp, speed_mps)
+        stops.append({'waypoint_order': wp.waypoint_order, 'eta_seconds': int(elapsed)})
+        elapsed += wp.estimated_service_minutes * 60
+        previous = wp
+
+    result.update({
+        'remaining_seconds': int(elapsed),
+        'next_waypoint_order': next_stop.waypoint_order,
+        'stops': stops,
+    })
+    return result
+
+
+def push_route_update(task: Task, eta: Dict):
+    """Envía la ETA al handler route_update del consumer de notificaciones"""
+    if not task.assigned_to_id:
+        return
+    from channels.layers import get_channel_layer
+
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    try:
+        async_to_sync(channel_layer.group_send)(
+            f'notifications_user_{task.assigned_to_id}',
+            {'type': 'route_update', 'data': dict(eta, event='eta_updated')}
+        )
+    except Exception as e:
+        logger.warning(f"No se pudo enviar la ETA de {task.task_id}: {e}")
+
+
+def update_task_eta(
+    task: Task,
+    position: Optional[Tuple[float, float]] = None,
+    push: bool = True,
+    min_change_seconds: int = 0
+) -> Dict:
+    """
+    Recalcula, guarda y (si cambió lo suficiente) publica la ETA de una tarea.
+
+    Args:
+        min_change_seconds: No publicar si la ETA varió menos que esto
+    """
+    eta = compute_task_eta(task, position=position)
+    previous = task.eta_remaining_seconds
+    task.eta_remaining_seconds = eta['remaining_seconds']
+    task.eta_updated_at = timezone.now()
+    task.save(update_fields=['eta_remaining_seconds', 'eta_updated_at'])
+
+    changed = previous is None or abs(previous - eta['remaining_seconds']) >= min_change_seconds
+    if push and changed:
+        push_route_update(task, eta)
+    return eta
+
+
+def refresh_in_progress_etas() -> Dict:
+    """Recalcula la ETA de todas las tareas en curso (usa las posiciones en vivo)"""
+    threshold = getattr(settings, 'ETA_PUSH_THRESHOLD_SECONDS', 30)
+    tasks = (
+        Task.objects.filter(status='in_progress')
+        .select_related('route')
+        .prefetch_related('checkpoints', 'route__route_waypoints')
+    )
+    updated = errors = 0
+    for task in tasks:
+        try:
+            update_task_eta(task, min_change_seconds=threshold)
+            updated += 1
+        except Exception as e:
+            errors += 1
+            logger.error(f"Error al recalcular ETA de {task.task_id}: {e}")
+    return {'updated': updated, 'errors': errors}
@@ -0,0 +1,42 @@
+"""
+Genera rutas y tareas a partir de las incidencias validadas de cada zona
+(lo mismo que la tarea programada, pero en este proceso) y muestra los
+tiempos de cada etapa por zona.
+
+Uso:
+    python manage.py generate_zone_routes
+    python manage.py generate_zone_routes --zone <uuid> --zone <uuid>
+    python manage.py generate_zone_routes --workers 8
+"""
+
+from django.core.management.base import BaseCommand
+from apps.routes.models import CleaningZone
+from apps.tasks.route_generation import generate_all_zones, generate_zone_routes
+
+
+class Command(BaseCommand):
+    help = 'Genera rutas y tareas desde incidencias validadas por zona'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--zone', action='append', help='ID de zona (repetible); por defecto todas las activas')
+        parser.add_argument('--workers', type=int, default=None, help='Zonas en paralelo')
+
+    def handle(self, *args, **options):
+        if options['zone']:
+            results = [
+                generate_zone_routes(zone)
+                for zone in CleaningZone.objects.filter(pk__in=options['zone'])
+            ]
+        else:
+            results = generate_all_zones(max_workers=options['workers'])
+
+        for metrics in results:
+            timings = ' '.join(f"{k}={v}s" for k, v in metrics['timings'].items())
+            line = (
+                f"{metrics['zone_name']}: {metrics['incidents']} incidencias, "
+                f"{metrics['stops']} paradas, {metrics['routes']} rutas | {timings}"
+            )
+            if metrics['error']:
+                self.stdout.write(self.style.ERROR(f"{line} | error: {metrics['error']}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(line))
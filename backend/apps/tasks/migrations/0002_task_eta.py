@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='eta_remaining_seconds',
+            field=models.IntegerField(blank=True, help_text='Tiempo restante estimado (ver apps/tasks/eta.py)', null=True),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='eta_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
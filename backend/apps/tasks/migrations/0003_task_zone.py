@@ -0,0 +1,22 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes', '0007_routeleg'),
+        ('tasks', '0002_task_eta'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='zone',
+            field=models.ForeignKey(blank=True, help_text='Zona que contiene la ubicación (asignada con apps/routes/zone_index.py)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tasks', to='routes.cleaningzone'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['zone', 'status'], name='tasks_zone_status_idx'),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0003_task_zone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='vehicle_id',
+            field=models.CharField(blank=True, default='', help_text='Vehículo que realiza la tarea (vehicle_id del seguimiento GPS)', max_length=64),
+        ),
+    ]
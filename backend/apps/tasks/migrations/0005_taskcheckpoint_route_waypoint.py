@@ -0,0 +1,18 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes', '0007_routeleg'),
+        ('tasks', '0004_task_vehicle_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskcheckpoint',
+            name='route_waypoint',
+            field=models.ForeignKey(blank=True, help_text='Parada de la ruta de la tarea que representa este checkpoint', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='checkpoints', to='routes.routewaypoint'),
+        ),
+    ]
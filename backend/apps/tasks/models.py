@@ -30,6 +30,9 @@ class Task(models.Model):
         (5, 'Urgente'),
     ]
 
+    # Estados en los que el trabajador asignado reporta la posición del vehículo
+    TRACKING_STATUSES = ('assigned', 'in_progress', 'paused')
+
     # Identificación
     task_id = models.CharField(max_length=50, unique=True, db_index=True)
     title = models.CharField(max_length=200)
@@ -86,6 +89,14 @@ class Task(models.Model):
         help_text='Ubicación específica de la tarea'
     )
     address = models.CharField(max_length=500, blank=True)
+    zone = models.ForeignKey(
+        'routes.CleaningZone',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='tasks',
+        help_text='Zona que contiene la ubicación (asignada con apps/routes/zone_index.py)'
+    )
 
     # Fechas y tiempos
     scheduled_date = models.DateField(
@@ -114,6 +125,12 @@ class Task(models.Model):
     paused_at = models.DateTimeField(null=True, blank=True)
 
     # Recursos
+    vehicle_id = models.CharField(
+        max_length=64,
+        blank=True,
+        default='',
+        help_text='Vehículo que realiza la tarea (vehicle_id del seguimiento GPS)'
+    )
     team_size = models.IntegerField(
         default=1,
         validators=[MinValueValidator(1)],
@@ -137,6 +154,12 @@ class Task(models.Model):
     )
     checkpoints_completed = models.IntegerField(default=0)
     checkpoints_total = models.IntegerField(default=0)
+    eta_remaining_seconds = models.IntegerField(
+        null=True,
+        blank=True,
+        help_text='Tiempo restante estimado (ver apps/tasks/eta.py)'
+    )
+    eta_updated_at = models.DateTimeField(null=True, blank=True)
 
     # Resultados
     result_notes = models.TextField(blank=True)
@@ -166,6 +189,7 @@ class Task(models.Model):
             models.Index(fields=['assigned_to', 'status']),
             models.Index(fields=['priority', 'status']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['zone', 'status'], name='tasks_zone_status_idx'),
         ]
         verbose_name = 'Tarea'
         verbose_name_plural = 'Tareas'
@@ -197,6 +221,14 @@ class TaskCheckpoint(models.Model):
     )
     name = models.CharField(max_length=200)
     description = models.TextField(blank=True)
+    route_waypoint = models.ForeignKey(
+        'routes.RouteWaypoint',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='checkpoints',
+        help_text='Parada de la ruta de la tarea que representa este checkpoint'
+    )
 
     # Localización del checkpoint
     location = gis_models.PointField(
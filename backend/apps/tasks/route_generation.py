@@ -0,0 +1,291 @@
+"""
+Generación automática de rutas y tareas a partir de incidencias validadas.
+
+Por cada zona activa:
+1. Selecciona las incidencias válidas dentro del polígono de la zona
+   (ST_Within(location, zone_polygon), equivalente a ST_Contains de la zona).
+2. Agrupa las cercanas en una sola parada (clustering por grilla).
+3. Reparte las paradas en rutas de hasta AUTO_ROUTE_MAX_STOPS y ordena cada
+   una con OSRM /trip partiendo de un punto interior de la zona.
+4. Escribe en bloque Route + RouteWaypoint + RouteLeg + Task + TaskCheckpoint,
+   marca las incidencias como convertidas en tarea y deja los eventos de
+   cambio de estado en el outbox, todo en una transacción.
+"""
+
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+import numpy as np
+from django.conf import settings
+from django.contrib.gis.geos import Point
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.incidents.incident_events_service import IncidentEventService
+from apps.incidents.models import Incident, IncidentStatus, OutboxEvent
+from apps.routes.bulk import create_routes_bulk, visit_order
+from apps.routes.clustering import cluster_points, sweep_partition
+from apps.routes.models import CleaningZone, RouteWaypoint
+from apps.routes.osrm_service import OSRMService, osrm_service
+from apps.routes.tiles import invalidate_layer
+from .models import Task, TaskAssignmentHistory, TaskCheckpoint
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationConflict(Exception):
+    """Otra ejecución convirtió alguna de las incidencias mientras se calculaban las rutas"""
+
+
+def _stops_from_incidents(incidents: List[Incident], radius: float, service_minutes: int) -> List[Dict]:
+    """Agrupa incidencias cercanas; cada grupo es una parada en su centroide"""
+    coordinates = [(i.location.x, i.location.y) for i in incidents]
+    labels = cluster_points(coordinates, radius)
+    coords = np.asarray(coordinates, dtype=np.float64)
+    stops = []
+    for label in range(int(labels.max()) + 1 if len(labels) else 0):
+        members = np.flatnonzero(labels == label)
+        lon, lat = coords[members].mean(axis=0)
+        group = [incidents[m] for m in members.tolist()]
+        stops.append({
+            'lon': float(lon),
+            'lat': float(lat),
+            'incidents': group,
+            'service_minutes': service_minutes * len(group),
+            'address': next((i.address for i in group if i.address), None),
+        })
+    return stops
+
+
+def _route_entry(zone: CleaningZone, depot: Point, stops: List[Dict], index: int, osrm: OSRMService) -> Dict:
+    """Ordena las paradas con OSRM y arma la entrada para create_routes_bulk"""
+    coordinates = [(depot.x, depot.y)] + [(s['lon'], s['lat']) for s in stops]
+    osrm_result = osrm.optimize_route(
+        coordinates,
+        roundtrip=True,
+        source='first',
+        destination='any',
+        geometries='polyline6',
+        annotations=True
+    )
+    if not osrm_result.get('success'):
+        raise RuntimeError(osrm_result.get('error', 'Error al optimizar ruta'))
+    if osrm_result.get('approximate'):
+        # No persistir rutas en línea recta: la próxima ejecución las generará con OSRM
+        raise RuntimeError('OSRM no disponible (circuito abierto)')
+
+    details = [{'type': 'start', 'service_minutes': 0, 'notes': 'Punto de salida'}]
+    for stop in stops:
+        details.append({
+            'type': 'collection',
+            'service_minutes': stop['service_minutes'],
+            'address': stop['address'],
+            'notes': f"Incidencias: {', '.join(str(i.id) for i in stop['incidents'])}",
+        })
+
+    return {
+        'data': {
+            'route_name': f"Auto {zone.zone_name} {timezone.localdate():%Y-%m-%d} #{index + 1}",
+            'zone_id': zone.pk,
+            'waypoints': [{'lon': lon, 'lat': lat} for lon, lat in coordinates],
+            'waypoint_details': details,
+        },
+        'osrm_result': osrm_result,
+        'optimize': True,
+        'stops': stops,
+    }
+
+
+def _write_zone_routes(zone: CleaningZone, depot: Point, entries: List[Dict]) -> Dict:
+    """Escribe rutas, tareas, checkpoints, estados de incidencias y outbox en una transacción"""
+    incidents = [i for e in entries for s in e['stops'] for i in s['incidents']]
+    today = timezone.localdate()
+
+    with transaction.atomic():
+        # Control optimista: solo convertir incidencias que siguen válidas
+        updated = Incident.objects.filter(
+            id__in=[i.id for i in incidents],
+            status=IncidentStatus.VALIDO
+        ).update(status=IncidentStatus.CONVERTIDO_TAREA, zone=zone, updated_at=timezone.now())
+        if updated != len(incidents):
+            raise GenerationConflict(f"{len(incidents) - updated} incidencias ya no están válidas")
+        # QuerySet.update no emite post_save (la capa 'routes' la invalida create_routes_bulk)
+        transaction.on_commit(lambda: invalidate_layer('incidents'))
+
+        routes = create_routes_bulk(entries)
+        stop_ids = {
+            (route_id, order): pk
+            for pk, route_id, order in RouteWaypoint.objects
+            .filter(route__in=routes)
+            .values_list('id', 'route_id', 'waypoint_order')
+        }
+
+        tasks = []
+        checkpoints = []
+        for route, entry in zip(routes, entries):
+            osrm_result = entry['osrm_result']
+            details = entry['data']['waypoint_details']
+            service = sum(d['service_minutes'] for d in details)
+            task = Task(
+                task_id=f"AUTO-{uuid.uuid4().hex[:12].upper()}",
+                title=f"Recolección {route.route_name}",
+                description=f"Generada automáticamente a partir de {sum(len(s['incidents']) for s in entry['stops'])} incidencias",
+                route=route,
+                status='pending',
+                priority=min(max(zone.priority, 1), 5),
+                location=Point(depot.x, depot.y, srid=4326),
+                zone=zone,
+                scheduled_date=today,
+                estimated_duration=int(osrm_result['duration_minutes']) + service,
+                checkpoints_total=len(details),
+            )
+            tasks.append(task)
+
+            # Cada checkpoint queda enlazado a su parada (ver apps/tasks/eta.py)
+            order = visit_order(osrm_result, len(details))
+            waypoints = entry['data']['waypoints']
+            for i, detail in enumerate(details):
+                checkpoints.append(TaskCheckpoint(
+                    task=task,
+                    checkpoint_order=order[i] + 1,
+                    route_waypoint_id=stop_ids.get((route.pk, order[i])),
+                    name='Salida' if i == 0 else f"Parada {order[i]}",
+                    description=detail.get('notes') or '',
+                    location=Point(waypoints[i]['lon'], waypoints[i]['lat'], srid=4326),
+                    address=detail.get('address') or '',
+                    verification_data={
+                        'incident_ids': [str(x.id) for x in entry['stops'][i - 1]['incidents']]
+                    } if i else {},
+                ))
+
+        Task.objects.bulk_create(tasks)
+        TaskCheckpoint.objects.bulk_create(checkpoints, batch_size=1000)
+        TaskAssignmentHistory.objects.bulk_create([
+            TaskAssignmentHistory(
+                task=task,
+                action='created',
+                new_status=task.status,
+                notes='Generada automáticamente desde incidencias validadas'
+            )
+            for task in tasks
+        ])
+
+        events = []
+        now = timezone.now()
+        for incident in incidents:
+            old_status = incident.status
+            incident.status = IncidentStatus.CONVERTIDO_TAREA
+            event_id = uuid.uuid4()
+            payload = incident.to_event_payload()
+            payload.update({
+                'event_id': str(event_id),
+                'event_type': 'estado_actualizado',
+                'old_status': old_status,
+                'new_status': incident.status,
+                'event_timestamp': now.isoformat().replace('+00:00', 'Z'),
+            })
+            events.append(OutboxEvent(
+                id=event_id,
+                aggregate_type='incident',
+                aggregate_id=incident.id,
+                event_type='estado_actualizado',
+                payload=payload,
+                routing_key=IncidentEventService.ROUTING_KEY_STATUS_UPDATED
+            ))
+        OutboxEvent.objects.bulk_create(events, batch_size=500)
+
+    return {'routes': len(routes), 'tasks': len(tasks), 'checkpoints': len(checkpoints)}
+
+
+def generate_zone_routes(zone: CleaningZone, osrm: Optional[OSRMService] = None) -> Dict:
+    """
+    Genera rutas y tareas para las incidencias válidas de una zona.
+
+    Returns:
+        Métricas de la zona (conteos y tiempos por etapa en segundos)
+    """
+    osrm = osrm or osrm_service
+    radius = getattr(settings, 'AUTO_ROUTE_CLUSTER_METERS', 40)
+    max_stops = getattr(settings, 'AUTO_ROUTE_MAX_STOPS', 25)
+    service_minutes = getattr(settings, 'AUTO_ROUTE_SERVICE_MINUTES', 5)
+    max_incidents = getattr(settings, 'AUTO_ROUTE_MAX_INCIDENTS', 2000)
+
+    metrics = {
+        'zone_id': str(zone.pk),
+        'zone_name': zone.zone_name,
+        'incidents': 0,
+        'stops': 0,
+        'routes': 0,
+        'tasks': 0,
+        'timings': {},
+        'error': None,
+    }
+    started = time.perf_counter()
+    mark = started
+
+    def _lap(name):
+        nonlocal mark
+        now = time.perf_counter()
+        metrics['timings'][name] = round(now - mark, 3)
+        mark = now
+
+    try:
+        incidents = list(
+            Incident.objects.filter(
+                status=IncidentStatus.VALIDO,
+                location__within=zone.zone_polygon
+            ).order_by('created_at')[:max_incidents]
+        )
+        metrics['incidents'] = len(incidents)
+        _lap('query')
+        if not incidents:
+            return metrics
+
+        stops = _stops_from_incidents(incidents, radius, service_minutes)
+        depot = zone.zone_polygon.point_on_surface
+        groups = sweep_partition([(s['lon'], s['lat']) for s in stops], (depot.x, depot.y), max_stops)
+        metrics['stops'] = len(stops)
+        _lap('cluster')
+
+        entries = [
+            _route_entry(zone, depot, [stops[i] for i in group], k, osrm)
+            for k, group in enumerate(groups)
+        ]
+        _lap('routing')
+
+        metrics.update(_write_zone_routes(zone, depot, entries))
+        _lap('write')
+
+    except Exception as e:
+        metrics['error'] = str(e)
+        logger.error(f"❌ Error generando rutas para zona {zone.zone_name}: {e}")
+
+    finally:
+        metrics['timings']['total'] = round(time.perf_counter() - started, 3)
+
+    logger.info(
+        f"🗺️ Zona {zone.zone_name}: {metrics['incidents']} incidencias, {metrics['stops']} paradas, "
+        f"{metrics['routes']} rutas en {metrics['timings']['total']}s {metrics['timings']}"
+    )
+    return metrics
+
+
+def generate_zone_routes_by_id(zone_id) -> Dict:
+    """Variante por id para workers (Celery o threads), cerrando su conexión al terminar"""
+    try:
+        zone = CleaningZone.objects.get(pk=zone_id)
+        return generate_zone_routes(zone)
+    finally:
+        connection.close()
+
+
+def generate_all_zones(max_workers: Optional[int] = None) -> List[Dict]:
+    """Genera rutas para todas las zonas activas en paralelo (threads)"""
+    max_workers = max_workers or getattr(settings, 'AUTO_ROUTE_WORKERS', 4)
+    zone_ids = list(CleaningZone.objects.filter(status='active').values_list('pk', flat=True))
+    if not zone_ids:
+        return []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(zone_ids))) as pool:
+        return list(pool.map(generate_zone_routes_by_id, zone_ids))
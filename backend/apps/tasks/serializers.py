@@ -18,7 +18,7 @@ class TaskCheckpointSerializer(serializers.ModelSerializer):
     class Meta:
         model = TaskCheckpoint
         fields = [
-            'id', 'task', 'checkpoint_order', 'name', 'description',
+            'id', 'task', 'checkpoint_order', 'route_waypoint', 'name', 'description',
             'location', 'location_lat', 'location_lon', 'address',
             'is_completed', 'completed_at', 'completed_by', 'completed_by_name',
             'requires_photo', 'photo_url', 'notes', 'verification_data',
@@ -90,9 +90,9 @@ class TaskListSerializer(serializers.ModelSerializer):
             'id', 'task_id', 'titulo', 'descripcion', 'estado', 'prioridad',
             'status_display', 'priority_display', 'assigned_to', 'assigned_to_name',
             'asignado_a', 'ruta', 'fecha_limite', 'progreso', 'title', 'status', 'priority',
-            'created_at', 'updated_at'
+            'zone', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'task_id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'task_id', 'zone', 'created_at', 'updated_at']
 
     def get_asignado_a(self, obj):
         if obj.assigned_to:
@@ -155,11 +155,12 @@ class TaskSerializer(GeoFeatureModelSerializer):
             'assigned_to', 'assigned_to_name', 'asignado_a', 'created_by', 'created_by_name',
             'status', 'status_display', 'estado',
             'priority', 'priority_display', 'prioridad', 'tipo',
-            'location', 'location_lat', 'location_lon', 'address',
+            'location', 'location_lat', 'location_lon', 'address', 'zone',
             'scheduled_date', 'scheduled_start_time', 'scheduled_end_time', 'fecha_limite',
             'estimated_duration', 'started_at', 'completed_at', 'paused_at',
-            'team_size', 'equipment_needed', 'materials_needed',
+            'vehicle_id', 'team_size', 'equipment_needed', 'materials_needed',
             'completion_percentage', 'progreso', 'checkpoints_completed', 'checkpoints_total',
+            'eta_remaining_seconds', 'eta_updated_at',
             'result_notes', 'result_photos', 'waste_collected_kg',
             'created_at', 'updated_at', 'cancelled_reason',
             'checkpoints'
@@ -167,7 +168,7 @@ class TaskSerializer(GeoFeatureModelSerializer):
         read_only_fields = [
             'id', 'created_at', 'updated_at', 'started_at', 'completed_at',
             'paused_at', 'completion_percentage', 'checkpoints_completed',
-            'checkpoints_total'
+            'checkpoints_total', 'eta_remaining_seconds', 'eta_updated_at', 'zone'
         ]
 
     def get_location_lat(self, obj):
@@ -221,7 +222,7 @@ class TaskCreateSerializer(serializers.ModelSerializer):
             'status', 'priority',
             'location_lat', 'location_lon', 'address',
             'scheduled_date', 'scheduled_start_time', 'scheduled_end_time',
-            'estimated_duration', 'team_size',
+            'estimated_duration', 'vehicle_id', 'team_size',
             'equipment_needed', 'materials_needed'
         ]
 
@@ -253,7 +254,7 @@ class TaskUpdateSerializer(serializers.ModelSerializer):
             'title', 'description', 'assigned_to', 'status', 'priority',
             'location_lat', 'location_lon', 'address',
             'scheduled_date', 'scheduled_start_time', 'scheduled_end_time',
-            'estimated_duration', 'team_size',
+            'estimated_duration', 'vehicle_id', 'team_size',
             'equipment_needed', 'materials_needed',
             'result_notes', 'result_photos', 'waste_collected_kg',
             'cancelled_reason'
@@ -0,0 +1,31 @@
+"""
+Tareas Celery de la app de tareas (programadas en CELERY_BEAT_SCHEDULE).
+"""
+
+from celery import group, shared_task
+
+from .eta import refresh_in_progress_etas
+
+
+@shared_task(ignore_result=True)
+def refresh_task_etas():
+    """Recalcula y publica la ETA de las tareas en curso"""
+    return refresh_in_progress_etas()
+
+
+@shared_task
+def generate_routes_for_zone(zone_id):
+    """Genera rutas y tareas desde las incidencias válidas de una zona"""
+    from apps.routes.models import CleaningZone
+    from .route_generation import generate_zone_routes
+
+    return generate_zone_routes(CleaningZone.objects.get(pk=zone_id))
+
+
+@shared_task(ignore_result=True)
+def generate_routes_for_active_zones():
+    """Reparte la generación de rutas de cada zona activa entre los workers"""
+    from apps.routes.models import CleaningZone
+
+    zone_ids = CleaningZone.objects.filter(status='active').values_list('pk', flat=True)
+    group(generate_routes_for_zone.s(str(zone_id)) for zone_id in zone_ids).apply_async()
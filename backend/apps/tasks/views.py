@@ -5,8 +5,10 @@ from django.db.models import Q, Count, Avg, Sum
 from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
+import logging
 
 from .models import Task, TaskCheckpoint, TaskAssignmentHistory
+from .eta import compute_task_eta, update_task_eta
 from .serializers import (
     TaskSerializer, TaskCreateSerializer, TaskUpdateSerializer,
     TaskCheckpointSerializer, TaskAssignmentHistorySerializer,
@@ -15,6 +17,16 @@ from .serializers import (
     TaskListSerializer
 )
 
+logger = logging.getLogger(__name__)
+
+
+def _refresh_eta(task):
+    """Recalcula y publica la ETA sin interrumpir la acción que la disparó"""
+    try:
+        update_task_eta(task)
+    except Exception as e:
+        logger.error(f"Error al recalcular ETA de {task.task_id}: {e}")
+
 
 class TaskViewSet(viewsets.ModelViewSet):
     """
@@ -35,13 +47,14 @@ class TaskViewSet(viewsets.ModelViewSet):
     - POST /api/tasks/{id}/complete/ - Completar tarea
     - POST /api/tasks/{id}/cancel/ - Cancelar tarea
     - GET /api/tasks/statistics/ - Obtener estadísticas de tareas
+    - GET /api/tasks/{id}/eta/ - Tiempo restante estimado de la tarea
     """
     queryset = Task.objects.select_related(
         'route', 'incident', 'assigned_to', 'created_by'
     ).prefetch_related('checkpoints', 'history')
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-    filterset_fields = ['status', 'priority', 'assigned_to', 'scheduled_date']
+    filterset_fields = ['status', 'priority', 'assigned_to', 'scheduled_date', 'zone']
     search_fields = ['task_id', 'title', 'description', 'address']
     ordering_fields = ['created_at', 'scheduled_date', 'priority', 'status']
     ordering = ['-priority', 'scheduled_date']
@@ -133,12 +146,27 @@ class TaskViewSet(viewsets.ModelViewSet):
             previous_status=previous_status,
             new_status='in_progress'
         )
+        _refresh_eta(task)
 
         return Response({
             'message': 'Tarea iniciada',
             'task': TaskSerializer(task).data
         })
 
+    @action(detail=True, methods=['get'])
+    def eta(self, request, pk=None):
+        """
+        Tiempo restante estimado de la tarea.
+        ?lat=&lon= usa esa posición en lugar de la del seguimiento en vivo.
+        """
+        task = self.get_object()
+        position = None
+        try:
+            position = (float(request.query_params['lon']), float(request.query_params['lat']))
+        except (KeyError, ValueError):
+            pass
+        return Response(compute_task_eta(task, position=position))
+
     @action(detail=True, methods=['post'])
     def pause(self, request, pk=None):
         """Pausar una tarea en progreso."""
@@ -339,6 +367,7 @@ class TaskCheckpointViewSet(viewsets.ModelViewSet):
         checkpoint.notes = serializer.validated_data.get('notes', '')
         checkpoint.verification_data = serializer.validated_data.get('verification_data', {})
         checkpoint.mark_completed(request.user)
+        _refresh_eta(checkpoint.task)
 
         return Response({
             'message': 'Checkpoint completado',
@@ -0,0 +1,11 @@
+from django.contrib import admin
+from .models import MatchedTrace
+
+
+@admin.register(MatchedTrace)
+class MatchedTraceAdmin(admin.ModelAdmin):
+    """Admin de solo lectura para trazas ajustadas"""
+    list_display = ['vehicle_id', 'started_at', 'ended_at', 'point_count', 'confidence', 'distance_meters']
+    list_filter = ['started_at']
+    search_fields = ['vehicle_id']
+    readonly_fields = [f.name for f in MatchedTrace._meta.fields]
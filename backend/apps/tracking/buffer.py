@@ -0,0 +1,197 @@
+"""
+Ring buffer de fixes GPS por vehículo.
+
+Cada vehículo tiene una lista en Redis con sus últimos TRACKING_BUFFER_SIZE
+fixes, empaquetados en 24 bytes (timestamp, lon, lat, precisión). RPUSH +
+LTRIM en un pipeline mantienen el tamaño acotado sin leer la lista. Los
+vehículos con datos nuevos se registran en un set para que el proceso de
+map-matching no tenga que recorrer claves.
+
+Sin Redis (desarrollo/tests) se usa un buffer en memoria del proceso.
+"""
+
+import logging
+import struct
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+FIX_FORMAT = struct.Struct('<Iddf')
+FIX_DTYPE = np.dtype([('ts', '<u4'), ('lon', '<f8'), ('lat', '<f8'), ('accuracy', '<f4')])
+
+KEY_PREFIX = 'tracking:v1'
+
+
+class FixBuffer:
+    """Ring buffer de fixes GPS por vehículo (Redis o memoria local)"""
+
+    def __init__(self, redis_client=None, size: int = 600, idle_seconds: int = 900):
+        """
+        Args:
+            redis_client: Cliente redis.Redis (None = memoria local)
+            size: Máximo de fixes retenidos por vehículo
+            idle_seconds: TTL de las claves de un vehículo sin datos nuevos
+        """
+        self.redis = redis_client
+        self.size = size
+        self.idle_seconds = idle_seconds
+        self._local: Dict[str, deque] = {}
+        self._local_cursors: Dict[str, int] = {}
+        self._local_active = set()
+        self._local_locks = set()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls) -> 'FixBuffer':
+        """Construye el buffer a partir de la configuración de Django"""
+        redis_client = None
+        redis_url = getattr(settings, 'TRACKING_REDIS_URL', None)
+        if redis_url:
+            try:
+                import redis
+                redis_client = redis.Redis.from_url(
+                    redis_url,
+                    socket_connect_timeout=0.5,
+                    socket_timeout=2
+                )
+            except ImportError:
+                logger.warning("redis no instalado, buffer de seguimiento solo en memoria local")
+        return cls(
+            redis_client=redis_client,
+            size=getattr(settings, 'TRACKING_BUFFER_SIZE', 600),
+            idle_seconds=getattr(settings, 'TRACKING_IDLE_SECONDS', 900)
+        )
+
+    # ========== CLAVES ==========
+
+    @staticmethod
+    def _fixes_key(vehicle_id: str) -> str:
+        return f"{KEY_PREFIX}:fixes:{vehicle_id}"
+
+    @staticmethod
+    def _cursor_key(vehicle_id: str) -> str:
+        return f"{KEY_PREFIX}:cursor:{vehicle_id}"
+
+    @staticmethod
+    def _lock_key(vehicle_id: str) -> str:
+        return f"{KEY_PREFIX}:lock:{vehicle_id}"
+
+    ACTIVE_KEY = f"{KEY_PREFIX}:active"
+
+    # ========== ESCRITURA ==========
+
+    @staticmethod
+    def pack(fixes: Iterable[Dict], default_accuracy: float = 0) -> List[bytes]:
+        """Empaqueta fixes {'timestamp', 'lon', 'lat', 'accuracy'} en 24 bytes c/u"""
+        return [
+            FIX_FORMAT.pack(
+                int(fix['timestamp']),
+                float(fix['lon']),
+                float(fix['lat']),
+                float(fix.get('accuracy') or default_accuracy)
+            )
+            for fix in fixes
+        ]
+
+    def push(self, vehicle_id: str, fixes: Iterable[Dict]) -> int:
+        """
+        Agrega fixes al buffer del vehículo.
+
+        Returns:
+            Número de fixes agregados
+        """
+        packed = self.pack(fixes)
+        if not packed:
+            return 0
+
+        if self.redis is None:
+            with self._lock:
+                buffer = self._local.get(vehicle_id)
+                if buffer is None:
+                    buffer = self._local[vehicle_id] = deque(maxlen=self.size)
+                buffer.extend(packed)
+                self._local_active.add(vehicle_id)
+            return len(packed)
+
+        key = self._fixes_key(vehicle_id)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.rpush(key, *packed)
+        pipe.ltrim(key, -self.size, -1)
+        pipe.expire(key, self.idle_seconds)
+        pipe.sadd(self.ACTIVE_KEY, vehicle_id)
+        pipe.execute()
+        return len(packed)
+
+    # ========== LECTURA ==========
+
+    def read(self, vehicle_id: str) -> np.ndarray:
+        """Fixes del vehículo como array estructurado (ts, lon, lat, accuracy)"""
+        if self.redis is None:
+            with self._lock:
+                raw = list(self._local.get(vehicle_id, ()))
+        else:
+            raw = self.redis.lrange(self._fixes_key(vehicle_id), 0, -1)
+        return np.frombuffer(b''.join(raw), dtype=FIX_DTYPE)
+
+    def active_vehicles(self) -> List[str]:
+        """Vehículos con fixes recibidos desde su última desactivación"""
+        if self.redis is None:
+            with self._lock:
+                return sorted(self._local_active)
+        return sorted(v.decode('utf-8') for v in self.redis.smembers(self.ACTIVE_KEY))
+
+    def deactivate(self, vehicle_id: str):
+        """Quita el vehículo del set de activos (vuelve a entrar con el próximo push)"""
+        if self.redis is None:
+            with self._lock:
+                self._local_active.discard(vehicle_id)
+            return
+        self.redis.srem(self.ACTIVE_KEY, vehicle_id)
+
+    # ========== CURSOR DE MAP-MATCHING ==========
+
+    def get_cursor(self, vehicle_id: str) -> int:
+        """Timestamp del último fix ya ajustado (0 si ninguno)"""
+        if self.redis is None:
+            return self._local_cursors.get(vehicle_id, 0)
+        value = self.redis.get(self._cursor_key(vehicle_id))
+        return int(value) if value else 0
+
+    def set_cursor(self, vehicle_id: str, timestamp: int):
+        if self.redis is None:
+            self._local_cursors[vehicle_id] = int(timestamp)
+            return
+        self.redis.setex(self._cursor_key(vehicle_id), self.idle_seconds * 2, int(timestamp))
+
+    def acquire(self, vehicle_id: str, ttl: int = 120) -> bool:
+        """Lock por vehículo para que dos workers no ajusten la misma traza"""
+        if self.redis is None:
+            with self._lock:
+                if vehicle_id in self._local_locks:
+                    return False
+                self._local_locks.add(vehicle_id)
+                return True
+        return bool(self.redis.set(self._lock_key(vehicle_id), 1, nx=True, ex=ttl))
+
+    def release(self, vehicle_id: str):
+        if self.redis is None:
+            with self._lock:
+                self._local_locks.discard(vehicle_id)
+            return
+        self.redis.delete(self._lock_key(vehicle_id))
+
+
+_fix_buffer: Optional[FixBuffer] = None
+
+
+def get_fix_buffer() -> FixBuffer:
+    """Buffer compartido del proceso"""
+    global _fix_buffer
+    if _fix_buffer is None:
+        _fix_buffer = FixBuffer.from_settings()
+    return _fix_buffer
@@ -0,0 +1,71 @@
+import json
+import logging
+from asgiref.sync import sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
+
+from .serializers import IngestFixesRequestSerializer
+from .views import can_track_vehicle, ingest_fixes
+
+logger = logging.getLogger(__name__)
+
+
+def _validate_and_ingest(payload):
+    serializer = IngestFixesRequestSerializer(data=payload)
+    if not serializer.is_valid():
+        return None, serializer.errors
+    return ingest_fixes(serializer.validated_data), None
+
+
+class TrackingConsumer(AsyncWebsocketConsumer):
+    """
+    WebSocket para que los dispositivos de los vehículos envíen fixes GPS.
+
+    El dispositivo mantiene una conexión abierta y envía lotes:
+        {"type": "fixes", "fixes": [{"lat": ..., "lon": ..., "timestamp": ..., "accuracy": ...}]}
+    y recibe {"type": "ack", "accepted": n} por cada lote.
+    """
+
+    async def connect(self):
+        """Maneja la conexión del WebSocket."""
+        self.user = self.scope['user']
+
+        if self.user.is_anonymous:
+            await self.close()
+            return
+
+        self.vehicle_id = self.scope['url_route']['kwargs']['vehicle_id']
+        if not await sync_to_async(can_track_vehicle)(self.user, self.vehicle_id):
+            logger.warning(f"🚫 {self.user} no puede reportar el vehículo {self.vehicle_id}")
+            await self.close()
+            return
+        await self.accept()
+        logger.info(f"🛰️ Dispositivo conectado: {self.vehicle_id} ({self.user.username})")
+
+    async def disconnect(self, close_code):
+        """Maneja la desconexión del WebSocket."""
+        if hasattr(self, 'vehicle_id'):
+            logger.info(f"🛰️ Dispositivo desconectado: {self.vehicle_id}")
+
+    async def receive(self, text_data):
+        """Recibe lotes de fixes y los encola en el buffer del vehículo."""
+        try:
+            data = json.loads(text_data)
+            message_type = data.get('type')
+
+            if message_type == 'fixes':
+                accepted, errors = await sync_to_async(_validate_and_ingest, thread_sensitive=False)({
+                    'vehicle_id': self.vehicle_id,
+                    'fixes': data.get('fixes', [])
+                })
+                if errors:
+                    await self.send(text_data=json.dumps({'type': 'error', 'errors': errors}))
+                else:
+                    await self.send(text_data=json.dumps({'type': 'ack', 'accepted': accepted}))
+
+            elif message_type == 'ping':
+                await self.send(text_data=json.dumps({'type': 'pong'}))
+
+        except json.JSONDecodeError:
+            logger.error("Error al decodificar mensaje JSON")
+        except Exception as e:
+            logger.error(f"Error en receive de seguimiento: {str(e)}")
@@ -0,0 +1,118 @@
+"""
+Generador de carga para la ingesta de seguimiento: simula N dispositivos
+enviando lotes de fixes GPS y mide el throughput.
+
+Uso:
+    python manage.py simulate_tracking_devices --devices 500 --batches 30
+    python manage.py simulate_tracking_devices --local --match
+    python manage.py simulate_tracking_devices --url http://localhost:8000 --token <JWT>
+
+Sin --url los lotes entran por el mismo código que el endpoint (buffer en
+Redis, o en memoria con --local). Con --match se ejecuta además un ciclo de
+map-matching contra OSRM, que guarda las trazas resultantes.
+"""
+
+import math
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from apps.tracking.buffer import FixBuffer
+from apps.tracking.matching import match_active_vehicles
+
+
+# Centro de Latacunga
+CENTER_LAT = -0.9363
+CENTER_LON = -78.6166
+METERS_PER_DEGREE = 111320
+
+
+class Command(BaseCommand):
+    help = 'Simula dispositivos GPS enviando fixes y mide el throughput de ingesta'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--devices', type=int, default=200)
+        parser.add_argument('--batches', type=int, default=20, help='Lotes por dispositivo')
+        parser.add_argument('--batch-size', type=int, default=10, help='Fixes por lote')
+        parser.add_argument('--interval', type=int, default=2, help='Segundos entre fixes simulados')
+        parser.add_argument('--workers', type=int, default=16)
+        parser.add_argument('--url', help='Base URL del backend (envía por HTTP)')
+        parser.add_argument('--token', help='JWT para --url')
+        parser.add_argument('--local', action='store_true', help='Buffer en memoria en lugar de Redis')
+        parser.add_argument('--match', action='store_true', help='Ejecutar un ciclo de map-matching al final')
+
+    def _device_batches(self, device: int, options):
+        """Recorrido aleatorio (rumbo y velocidad suaves) de un dispositivo"""
+        rng = random.Random(device)
+        lat = CENTER_LAT + rng.uniform(-0.02, 0.02)
+        lon = CENTER_LON + rng.uniform(-0.02, 0.02)
+        heading = rng.uniform(0, 2 * math.pi)
+        timestamp = int(time.time()) - options['batches'] * options['batch_size'] * options['interval']
+        vehicle_id = f"sim-{device:05d}"
+
+        for _ in range(options['batches']):
+            fixes = []
+            for _ in range(options['batch_size']):
+                heading += rng.gauss(0, 0.3)
+                step = rng.uniform(3, 12) * options['interval'] / METERS_PER_DEGREE
+                lat += step * math.cos(heading)
+                lon += step * math.sin(heading)
+                timestamp += options['interval']
+                fixes.append({
+                    'lat': round(lat + rng.gauss(0, 0.00003), 6),
+                    'lon': round(lon + rng.gauss(0, 0.00003), 6),
+                    'timestamp': timestamp,
+                    'accuracy': round(rng.uniform(4, 20), 1)
+                })
+            yield {'vehicle_id': vehicle_id, 'fixes': fixes}
+
+    def handle(self, *args, **options):
+        buffer = FixBuffer(size=10 ** 6) if options['local'] else FixBuffer.from_settings()
+        batches = [
+            batch
+            for device in range(options['devices'])
+            for batch in self._device_batches(device, options)
+        ]
+        total_fixes = sum(len(b['fixes']) for b in batches)
+
+        if options['url']:
+            import requests
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_maxsize=options['workers'])
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            if options['token']:
+                session.headers['Authorization'] = f"Bearer {options['token']}"
+            endpoint = f"{options['url'].rstrip('/')}/api/tracking/fixes/"
+
+            def send(batch):
+                return session.post(endpoint, json=batch, timeout=10).status_code == 202
+        else:
+            def send(batch):
+                return buffer.push(batch['vehicle_id'], batch['fixes']) > 0
+
+        self.stdout.write(self.style.SUCCESS(
+            f"🛰️  Simulando {options['devices']} dispositivos: {len(batches)} lotes, {total_fixes} fixes"
+        ))
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            results = list(pool.map(send, batches))
+        elapsed = time.perf_counter() - started
+
+        failed = results.count(False)
+        self.stdout.write(
+            f"Ingesta: {elapsed:.2f}s, {total_fixes / elapsed:,.0f} fixes/s, "
+            f"{len(batches) / elapsed:,.0f} lotes/s, {failed} lotes fallidos"
+        )
+
+        if options['match']:
+            if options['url']:
+                self.stdout.write(self.style.WARNING('--match usa el buffer local/Redis, no el servidor remoto'))
+            stats = match_active_vehicles(buffer=buffer)
+            rate = stats['fixes'] / stats['elapsed_seconds'] if stats['elapsed_seconds'] else 0
+            self.stdout.write(
+                f"Map-matching: {stats['vehicles']} vehículos, {stats['windows']} ventanas, "
+                f"{stats['traces']} trazas, {stats['errors']} errores, "
+                f"{stats['elapsed_seconds']:.2f}s ({rate:,.0f} fixes/s)"
+            )
@@ -0,0 +1,249 @@
+"""
+Map-matching periódico de los buffers de seguimiento.
+
+Cada ciclo toma, por vehículo activo, los fixes posteriores a su cursor (más
+TRACKING_MATCH_OVERLAP fixes ya ajustados como contexto), los divide en
+ventanas deslizantes de TRACKING_MATCH_WINDOW puntos que se solapan y llama a
+OSRM /match con timestamps y radios derivados de la precisión GPS. Cada
+matching devuelto se guarda como un MatchedTrace.
+
+Los fixes de contexto (anteriores al cursor) y los que una ventana comparte
+con la anterior solo sirven para ajustar los bordes: de cada ventana se
+guardan únicamente los tracepoints que ninguna ventana anterior guardó, así
+cada fix queda en una sola traza.
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone as dt_timezone
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from django.conf import settings
+
+from apps.routes import polyline
+from apps.routes.osrm_service import OSRMService, osrm_service
+from .buffer import FixBuffer, get_fix_buffer
+from .models import MatchedTrace
+
+logger = logging.getLogger(__name__)
+
+
+# Códigos OSRM que indican que la ventana no se puede ajustar (reintentar no sirve)
+UNMATCHABLE_CODES = {'NoMatch', 'NoSegment', 'TooBig', 'InvalidInput'}
+
+MAX_RADIUS = 100
+
+
+def sliding_windows(count: int, size: int, overlap: int) -> List[Tuple[int, int]]:
+    """
+    Ventanas [inicio, fin) de hasta size puntos que se solapan en overlap puntos.
+    La última ventana siempre tiene más de overlap puntos.
+    """
+    if count <= size:
+        return [(0, count)] if count else []
+    step = max(size - overlap, 1)
+    return [(start, min(start + size, count)) for start in range(0, count - overlap, step)]
+
+
+def _radiuses(accuracy: np.ndarray, default_radius: int) -> List[int]:
+    """Radio de búsqueda por fix: la precisión GPS reportada, acotada"""
+    return np.clip(np.ceil(accuracy), default_radius, MAX_RADIUS).astype(int).tolist()
+
+
+def _trim_geometry(encoded: str, location) -> str:
+    """Recorta la polyline6 desde el vértice más cercano a location (lon, lat)"""
+    line = polyline.decode(encoded)
+    if len(line) < 2 or not location:
+        return encoded
+    cut = int(np.argmin(((line - np.asarray(location, dtype=np.float64)) ** 2).sum(axis=1)))
+    return polyline.encode(line[cut:]) if cut < len(line) - 1 else encoded
+
+
+def _traces_from_result(
+    vehicle_id: str,
+    window: np.ndarray,
+    result: Dict,
+    keep_from: int = 0
+) -> List[MatchedTrace]:
+    """
+    Construye un MatchedTrace por cada matching de la respuesta OSRM.
+
+    Args:
+        keep_from: Primer índice de la ventana a guardar; los tracepoints
+            anteriores (contexto) se descartan junto con sus tramos
+    """
+    tracepoints = result.get('tracepoints', [])
+    indices: Dict[int, List[int]] = {}
+    for k, tracepoint in enumerate(tracepoints):
+        if tracepoint is not None:
+            indices.setdefault(tracepoint['matchings_index'], []).append(k)
+
+    traces = []
+    for i, matching in enumerate(result.get('matchings', [])):
+        idx = indices.get(i, [])
+        kept = [k for k in idx if k >= keep_from]
+        if len(kept) < 2:
+            continue
+        geometry = matching['geometry']
+        distance = matching.get('distance', 0)
+        duration = matching.get('duration', 0)
+        dropped = len(idx) - len(kept)
+        if dropped:
+            # Un leg por par de tracepoints consecutivos del matching
+            legs = matching.get('legs', [])[:dropped]
+            distance = max(distance - sum(leg.get('distance', 0) for leg in legs), 0)
+            duration = max(duration - sum(leg.get('duration', 0) for leg in legs), 0)
+            geometry = _trim_geometry(geometry, tracepoints[kept[0]].get('location'))
+
+        timestamps = window['ts'][kept].astype(np.int64)
+        started = int(timestamps[0])
+        traces.append(MatchedTrace(
+            vehicle_id=vehicle_id,
+            started_at=datetime.fromtimestamp(started, tz=dt_timezone.utc),
+            ended_at=datetime.fromtimestamp(int(timestamps[-1]), tz=dt_timezone.utc),
+            point_count=len(kept),
+            polyline6=geometry,
+            timestamps=MatchedTrace.pack_timestamps(timestamps, started),
+            confidence=matching.get('confidence'),
+            distance_meters=distance,
+            duration_seconds=duration
+        ))
+    return traces
+
+
+def match_vehicle(
+    vehicle_id: str,
+    buffer: FixBuffer,
+    osrm: OSRMService,
+    window: Optional[int] = None,
+    overlap: Optional[int] = None,
+    min_points: Optional[int] = None
+) -> Dict:
+    """
+    Ajusta los fixes pendientes de un vehículo.
+
+    No guarda nada ni mueve el cursor: el llamador persiste 'traces' y luego
+    fija el cursor en 'cursor', para no perder tramos si falla el INSERT.
+
+    Returns:
+        Dict con traces, cursor (None = sin cambios), fixes, windows, errors, idle
+    """
+    window = window or getattr(settings, 'TRACKING_MATCH_WINDOW', 100)
+    overlap = overlap if overlap is not None else getattr(settings, 'TRACKING_MATCH_OVERLAP', 10)
+    min_points = min_points or getattr(settings, 'TRACKING_MATCH_MIN_POINTS', 5)
+    default_radius = getattr(settings, 'TRACKING_DEFAULT_RADIUS', 15)
+    idle_seconds = getattr(settings, 'TRACKING_IDLE_SECONDS', 900)
+
+    outcome = {'traces': [], 'cursor': None, 'fixes': 0, 'windows': 0, 'errors': 0, 'idle': False}
+
+    fixes = buffer.read(vehicle_id)
+    if len(fixes):
+        # Los dispositivos pueden reenviar o desordenar fixes: ordenar y quitar duplicados
+        _, unique = np.unique(fixes['ts'], return_index=True)
+        fixes = fixes[unique]
+
+    cursor = buffer.get_cursor(vehicle_id)
+    first_new = int(np.searchsorted(fixes['ts'], cursor, side='right')) if len(fixes) else 0
+    pending = len(fixes) - first_new
+
+    if pending < min_points:
+        last_seen = int(fixes['ts'][-1]) if len(fixes) else 0
+        outcome['idle'] = time.time() - last_seen > idle_seconds
+        return outcome
+
+    context_start = max(first_new - overlap, 0)
+    segment = fixes[context_start:]
+    outcome['fixes'] = pending
+
+    # Índice (en segment) desde el que los fixes aún no están en ninguna traza
+    saved_until = first_new - context_start
+    for start, end in sliding_windows(len(segment), window, overlap):
+        chunk = segment[start:end]
+        result = osrm.match_route(
+            list(zip(chunk['lon'].tolist(), chunk['lat'].tolist())),
+            timestamps=chunk['ts'].astype(np.int64).tolist(),
+            radiuses=_radiuses(chunk['accuracy'], default_radius),
+            geometries='polyline6',
+            annotations=False
+        )
+        outcome['windows'] += 1
+
+        if result.get('success'):
+            outcome['traces'].extend(
+                _traces_from_result(vehicle_id, chunk, result, keep_from=max(saved_until - start, 0))
+            )
+        elif result.get('code') in UNMATCHABLE_CODES:
+            logger.warning(f"Ventana sin ajuste para {vehicle_id}: {result.get('error')}")
+            outcome['errors'] += 1
+        else:
+            # Error de red/OSRM: conservar el cursor y reintentar en el próximo ciclo
+            logger.error(f"Error de map-matching para {vehicle_id}: {result.get('error')}")
+            outcome['errors'] += 1
+            return outcome
+
+        outcome['cursor'] = int(chunk['ts'][-1])
+        saved_until = max(saved_until, end)
+
+    return outcome
+
+
+def match_active_vehicles(
+    buffer: Optional[FixBuffer] = None,
+    osrm: Optional[OSRMService] = None,
+    max_workers: Optional[int] = None
+) -> Dict:
+    """
+    Ciclo de map-matching sobre todos los vehículos activos.
+
+    Returns:
+        Estadísticas del ciclo
+    """
+    buffer = buffer or get_fix_buffer()
+    osrm = osrm or osrm_service
+    max_workers = max_workers or getattr(settings, 'TRACKING_MATCH_WORKERS', 4)
+    started = time.perf_counter()
+
+    vehicles = [v for v in buffer.active_vehicles() if buffer.acquire(v)]
+    stats = {
+        'vehicles': len(vehicles),
+        'matched_vehicles': 0,
+        'traces': 0,
+        'fixes': 0,
+        'windows': 0,
+        'errors': 0,
+    }
+
+    try:
+        outcomes = {}
+        if vehicles:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(vehicles))) as pool:
+                futures = {v: pool.submit(match_vehicle, v, buffer, osrm) for v in vehicles}
+                for vehicle_id, future in futures.items():
+                    try:
+                        outcomes[vehicle_id] = future.result()
+                    except Exception as e:
+                        logger.error(f"Error al ajustar traza de {vehicle_id}: {e}")
+                        stats['errors'] += 1
+
+        traces = [t for outcome in outcomes.values() for t in outcome['traces']]
+        MatchedTrace.objects.bulk_create(traces, batch_size=500)
+
+        for vehicle_id, outcome in outcomes.items():
+            if outcome['cursor'] is not None:
+                buffer.set_cursor(vehicle_id, outcome['cursor'])
+                stats['matched_vehicles'] += 1
+            if outcome['idle']:
+                buffer.deactivate(vehicle_id)
+            stats['fixes'] += outcome['fixes']
+            stats['windows'] += outcome['windows']
+            stats['errors'] += outcome['errors']
+        stats['traces'] = len(traces)
+    finally:
+        for vehicle_id in vehicles:
+            buffer.release(vehicle_id)
+
+    stats['elapsed_seconds'] = round(time.perf_counter() - started, 3)
+    if stats['traces'] or stats['errors']:
+        logger.info(f"🛰️ Map-matching: {stats}")
+    return stats
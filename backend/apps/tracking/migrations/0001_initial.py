@@ -0,0 +1,76 @@
+from django.db import migrations, models
+
+
+CREATE_SQL = """
+CREATE TABLE tracking_matched_traces (
+    id bigint GENERATED BY DEFAULT AS IDENTITY,
+    vehicle_id varchar(64) NOT NULL,
+    started_at timestamp with time zone NOT NULL,
+    ended_at timestamp with time zone NOT NULL,
+    point_count integer NOT NULL,
+    polyline6 text NOT NULL,
+    timestamps bytea NOT NULL,
+    confidence double precision NULL,
+    distance_meters double precision NOT NULL,
+    duration_seconds double precision NOT NULL,
+    created_at timestamp with time zone NOT NULL,
+    PRIMARY KEY (id, started_at)
+) PARTITION BY RANGE (started_at);
+
+CREATE TABLE tracking_matched_traces_default
+    PARTITION OF tracking_matched_traces DEFAULT;
+
+CREATE INDEX tracking_vehicle_started_idx
+    ON tracking_matched_traces (vehicle_id, started_at);
+"""
+
+DROP_SQL = "DROP TABLE IF EXISTS tracking_matched_traces CASCADE;"
+
+
+def create_initial_partitions(apps, schema_editor):
+    from apps.tracking.partitions import ensure_partitions
+    ensure_partitions()
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        # La tabla particionada no se puede expresar con CreateModel: se crea
+        # con SQL y se declara el modelo equivalente solo en el estado
+        migrations.RunSQL(
+            sql=CREATE_SQL,
+            reverse_sql=DROP_SQL,
+            state_operations=[
+                migrations.CreateModel(
+                    name='MatchedTrace',
+                    fields=[
+                        ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                        ('vehicle_id', models.CharField(max_length=64)),
+                        ('started_at', models.DateTimeField()),
+                        ('ended_at', models.DateTimeField()),
+                        ('point_count', models.IntegerField(help_text='Fixes GPS ajustados en el tramo')),
+                        ('polyline6', models.TextField(help_text='Geometría ajustada codificada como polyline6')),
+                        ('timestamps', models.BinaryField(help_text='Segundos desde started_at de cada fix (uint32)')),
+                        ('confidence', models.FloatField(blank=True, null=True)),
+                        ('distance_meters', models.FloatField(default=0)),
+                        ('duration_seconds', models.FloatField(default=0)),
+                        ('created_at', models.DateTimeField(auto_now_add=True)),
+                    ],
+                    options={
+                        'verbose_name': 'Traza ajustada',
+                        'verbose_name_plural': 'Trazas ajustadas',
+                        'db_table': 'tracking_matched_traces',
+                        'ordering': ['vehicle_id', 'started_at'],
+                        'indexes': [
+                            models.Index(fields=['vehicle_id', 'started_at'], name='tracking_vehicle_started_idx'),
+                        ],
+                    },
+                ),
+            ],
+        ),
+        migrations.RunPython(create_initial_partitions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+from django.db import models
+import numpy as np
+
+
+class MatchedTrace(models.Model):
+    """
+    Tramo de recorrido GPS ajustado a la red vial por OSRM /match.
+
+    La tabla está particionada por mes sobre started_at (ver partitions.py) y
+    guarda la geometría como polyline6 y los instantes como offsets uint32 en
+    segundos, para que millones de tramos ocupen poco y se puedan purgar
+    eliminando particiones completas.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    vehicle_id = models.CharField(max_length=64)
+    started_at = models.DateTimeField()
+    ended_at = models.DateTimeField()
+    point_count = models.IntegerField(help_text="Fixes GPS ajustados en el tramo")
+    polyline6 = models.TextField(help_text="Geometría ajustada codificada como polyline6")
+    timestamps = models.BinaryField(help_text="Segundos desde started_at de cada fix (uint32)")
+    confidence = models.FloatField(null=True, blank=True)
+    distance_meters = models.FloatField(default=0)
+    duration_seconds = models.FloatField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'tracking_matched_traces'
+        verbose_name = 'Traza ajustada'
+        verbose_name_plural = 'Trazas ajustadas'
+        ordering = ['vehicle_id', 'started_at']
+        indexes = [
+            models.Index(fields=['vehicle_id', 'started_at'], name='tracking_vehicle_started_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.vehicle_id} {self.started_at:%Y-%m-%d %H:%M} ({self.point_count} puntos)"
+
+    @staticmethod
+    def pack_timestamps(timestamps, started: int) -> bytes:
+        """Empaqueta timestamps Unix como offsets uint32 desde started"""
+        return (np.asarray(timestamps, dtype=np.int64) - started).astype('<u4').tobytes()
+
+    def unpack_timestamps(self) -> np.ndarray:
+        """Timestamps Unix de cada fix del tramo"""
+        offsets = np.frombuffer(bytes(self.timestamps), dtype='<u4').astype(np.int64)
+        return offsets + int(self.started_at.timestamp())
@@ -0,0 +1,84 @@
+"""
+Particiones mensuales de tracking_matched_traces.
+
+La tabla padre se crea con PARTITION BY RANGE (started_at) y una partición
+DEFAULT que recibe cualquier fila fuera de los meses creados, de modo que un
+INSERT nunca falla por falta de partición.
+"""
+
+import logging
+from datetime import date
+from typing import List
+from django.db import connection
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = 'tracking_matched_traces'
+
+
+def _month_start(year: int, month: int) -> date:
+    year += (month - 1) // 12
+    month = (month - 1) % 12 + 1
+    return date(year, month, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_{month:%Y_%m}"
+
+
+def create_partition_sql(month: date) -> str:
+    """DDL de la partición del mes (idempotente)"""
+    start = _month_start(month.year, month.month)
+    end = _month_start(month.year, month.month + 1)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(start)} "
+        f"PARTITION OF {PARENT_TABLE} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+
+
+def ensure_partitions(months_ahead: int = 2) -> List[str]:
+    """
+    Crea las particiones del mes actual y de los próximos meses.
+
+    Returns:
+        Nombres de las particiones verificadas
+    """
+    today = timezone.now().date()
+    names = []
+    with connection.cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            month = _month_start(today.year, today.month + offset)
+            try:
+                cursor.execute(create_partition_sql(month))
+                names.append(partition_name(month))
+            except Exception as e:
+                # Falla si la partición DEFAULT ya tiene filas de ese mes
+                logger.error(f"No se pudo crear la partición {partition_name(month)}: {e}")
+    return names
+
+
+def drop_partitions_before(month: date) -> List[str]:
+    """Elimina las particiones mensuales anteriores a month (retención)"""
+    cutoff = partition_name(_month_start(month.year, month.month))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON pg_inherits.inhparent = parent.oid
+            JOIN pg_class child ON pg_inherits.inhrelid = child.oid
+            WHERE parent.relname = %s
+            """,
+            [PARENT_TABLE]
+        )
+        names = [
+            name for (name,) in cursor.fetchall()
+            if name != f"{PARENT_TABLE}_default" and name < cutoff
+        ]
+        for name in names:
+            cursor.execute(f"DROP TABLE IF EXISTS {name}")
+    if names:
+        logger.info(f"🗑️ Particiones de trazas eliminadas: {', '.join(names)}")
+    return names
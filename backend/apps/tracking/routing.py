@@ -0,0 +1,6 @@
+from django.urls import path
+from .consumers import TrackingConsumer
+
+websocket_urlpatterns = [
+    path('ws/tracking/<str:vehicle_id>/', TrackingConsumer.as_asgi()),
+]
@@ -0,0 +1,47 @@
+from django.conf import settings
+from rest_framework import serializers
+from .models import MatchedTrace
+
+
+class GPSFixSerializer(serializers.Serializer):
+    """Fix GPS de un dispositivo"""
+
+    lat = serializers.FloatField(min_value=-90, max_value=90)
+    lon = serializers.FloatField(min_value=-180, max_value=180)
+    # El buffer empaqueta el timestamp como uint32 (FIX_FORMAT '<Iddf'): un valor en
+    # milisegundos no cabe y se rechaza aquí con 400 en lugar de fallar al guardarlo
+    timestamp = serializers.IntegerField(
+        min_value=0, max_value=2**32 - 1, help_text="Timestamp Unix en segundos (no milisegundos)"
+    )
+    accuracy = serializers.FloatField(required=False, min_value=0, help_text="Precisión en metros")
+
+
+class IngestFixesRequestSerializer(serializers.Serializer):
+    """Lote de fixes GPS de un vehículo"""
+
+    vehicle_id = serializers.CharField(max_length=64)
+    fixes = GPSFixSerializer(many=True)
+
+    def validate_fixes(self, value):
+        if not value:
+            raise serializers.ValidationError("Se requiere al menos un fix")
+        max_batch = getattr(settings, 'TRACKING_MAX_BATCH', 500)
+        if len(value) > max_batch:
+            raise serializers.ValidationError(f"Máximo {max_batch} fixes por lote")
+        return value
+
+
+class MatchedTraceSerializer(serializers.ModelSerializer):
+    """Traza ajustada (geometría en polyline6, instantes como timestamps Unix)"""
+
+    timestamps = serializers.SerializerMethodField()
+
+    class Meta:
+        model = MatchedTrace
+        fields = [
+            'id', 'vehicle_id', 'started_at', 'ended_at', 'point_count',
+            'polyline6', 'timestamps', 'confidence', 'distance_meters', 'duration_seconds'
+        ]
+
+    def get_timestamps(self, obj):
+        return obj.unpack_timestamps().tolist()
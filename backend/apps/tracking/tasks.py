@@ -0,0 +1,20 @@
+"""
+Tareas Celery del seguimiento de vehículos (programadas en CELERY_BEAT_SCHEDULE).
+"""
+
+from celery import shared_task
+
+from .matching import match_active_vehicles
+from .partitions import ensure_partitions
+
+
+@shared_task(ignore_result=True)
+def match_tracking_buffers():
+    """Ajusta a la red vial los fixes pendientes de todos los vehículos activos"""
+    return match_active_vehicles()
+
+
+@shared_task(ignore_result=True)
+def ensure_tracking_partitions():
+    """Crea por adelantado las particiones mensuales de trazas"""
+    return ensure_partitions()
@@ -0,0 +1,7 @@
+from rest_framework.routers import DefaultRouter
+from .views import TrackingViewSet
+
+router = DefaultRouter()
+router.register(r'tracking', TrackingViewSet, basename='tracking')
+
+urlpatterns = router.urls
@@ -0,0 +1,129 @@
+from django.utils.dateparse import parse_datetime
+from rest_framework import viewsets, status, permissions
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from apps.tasks.models import Task
+from .buffer import get_fix_buffer
+from .models import MatchedTrace
+from .serializers import IngestFixesRequestSerializer, MatchedTraceSerializer
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def can_track_vehicle(user, vehicle_id: str) -> bool:
+    """
+    Administradores: cualquier vehículo. El resto, solo los vehículos de sus
+    tareas asignadas que siguen abiertas (Task.vehicle_id).
+    """
+    if not user or not user.is_authenticated:
+        return False
+    if user.is_superuser or getattr(user, 'is_admin', False):
+        return True
+    return Task.objects.filter(
+        assigned_to=user,
+        vehicle_id=vehicle_id,
+        status__in=Task.TRACKING_STATUSES
+    ).exists()
+
+
+def _forbidden(vehicle_id: str) -> Response:
+    return Response(
+        {'error': f'No autorizado para el vehículo {vehicle_id}'},
+        status=status.HTTP_403_FORBIDDEN
+    )
+
+
+def ingest_fixes(data) -> int:
+    """Encola en el ring buffer un lote ya validado; retorna los fixes aceptados"""
+    return get_fix_buffer().push(data['vehicle_id'], data['fixes'])
+
+
+class TrackingViewSet(viewsets.ViewSet):
+    """Ingesta de fixes GPS y consulta de trazas ajustadas"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    @action(detail=False, methods=['post'])
+    def fixes(self, request):
+        """
+        Recibir un lote de fixes GPS de un vehículo
+        POST /api/tracking/fixes/
+        {
+            "vehicle_id": "camion-07",
+            "fixes": [{"lat": -0.9367, "lon": -78.6185, "timestamp": 1700000000, "accuracy": 8}, ...]
+        }
+        
+        Los fixes se guardan en el buffer del vehículo; el map-matching corre
+        en segundo plano cada TRACKING_MATCH_INTERVAL segundos. Solo se aceptan
+        fixes de vehículos que el usuario puede reportar (can_track_vehicle).
+        """
+        serializer = IngestFixesRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if not can_track_vehicle(request.user, serializer.validated_data['vehicle_id']):
+            return _forbidden(serializer.validated_data['vehicle_id'])
+        accepted = ingest_fixes(serializer.validated_data)
+        return Response({
+            'success': True,
+            'vehicle_id': serializer.validated_data['vehicle_id'],
+            'accepted': accepted
+        }, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['get'])
+    def position(self, request):
+        """
+        Última posición recibida de un vehículo
+        GET /api/tracking/position/?vehicle_id=camion-07
+        """
+        vehicle_id = request.query_params.get('vehicle_id')
+        if not vehicle_id:
+            return Response({'error': 'vehicle_id es requerido'}, status=status.HTTP_400_BAD_REQUEST)
+        if not can_track_vehicle(request.user, vehicle_id):
+            return _forbidden(vehicle_id)
+        fixes = get_fix_buffer().read(vehicle_id)
+        if not len(fixes):
+            return Response({'error': 'Sin datos para el vehículo'}, status=status.HTTP_404_NOT_FOUND)
+        last = fixes[fixes['ts'].argmax()]
+        return Response({
+            'vehicle_id': vehicle_id,
+            'lat': float(last['lat']),
+            'lon': float(last['lon']),
+            'timestamp': int(last['ts']),
+            'accuracy': float(last['accuracy']),
+            'buffered': len(fixes)
+        })
+
+    @action(detail=False, methods=['get'])
+    def traces(self, request):
+        """
+        Trazas ajustadas de un vehículo en un intervalo
+        GET /api/tracking/traces/?vehicle_id=camion-07&since=2024-01-01T08:00:00Z&until=...
+        """
+        vehicle_id = request.query_params.get('vehicle_id')
+        if not vehicle_id:
+            return Response({'error': 'vehicle_id es requerido'}, status=status.HTTP_400_BAD_REQUEST)
+        if not can_track_vehicle(request.user, vehicle_id):
+            return _forbidden(vehicle_id)
+
+        queryset = MatchedTrace.objects.filter(vehicle_id=vehicle_id)
+        # Filtrar por started_at permite a PostgreSQL descartar particiones
+        bounds = {}
+        for param in ('since', 'until'):
+            raw = request.query_params.get(param)
+            if not raw:
+                continue
+            try:
+                bounds[param] = parse_datetime(raw)
+            except ValueError:
+                bounds[param] = None
+            if bounds[param] is None:
+                return Response(
+                    {'error': f'{param} no es una fecha ISO 8601 válida: {raw}'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        if 'since' in bounds:
+            queryset = queryset.filter(started_at__gte=bounds['since'])
+        if 'until' in bounds:
+            queryset = queryset.filter(started_at__lt=bounds['until'])
+
+        serializer = MatchedTraceSerializer(queryset.order_by('started_at')[:500], many=True)
+        return Response(serializer.data)
@@ -13,4 +13,21 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
\ No newline at end of file
+# Inicializar Django antes de importar consumers (usan modelos)
+django_asgi_app = get_asgi_application()
+
+from channels.auth import AuthMiddlewareStack  # noqa: E402
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+from channels.security.websocket import AllowedHostsOriginValidator  # noqa: E402
+
+from apps.notifications.routing import websocket_urlpatterns as notifications_websocket_urlpatterns  # noqa: E402
+from apps.tracking.routing import websocket_urlpatterns as tracking_websocket_urlpatterns  # noqa: E402
+
+application = ProtocolTypeRouter({
+    'http': django_asgi_app,
+    'websocket': AllowedHostsOriginValidator(
+        AuthMiddlewareStack(URLRouter(
+            notifications_websocket_urlpatterns + tracking_websocket_urlpatterns
+        ))
+    ),
+})
@@ -31,6 +31,7 @@ urlpatterns = [
     path('api/', include('apps.tasks.urls')),  # /api/tasks/
     path('api/', include('apps.notifications.urls')),  # /api/notifications/
     path('api/', include('apps.reports.urls')),  # /api/reports/
+    path('api/', include('apps.tracking.urls')),  # /api/tracking/
     # path('api/sync/', include('apps.sync.urls')),
     # path('api/audit/', include('apps.audit.urls')),
 ]
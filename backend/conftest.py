@@ -0,0 +1,33 @@
+"""
+Fixtures de pytest compartidas.
+
+fake_osrm levanta el OSRM simulado (apps/routes/fake_osrm.py) en un puerto
+libre y apunta a él el cliente global osrm_service (sin caché de rutas y con
+el circuit breaker reiniciado), así los tests de RouteViewSet no necesitan el
+contenedor de OSRM. El servidor se puede ajustar dentro del test:
+
+    def test_calculate(fake_osrm, client):
+        fake_osrm.latency_ms = 50
+        fake_osrm.failure_rate = 1.0
+"""
+
+import pytest
+
+
+@pytest.fixture
+def fake_osrm(settings):
+    from apps.routes.fake_osrm import FakeOSRMServer
+    from apps.routes.osrm_service import osrm_service
+
+    server = FakeOSRMServer(seed=0).start()
+    settings.OSRM_URL = server.url
+    previous = osrm_service.base_url, osrm_service.cache
+    osrm_service.base_url = server.url
+    osrm_service.cache = None
+    osrm_service.breaker.reset()
+    try:
+        yield server
+    finally:
+        osrm_service.base_url, osrm_service.cache = previous
+        osrm_service.breaker.reset()
+        server.stop()